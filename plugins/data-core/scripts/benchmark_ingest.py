@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Benchmark the ingestion pipeline in process on synthetic events
+
+Generates an event file from the ml-engine data generators, runs it through the
+same two passes as an upload job (read → validate, then read → normalize →
+outliers → gap_fill → serialize → hash → store) against a throwaway SQLite
+database, and reports rows/sec, peak RSS and time per stage. Each run happens
+in a fresh process so peak RSS covers the pipeline only. Results are saved as
+JSON under --output-dir and can be compared with an earlier run.
+
+Usage: python -m scripts.benchmark_ingest [--rows 100000] [--mix logistics=0.4,factory=0.2,warehouse=0.2,delivery=0.2]
+                                          [--missing-rate 0.05] [--format csv|parquet|arrow] [--repeat 3]
+                                          [--compare benchmark_results/<earlier run>.json]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import numpy as np
+import pandas as pd
+
+from src.utils.constants import REQUIRED_COLUMNS
+
+GENERATOR_PATH = Path(__file__).resolve().parents[2] / "ml-engine" / "data" / "generate_realistic_data.py"
+
+# Generator function and its columns mapped onto event columns, per event type
+EVENT_GENERATORS = {
+    "logistics": ("generate_logistics_data", {
+        "distance_km": "distance_km",
+        "load_kg": "load_kg",
+        "vehicle_type": "vehicle_type",
+        "fuel_type": "fuel_type",
+        "avg_speed": "speed",
+        "stop_events": "stop_events"
+    }),
+    "factory": ("generate_factory_data", {
+        "energy_kwh": "energy_kwh",
+        "furnace_usage": "furnace_usage",
+        "cooling_load": "cooling_load",
+        "shift_hours": "shift_hours"
+    }),
+    "warehouse": ("generate_warehouse_data", {
+        "energy_kwh": "energy_kwh",
+        "temperature": "temperature",
+        "refrigeration_load": "refrigeration_load",
+        "inventory_volume": "inventory_volume"
+    }),
+    "delivery": ("generate_delivery_data", {
+        "route_length": "distance_km",
+        "vehicle_type": "vehicle_type"
+    })
+}
+
+DEFAULT_MIX = "logistics=0.4,factory=0.2,warehouse=0.2,delivery=0.2"
+
+# The generators build rows one at a time; larger runs resample from a pool this size
+GENERATOR_POOL_ROWS = 20000
+
+FILE_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse "logistics=0.4,factory=0.6" into normalized event type weights"""
+    mix = {}
+    for part in value.split(","):
+        event_type, _, weight = part.partition("=")
+        event_type = event_type.strip()
+        if event_type not in EVENT_GENERATORS:
+            raise ValueError(f"Unknown event type in mix: {event_type} (expected one of {', '.join(EVENT_GENERATORS)})")
+        mix[event_type] = float(weight)
+    
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("Event type mix weights must add up to more than 0")
+    return {event_type: weight / total for event_type, weight in mix.items()}
+
+
+def _load_generators():
+    spec = importlib.util.spec_from_file_location("generate_realistic_data", GENERATOR_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def generate_events(
+    rows: int,
+    mix: Dict[str, float],
+    missing_rate: float,
+    seed: int = 0,
+    suppliers: int = 50
+) -> pd.DataFrame:
+    """
+    Build a reproducible frame of events in the upload schema
+    Optional columns are blanked at random with probability missing_rate;
+    required columns are always filled.
+    """
+    generators = _load_generators()
+    rng = np.random.default_rng(seed)
+    counts = rng.multinomial(rows, list(mix.values()))
+    
+    frames = []
+    for event_type, count in zip(mix, counts):
+        if count == 0:
+            continue
+        function_name, columns = EVENT_GENERATORS[event_type]
+        pool = getattr(generators, function_name)(min(int(count), GENERATOR_POOL_ROWS))
+        if len(pool) < count:
+            pool = pool.iloc[rng.integers(0, len(pool), count)]
+        frame = pool[list(columns)].rename(columns=columns).reset_index(drop=True)
+        frame.insert(0, "event_type", event_type)
+        frames.append(frame)
+    
+    df = pd.concat(frames, ignore_index=True)
+    df = df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+    
+    start = pd.Timestamp("2025-01-01", tz="UTC")
+    offsets = np.sort(rng.integers(0, 90 * 24 * 3600, len(df)))
+    df.insert(0, "timestamp", start + pd.to_timedelta(offsets, unit="s"))
+    df.insert(1, "supplier_id", pd.Series(rng.integers(1, suppliers + 1, len(df))).map("S-{:03d}".format))
+    
+    optional = [column for column in df.columns if column not in REQUIRED_COLUMNS]
+    missing = rng.random((len(df), len(optional))) < missing_rate
+    for i, column in enumerate(optional):
+        df[column] = df[column].mask(missing[:, i])
+    return df
+
+
+def write_events(df: pd.DataFrame, path: Path, file_format: str) -> None:
+    """Write events the way a supplier would upload them"""
+    if file_format == "csv":
+        df.to_csv(path, index=False)
+    elif file_format == "parquet":
+        df.to_parquet(path, index=False)
+    elif file_format == "arrow":
+        df.to_feather(path)
+    else:
+        raise ValueError(f"Unknown file format: {file_format}")
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_benchmark(path: str, chunk_rows: int, db_path: str, skip_stages: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Run one upload's worth of pipeline work in this process
+    Returns: {rows, seconds, rows_per_second, peak_rss_mb, stage_seconds}
+    """
+    from src.db.local_storage_client import LocalStorageClient
+    from src.ingestion import file_reader
+    from src.processing.dedup import content_hash
+    from src.processing.outlier_baselines import BASELINE_GROUP_COLUMNS
+    from src.processing.pipeline import PipelineContext, validation_pipeline, processing_pipeline
+    from src.processing.serializer import RecordSerializer
+    from src.processing.streaming_stats import OutlierStatistics
+    from src.utils.constants import OUTLIER_FIELDS
+    
+    store = LocalStorageClient(db_path)
+    filename = os.path.basename(path)
+    stage_seconds = {"read": 0.0}
+    
+    def chunks():
+        reader = file_reader.iter_chunks(path, filename, chunk_rows)
+        while True:
+            started = time.perf_counter()
+            chunk = next(reader, None)
+            stage_seconds["read"] += time.perf_counter() - started
+            if chunk is None:
+                return
+            yield chunk
+    
+    def timed(stage: str, run, *args):
+        started = time.perf_counter()
+        result = run(*args)
+        stage_seconds[stage] = stage_seconds.get(stage, 0.0) + time.perf_counter() - started
+        return result
+    
+    rss_before_mb = _peak_rss_mb()
+    started = time.perf_counter()
+    
+    # Pass 1: validate and collect outlier statistics
+    file_stats = OutlierStatistics(OUTLIER_FIELDS)
+    upload_stats = OutlierStatistics(OUTLIER_FIELDS, BASELINE_GROUP_COLUMNS)
+    validation_context = PipelineContext(collect_stats=[file_stats, upload_stats])
+    rows = 0
+    for chunk in chunks():
+        rows += len(chunk)
+        validation_pipeline.run(chunk, validation_context)
+    
+    # Pass 2: process, serialize and store
+    processing_context = PipelineContext(
+        disabled_stages=set(skip_stages or []),
+        outlier_stats=upload_stats,
+        fallback_stats=file_stats
+    )
+    for chunk in chunks():
+        chunk = processing_pipeline.run(chunk, processing_context)
+        raw_events, normalized_events = timed("serialize", RecordSerializer.to_records, chunk, "benchmark")
+        hashes = timed("hash", lambda: [content_hash(record) for record in normalized_events])
+        for raw, normalized, h in zip(raw_events, normalized_events, hashes):
+            raw["content_hash"] = h
+            normalized["content_hash"] = h
+        timed("store", store.insert_raw_events, raw_events)
+        timed("store", store.insert_normalized_events, normalized_events)
+    
+    seconds = time.perf_counter() - started
+    store.close()
+    
+    for context in (validation_context, processing_context):
+        for stage, elapsed in context.stage_timings.items():
+            stage_seconds[stage] = stage_seconds.get(stage, 0.0) + elapsed
+    
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else 0.0,
+        "peak_rss_mb": _peak_rss_mb(),
+        "rss_before_mb": rss_before_mb,
+        "stage_seconds": stage_seconds
+    }
+
+
+def _init_worker():
+    # Benchmark workers never touch the configured database, and per-chunk logs are noise here
+    os.environ["STORAGE_BACKEND"] = "sqlite"
+    os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="benchmark-"), "unused.db")
+    from src.utils.logger import logger
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+
+def _run_isolated(path: str, chunk_rows: int, skip_stages: List[str]) -> Dict[str, Any]:
+    """Run one benchmark in a fresh process so peak RSS is not inflated by data generation"""
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as tmp:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn"), initializer=_init_worker) as pool:
+            return pool.submit(run_benchmark, path, chunk_rows, os.path.join(tmp, "events.db"), skip_stages).result()
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median of each metric across repeated runs"""
+    stages = sorted({stage for run in runs for stage in run["stage_seconds"]})
+    return {
+        "rows": runs[0]["rows"],
+        "seconds": statistics.median(run["seconds"] for run in runs),
+        "rows_per_second": statistics.median(run["rows_per_second"] for run in runs),
+        "peak_rss_mb": statistics.median(run["peak_rss_mb"] for run in runs),
+        "stage_seconds": {
+            stage: statistics.median(run["stage_seconds"].get(stage, 0.0) for run in runs)
+            for stage in stages
+        }
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(summary: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    def change(current: float, previous: Optional[float]) -> str:
+        if not previous:
+            return ""
+        return f"{(current - previous) / previous * 100:+.1f}%"
+    
+    previous = baseline["summary"] if baseline else {}
+    print(f"\n{'metric':<22}{'current':>14}{'baseline':>14}{'change':>10}")
+    for metric in ("rows_per_second", "seconds", "peak_rss_mb"):
+        before = previous.get(metric)
+        print(f"{metric:<22}{summary[metric]:>14.2f}{f'{before:.2f}' if before is not None else '':>14}{change(summary[metric], before):>10}")
+    
+    print(f"\n{'stage (seconds)':<22}{'current':>14}{'baseline':>14}{'change':>10}")
+    for stage, elapsed in summary["stage_seconds"].items():
+        before = previous.get("stage_seconds", {}).get(stage)
+        print(f"{stage:<22}{elapsed:>14.3f}{f'{before:.3f}' if before is not None else '':>14}{change(elapsed, before):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ingestion pipeline on synthetic events")
+    parser.add_argument("--rows", type=int, default=100000, help="Events to generate")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Event type weights, e.g. logistics=0.7,factory=0.3")
+    parser.add_argument("--missing-rate", type=float, default=0.05, help="Probability an optional value is missing")
+    parser.add_argument("--format", choices=list(FILE_EXTENSIONS), default="csv", help="Upload file format")
+    parser.add_argument("--chunk-rows", type=int, default=10000, help="Rows per pipeline chunk (INGEST_CHUNK_ROWS)")
+    parser.add_argument("--skip", default="", help="Comma-separated optional stages to skip: normalize, outliers, gap_fill")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs to take the median of")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic data")
+    parser.add_argument("--output-dir", default="benchmark_results", help="Where generated files and results are saved")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+    
+    mix = parse_mix(args.mix)
+    skip_stages = [stage.strip() for stage in args.skip.split(",") if stage.strip()]
+    output_dir = Path(args.output_dir)
+    data_dir = output_dir / "data"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Generated files are cached by their parameters so every commit benchmarks the same input
+    mix_key = "-".join(f"{event_type}{weight:.2f}" for event_type, weight in mix.items())
+    path = data_dir / f"events-{args.rows}-{mix_key}-{args.missing_rate}-{args.seed}{FILE_EXTENSIONS[args.format]}"
+    if not path.exists():
+        print(f"Generating {args.rows} events into {path}")
+        write_events(generate_events(args.rows, mix, args.missing_rate, args.seed), path, args.format)
+    
+    runs = []
+    for i in range(args.repeat):
+        run = _run_isolated(str(path), args.chunk_rows, skip_stages)
+        runs.append(run)
+        print(f"Run {i + 1}/{args.repeat}: {run['rows_per_second']:.0f} rows/s, {run['seconds']:.2f}s, peak RSS {run['peak_rss_mb']:.0f} MB")
+    
+    summary = summarize(runs)
+    result = {
+        "created_at": datetime.utcnow().isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "params": {
+            "rows": args.rows,
+            "mix": mix,
+            "missing_rate": args.missing_rate,
+            "format": args.format,
+            "chunk_rows": args.chunk_rows,
+            "skip": skip_stages,
+            "seed": args.seed
+        },
+        "summary": summary,
+        "runs": runs
+    }
+    
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != result["params"]:
+            print(f"Warning: {args.compare} was run with different parameters: {baseline.get('params')}")
+    print_summary(summary, baseline)
+    
+    result_path = output_dir / f"{datetime.utcnow():%Y%m%dT%H%M%S}-{result['commit'] or 'unknown'}.json"
+    with open(result_path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nSaved results to {result_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Fit the gap filling models from stored events_normalized history
+and save them to models/gap_filler_model.pkl
+
+Usage: python -m scripts.train_gap_filler [--limit 50000]
+"""
+import argparse
+import pandas as pd
+
+from src.db.storage import db_client
+from src.processing.gap_filler import gap_filler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train gap filling models from history")
+    parser.add_argument("--limit", type=int, default=50000, help="Most recent events to train on")
+    args = parser.parse_args()
+    
+    events = db_client.get_normalized_events(limit=args.limit)
+    print(f"Loaded {len(events)} historical events")
+    
+    models = gap_filler.fit(pd.DataFrame(events))
+    if not models:
+        print("Not enough history to fit any model")
+        return
+    
+    gap_filler.save_models()
+    for (event_type, field), entry in sorted(models.items()):
+        print(f"{event_type}.{field}: {entry['training_rows']} rows, rmse={entry['rmse']:.3f}, features={entry['features']}")
+
+
+if __name__ == "__main__":
+    main()
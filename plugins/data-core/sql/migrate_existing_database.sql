@@ -0,0 +1,92 @@
+-- Bring a database created from an older sql/schema.sql up to date
+-- Run this in your Supabase SQL Editor; it is safe to run more than once
+
+-- Content hashes for skipping already-stored rows (upserts use on_conflict=content_hash)
+ALTER TABLE events_raw
+ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+ALTER TABLE events_normalized
+ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS events_raw_content_hash_key ON events_raw(content_hash);
+CREATE UNIQUE INDEX IF NOT EXISTS events_normalized_content_hash_key ON events_normalized(content_hash);
+
+-- Per supplier hourly/daily quality rollups
+ALTER TABLE data_quality
+ADD COLUMN IF NOT EXISTS granularity TEXT,
+ADD COLUMN IF NOT EXISTS predicted_count INTEGER,
+ADD COLUMN IF NOT EXISTS completeness_cells BIGINT,
+ADD COLUMN IF NOT EXISTS completeness_total BIGINT,
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+
+CREATE UNIQUE INDEX IF NOT EXISTS data_quality_supplier_id_granularity_window_start_key
+ON data_quality(supplier_id, granularity, window_start);
+
+-- Upload job tracking (duplicates, stage metrics, chunked uploads, column mapping)
+ALTER TABLE ingest_jobs
+ADD COLUMN IF NOT EXISTS unmapped_values JSONB,
+ADD COLUMN IF NOT EXISTS file_hash TEXT,
+ADD COLUMN IF NOT EXISTS rows_duplicate INTEGER DEFAULT 0,
+ADD COLUMN IF NOT EXISTS duplicate_of TEXT,
+ADD COLUMN IF NOT EXISTS stage_metrics JSONB,
+ADD COLUMN IF NOT EXISTS chunks_received INTEGER,
+ADD COLUMN IF NOT EXISTS rows_committed BIGINT DEFAULT 0,
+ADD COLUMN IF NOT EXISTS column_mapping JSONB;
+
+-- Outlier Baselines Table (per supplier/event type/field distribution summaries)
+CREATE TABLE IF NOT EXISTS outlier_baselines (
+    id BIGSERIAL PRIMARY KEY,
+    supplier_id TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    field TEXT NOT NULL,
+    sample_count BIGINT,
+    summary JSONB,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (supplier_id, event_type, field)
+);
+
+-- Column Mappings Table (confirmed header -> standard column mapping per supplier)
+CREATE TABLE IF NOT EXISTS column_mappings (
+    id BIGSERIAL PRIMARY KEY,
+    supplier_id TEXT NOT NULL UNIQUE,
+    mapping JSONB NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_file_hash ON ingest_jobs(file_hash);
+CREATE INDEX IF NOT EXISTS idx_outlier_baselines_supplier ON outlier_baselines(supplier_id);
+CREATE INDEX IF NOT EXISTS idx_data_quality_window ON data_quality(granularity, window_start DESC);
+
+-- Add per-window counts to stored rollups; percentages are recomputed from the totals
+CREATE OR REPLACE FUNCTION merge_data_quality(rollups JSONB) RETURNS VOID AS $$
+    INSERT INTO data_quality AS dq (
+        supplier_id, granularity, window_start, total_rows, predicted_count, anomalies_count,
+        completeness_cells, completeness_total, completeness_pct, predicted_pct
+    )
+    SELECT
+        r.supplier_id, r.granularity, r.window_start, r.total_rows, r.predicted_count, r.anomalies_count,
+        r.completeness_cells, r.completeness_total,
+        ROUND(100.0 * r.completeness_cells / NULLIF(r.completeness_total, 0), 2),
+        ROUND(100.0 * r.predicted_count / NULLIF(r.total_rows, 0), 2)
+    FROM jsonb_to_recordset(rollups) AS r(
+        supplier_id TEXT, granularity TEXT, window_start TIMESTAMPTZ, total_rows INTEGER, predicted_count INTEGER,
+        anomalies_count INTEGER, completeness_cells BIGINT, completeness_total BIGINT
+    )
+    ON CONFLICT (supplier_id, granularity, window_start) DO UPDATE SET
+        total_rows = dq.total_rows + EXCLUDED.total_rows,
+        predicted_count = dq.predicted_count + EXCLUDED.predicted_count,
+        anomalies_count = dq.anomalies_count + EXCLUDED.anomalies_count,
+        completeness_cells = dq.completeness_cells + EXCLUDED.completeness_cells,
+        completeness_total = dq.completeness_total + EXCLUDED.completeness_total,
+        completeness_pct = ROUND(100.0 * (dq.completeness_cells + EXCLUDED.completeness_cells)
+            / NULLIF(dq.completeness_total + EXCLUDED.completeness_total, 0), 2),
+        predicted_pct = ROUND(100.0 * (dq.predicted_count + EXCLUDED.predicted_count)
+            / NULLIF(dq.total_rows + EXCLUDED.total_rows, 0), 2),
+        updated_at = NOW();
+$$ LANGUAGE sql;
+
+-- Verify the columns were added
+SELECT table_name, column_name, data_type
+FROM information_schema.columns
+WHERE table_name IN ('events_raw', 'events_normalized', 'data_quality', 'ingest_jobs')
+ORDER BY table_name, ordinal_position;
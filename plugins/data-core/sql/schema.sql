@@ -4,6 +4,7 @@ CREATE TABLE events_raw (
     timestamp TIMESTAMPTZ,
     payload JSONB,
     data_source TEXT,
+    content_hash TEXT UNIQUE,
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
@@ -19,19 +20,26 @@ CREATE TABLE events_normalized (
     speed FLOAT,
     timestamp TIMESTAMPTZ,
     is_outlier BOOLEAN DEFAULT FALSE,
+    content_hash TEXT UNIQUE,
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
--- Data Quality Table
+-- Data Quality Table (per supplier hourly/daily rollups, merged on ingest)
 CREATE TABLE data_quality (
     id BIGSERIAL PRIMARY KEY,
     supplier_id TEXT,
+    granularity TEXT,
     window_start TIMESTAMPTZ,
     completeness_pct FLOAT,
     predicted_pct FLOAT,
     anomalies_count INTEGER,
     total_rows INTEGER,
-    created_at TIMESTAMPTZ DEFAULT NOW()
+    predicted_count INTEGER,
+    completeness_cells BIGINT,
+    completeness_total BIGINT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (supplier_id, granularity, window_start)
 );
 
 -- Ingest Jobs Table
@@ -43,13 +51,72 @@ CREATE TABLE ingest_jobs (
     rows_total INTEGER,
     rows_processed INTEGER,
     errors JSONB,
+    unmapped_values JSONB,
+    file_hash TEXT,
+    rows_duplicate INTEGER DEFAULT 0,
+    duplicate_of TEXT,
+    stage_metrics JSONB,
+    chunks_received INTEGER,
+    rows_committed BIGINT DEFAULT 0,
+    column_mapping JSONB,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Outlier Baselines Table (per supplier/event type/field distribution summaries)
+CREATE TABLE outlier_baselines (
+    id BIGSERIAL PRIMARY KEY,
+    supplier_id TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    field TEXT NOT NULL,
+    sample_count BIGINT,
+    summary JSONB,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (supplier_id, event_type, field)
+);
+
+-- Column Mappings Table (confirmed header -> standard column mapping per supplier)
+CREATE TABLE column_mappings (
+    id BIGSERIAL PRIMARY KEY,
+    supplier_id TEXT NOT NULL UNIQUE,
+    mapping JSONB NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
 -- Create indexes
 CREATE INDEX idx_events_raw_supplier ON events_raw(supplier_id);
 CREATE INDEX idx_events_raw_timestamp ON events_raw(timestamp);
 CREATE INDEX idx_events_normalized_supplier ON events_normalized(supplier_id);
 CREATE INDEX idx_events_normalized_timestamp ON events_normalized(timestamp);
-CREATE INDEX idx_ingest_jobs_job_id ON ingest_jobs(job_id);
\ No newline at end of file
+CREATE INDEX idx_ingest_jobs_job_id ON ingest_jobs(job_id);
+CREATE INDEX idx_ingest_jobs_file_hash ON ingest_jobs(file_hash);
+CREATE INDEX idx_outlier_baselines_supplier ON outlier_baselines(supplier_id);
+CREATE INDEX idx_data_quality_window ON data_quality(granularity, window_start DESC);
+
+-- Add per-window counts to stored rollups; percentages are recomputed from the totals
+CREATE OR REPLACE FUNCTION merge_data_quality(rollups JSONB) RETURNS VOID AS $$
+    INSERT INTO data_quality AS dq (
+        supplier_id, granularity, window_start, total_rows, predicted_count, anomalies_count,
+        completeness_cells, completeness_total, completeness_pct, predicted_pct
+    )
+    SELECT
+        r.supplier_id, r.granularity, r.window_start, r.total_rows, r.predicted_count, r.anomalies_count,
+        r.completeness_cells, r.completeness_total,
+        ROUND(100.0 * r.completeness_cells / NULLIF(r.completeness_total, 0), 2),
+        ROUND(100.0 * r.predicted_count / NULLIF(r.total_rows, 0), 2)
+    FROM jsonb_to_recordset(rollups) AS r(
+        supplier_id TEXT, granularity TEXT, window_start TIMESTAMPTZ, total_rows INTEGER, predicted_count INTEGER,
+        anomalies_count INTEGER, completeness_cells BIGINT, completeness_total BIGINT
+    )
+    ON CONFLICT (supplier_id, granularity, window_start) DO UPDATE SET
+        total_rows = dq.total_rows + EXCLUDED.total_rows,
+        predicted_count = dq.predicted_count + EXCLUDED.predicted_count,
+        anomalies_count = dq.anomalies_count + EXCLUDED.anomalies_count,
+        completeness_cells = dq.completeness_cells + EXCLUDED.completeness_cells,
+        completeness_total = dq.completeness_total + EXCLUDED.completeness_total,
+        completeness_pct = ROUND(100.0 * (dq.completeness_cells + EXCLUDED.completeness_cells)
+            / NULLIF(dq.completeness_total + EXCLUDED.completeness_total, 0), 2),
+        predicted_pct = ROUND(100.0 * (dq.predicted_count + EXCLUDED.predicted_count)
+            / NULLIF(dq.total_rows + EXCLUDED.total_rows, 0), 2),
+        updated_at = NOW();
+$$ LANGUAGE sql;
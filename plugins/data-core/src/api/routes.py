@@ -1,433 +1,339 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
-from typing import Dict, Any, List
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from typing import Dict, Any, List, Optional, Set
 import pandas as pd
+import asyncio
 import uuid
 from datetime import datetime
-import httpx
 import os
 
 from src.ingestion.schema_validator import SchemaValidator
-from src.processing.normalizer import DataNormalizer
-from src.processing.outlier_detector import OutlierDetector
-from src.processing.gap_filler import gap_filler
-from src.processing.quality_metrics import QualityMetrics
-from src.db.supabase_client import supabase_client
+from src.processing.pipeline import PipelineContext, PipelineValidationError, full_pipeline, parse_stage_names, log_stage_timings
+from src.processing.quality_metrics import QualityMetrics, ROLLUP_GRANULARITIES
+from src.processing.serializer import RecordSerializer
+from src.processing.dedup import event_deduplicator, file_hasher
+from src.ingestion.upload_pipeline import trigger_immediate_analysis
+from src.ingestion.job_queue import ingest_job_queue
+from src.ingestion.chunked_upload import chunked_upload_manager, ChunkedUploadError
+from src.ingestion.column_mapping import column_mapping_registry, supplier_ids
+from src.ingestion import file_reader
+from src.ingestion.event_batch import (
+    parse_event_batch, parse_columnar_batch, is_columnar, ingest_event_batch, ingest_event_frame, record_quality_rollups
+)
+from src.ingestion.event_buffer import event_write_buffer
+from src.db.storage import async_db_client
+from src.utils.config import settings
 from src.utils.logger import logger
+from src.utils.metrics import INGEST_QUEUE_PENDING, EVENT_BUFFER_PENDING
 
 router = APIRouter()
 
-# Orchestration engine URL
-ORCHESTRATION_URL = os.getenv("ORCHESTRATION_ENGINE_URL", "http://localhost:8000")
+# Served at the app root (/metrics) for Prometheus scrapers
+metrics_router = APIRouter()
+
+INGEST_QUEUE_PENDING.set_function(ingest_job_queue.pending)
+EVENT_BUFFER_PENDING.set_function(event_write_buffer.pending)
+
+# Read size when spooling uploads to disk
+UPLOAD_READ_CHUNK_BYTES = 1024 * 1024
+
+SUPPLIER_MAPPING_DESCRIPTION = "Supplier whose registered column mapping applies (default: the file's first supplier)"
+
+
+def _skip_stages(skip: Optional[str]) -> Set[str]:
+    """Parse the ?skip= query parameter, rejecting unknown stage names"""
+    try:
+        return parse_stage_names(skip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/ingest/csv")
-async def ingest_csv(file: UploadFile = File(...)):
+async def ingest_csv(
+    file: UploadFile = File(...),
+    skip: Optional[str] = Query(None, description="Comma-separated stages to skip: normalize, outliers, gap_fill"),
+    supplier_id: Optional[str] = Query(None, description=SUPPLIER_MAPPING_DESCRIPTION)
+):
     """
     Ingest CSV file
-    Process: validate → normalize → detect outliers → fill gaps → store
+    Process: map columns → validate → normalize → detect outliers → fill gaps → store
     """
+    context = PipelineContext(disabled_stages=_skip_stages(skip))
     try:
         # Read CSV
         contents = await file.read()
         df = pd.read_csv(pd.io.common.BytesIO(contents))
         
         logger.info(f"Received CSV with {len(df)} rows")
+        context.column_mapping = await column_mapping_registry.resolve(df, supplier_id)
         
-        # Validate schema
-        is_valid, errors = SchemaValidator.validate_dataframe(df)
-        if not is_valid:
-            raise HTTPException(status_code=400, detail={"errors": errors})
-        
-        # Normalize data
-        df = DataNormalizer.normalize_dataframe(df)
-        
-        # Detect outliers
-        df = OutlierDetector.flag_outliers(df)
-        
-        # Fill gaps
-        df = gap_filler.fill_gaps(df)
-        
-        # Store raw events
-        for _, row in df.iterrows():
-            # Convert row to dict and handle timestamps
-            payload = row.to_dict()
-            for key, value in payload.items():
-                if pd.isna(value):
-                    payload[key] = None
-                elif isinstance(value, pd.Timestamp):
-                    payload[key] = value.isoformat()
-            
-            raw_event = {
-                "supplier_id": row.get("supplier_id"),
-                "timestamp": row.get("timestamp").isoformat() if pd.notna(row.get("timestamp")) else None,
-                "payload": payload,
-                "data_source": "csv_upload",
-                "created_at": datetime.utcnow().isoformat()
-            }
-            supabase_client.insert_raw_event(raw_event)
-        
-        # Helper function to convert pandas values to JSON-safe values
-        def safe_value(value):
-            """Convert pandas NaN/NaT to None, handle timestamps"""
-            if pd.isna(value):
-                return None
-            elif isinstance(value, pd.Timestamp):
-                return value.isoformat()
-            elif isinstance(value, (int, float)):
-                return None if pd.isna(value) else float(value)
-            return value
-        
-        # Store normalized events
-        for _, row in df.iterrows():
-            normalized_event = {
-                "event_type": safe_value(row.get("event_type")),
-                "supplier_id": safe_value(row.get("supplier_id")),
-                # Logistics fields
-                "distance_km": safe_value(row.get("distance_km")),
-                "load_kg": safe_value(row.get("load_kg")),
-                "vehicle_type": safe_value(row.get("vehicle_type")),
-                "fuel_type": safe_value(row.get("fuel_type")),
-                "speed": safe_value(row.get("speed")),
-                "stop_events": safe_value(row.get("stop_events")),
-                # Factory fields
-                "energy_kwh": safe_value(row.get("energy_kwh")),
-                "furnace_usage": safe_value(row.get("furnace_usage")),
-                "cooling_load": safe_value(row.get("cooling_load")),
-                "shift_hours": safe_value(row.get("shift_hours")),
-                # Warehouse fields
-                "temperature": safe_value(row.get("temperature")),
-                "refrigeration_load": safe_value(row.get("refrigeration_load")),
-                "inventory_volume": safe_value(row.get("inventory_volume")),
-                # Common fields
-                "timestamp": row.get("timestamp").isoformat() if pd.notna(row.get("timestamp")) else None,
-                "is_outlier": bool(row.get("is_outlier", False)) if pd.notna(row.get("is_outlier")) else False,
-                "created_at": datetime.utcnow().isoformat()
-            }
-            supabase_client.insert_normalized_event(normalized_event)
-        
-        # Calculate and store quality metrics
+        # Map columns, validate, normalize, detect outliers and fill gaps in place
+        try:
+            await asyncio.to_thread(full_pipeline.run, df, context)
+        except PipelineValidationError as e:
+            raise HTTPException(status_code=400, detail={"errors": e.errors})
+        log_stage_timings("CSV ingest", context)
+        unmapped_values = context.unmapped_values
+        
+        # Serialize, skip rows already stored, and store raw + normalized events
+        raw_events, normalized_events = await asyncio.to_thread(RecordSerializer.to_records, df, "csv_upload")
+        raw_events, normalized_events, kept = await event_deduplicator.filter_records(raw_events, normalized_events)
+        raw_results, normalized_results = await asyncio.gather(
+            async_db_client.insert_raw_events(raw_events),
+            async_db_client.insert_normalized_events(normalized_events)
+        )
+        failed_chunks = [r for r in raw_results + normalized_results if r["error"]]
+        await column_mapping_registry.confirm(supplier_ids(df), context.column_mapping)
+        
+        # Quality metrics for the response; stored rows are folded into the supplier rollups
         metrics = QualityMetrics.calculate_metrics(df)
-        supabase_client.insert_quality_metrics(metrics)
+        await record_quality_rollups(df.iloc[kept])
         
         # 🚀 TRIGGER IMMEDIATE ANALYSIS
-        logger.info("🚀 Triggering immediate hotspot detection...")
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(f"{ORCHESTRATION_URL}/trigger-analysis")
-                if response.status_code == 200:
-                    analysis_result = response.json()
-                    logger.info(f"✅ Immediate analysis triggered: {analysis_result.get('hotspots_detected', 0)} hotspots detected")
-                else:
-                    logger.warning(f"⚠️ Analysis trigger failed with status {response.status_code}")
-        except Exception as e:
-            logger.warning(f"⚠️ Could not trigger immediate analysis: {e}")
+        await trigger_immediate_analysis()
         
         return JSONResponse(content={
             "status": "ok",
             "rows": len(df),
-            "outliers": int(df["is_outlier"].sum()),
+            "outliers": int(df["is_outlier"].sum()) if "is_outlier" in df.columns else 0,
+            "rows_inserted": sum(r["inserted"] for r in normalized_results),
+            "duplicates": len(df) - len(kept),
+            "failed_chunks": len(failed_chunks),
+            "unmapped_values": unmapped_values,
+            "column_mapping": context.column_mapping,
             "quality_metrics": metrics,
+            "stage_timings": context.stage_timings,
+            "stage_metrics": context.metrics_summary(),
             "immediate_analysis": "triggered"
         })
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing CSV: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/ingest/event")
+@router.post("/ingest/event", status_code=202)
 async def ingest_event(event: Dict[str, Any]):
     """
     Ingest single event
+    The event is validated here and written by the background write buffer
+    in micro-batches; returns 429 when the buffer is full
     """
-    try:
-        # Validate event
-        is_valid, errors = SchemaValidator.validate_event(event)
-        if not is_valid:
-            raise HTTPException(status_code=400, detail={"errors": errors})
-        
-        # Store raw event
-        raw_event = {
-            "supplier_id": event.get("supplier_id"),
-            "timestamp": event.get("timestamp"),
-            "payload": event,
-            "data_source": "api",
-            "created_at": datetime.utcnow().isoformat()
-        }
-        supabase_client.insert_raw_event(raw_event)
-        
-        # Normalize
-        normalized = DataNormalizer.normalize_event(event)
-        
-        # Store normalized event
-        normalized_event = {
-            "event_type": normalized.get("event_type"),
-            "supplier_id": normalized.get("supplier_id"),
-            "distance_km": normalized.get("distance_km"),
-            "load_kg": normalized.get("load_kg"),
-            "vehicle_type": normalized.get("vehicle_type"),
-            "fuel_type": normalized.get("fuel_type"),
-            "speed": normalized.get("speed"),
-            "timestamp": normalized.get("timestamp"),
-            "is_outlier": False,
-            "created_at": datetime.utcnow().isoformat()
-        }
-        supabase_client.insert_normalized_event(normalized_event)
-        
-        return JSONResponse(content={"status": "stored"})
+    # Validate event
+    is_valid, errors = SchemaValidator.validate_event(event)
+    if not is_valid:
+        raise HTTPException(status_code=400, detail={"errors": errors})
     
+    try:
+        accepted = event_write_buffer.submit(event)
     except Exception as e:
         logger.error(f"Error processing event: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if not accepted:
+        raise HTTPException(
+            status_code=429,
+            detail="Event buffer is full. Please retry shortly.",
+            headers={"Retry-After": "1"}
+        )
+    
+    return JSONResponse(status_code=202, content={"status": "queued"})
+
+
+@router.post("/ingest/events")
+async def ingest_events(request: Request):
+    """
+    Ingest a batch of events sent as a JSON array, NDJSON (application/x-ndjson),
+    Parquet (application/vnd.apache.parquet) or an Arrow IPC stream
+    (application/vnd.apache.arrow.stream); columnar bodies keep their column types
+    Invalid events are reported by index; valid ones are stored with bulk inserts
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    try:
+        if is_columnar(content_type):
+            events = await asyncio.to_thread(parse_columnar_batch, body, content_type)
+            parse_errors = {}
+        else:
+            events, parse_errors = parse_event_batch(body, content_type)
+    except (ValueError, UnicodeDecodeError, file_reader.FileFormatError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse request body: {e}")
+    
+    if not isinstance(events, (list, pd.DataFrame)):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON of events")
+    if len(events) > settings.max_batch_events:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(events)} events exceeds the limit of {settings.max_batch_events}"
+        )
+    
+    try:
+        if isinstance(events, pd.DataFrame):
+            result = await ingest_event_frame(events)
+        else:
+            result = await ingest_event_batch(events, parse_errors)
+    except Exception as e:
+        logger.error(f"Error processing event batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    status = "stored" if not result["errors"] else ("partial" if result["stored"] else "rejected")
+    return JSONResponse(content={"status": status, **result})
 
 
-@router.post("/ingest/upload")
-async def ingest_upload(file: UploadFile = File(...)):
+@router.post("/ingest/upload", status_code=202)
+async def ingest_upload(
+    file: UploadFile = File(...),
+    skip: Optional[str] = Query(None, description="Comma-separated stages to skip: normalize, outliers, gap_fill"),
+    supplier_id: Optional[str] = Query(None, description=SUPPLIER_MAPPING_DESCRIPTION)
+):
     """
     Handle file upload with job tracking
-    Supports CSV and XLSX
+    Supports CSV, XLSX, Parquet and Arrow IPC (.arrow/.arrows/.feather)
+    The file is spooled to disk and processed by a background worker;
+    poll /ingest/status/{job_id} for progress
     """
+    if not file_reader.is_supported(file.filename):
+        raise HTTPException(status_code=400, detail="Unsupported file format. Please upload CSV, Excel, Parquet or Arrow IPC files.")
+    skip_stages = _skip_stages(skip)
+    
+    job_id = str(uuid.uuid4())
+    path = os.path.join(settings.upload_spool_dir, f"{job_id}{os.path.splitext(file.filename)[1]}")
+    
     try:
-        job_id = str(uuid.uuid4())
+        # Spool upload to disk without holding it in memory
+        os.makedirs(settings.upload_spool_dir, exist_ok=True)
+        hasher = file_hasher()
+        with open(path, "wb") as out:
+            while chunk := await file.read(UPLOAD_READ_CHUNK_BYTES):
+                out.write(chunk)
+                hasher.update(chunk)
+        file_hash = hasher.hexdigest()
         
         # Create job record
         job = {
             "job_id": job_id,
-            "status": "received",
+            "status": "queued",
             "filename": file.filename,
             "rows_total": None,
             "rows_processed": 0,
             "errors": [],
+            "file_hash": file_hash,
             "created_at": datetime.utcnow().isoformat()
         }
-        supabase_client.insert_ingest_job(job)
+        await async_db_client.insert_ingest_job(job)
         
-        # Read file based on extension
-        contents = await file.read()
-        
-        if file.filename.endswith('.csv'):
-            # Try reading with error handling for malformed CSV
-            try:
-                # Read CSV with flexible options to handle trailing commas and empty values
-                df = pd.read_csv(
-                    pd.io.common.BytesIO(contents),
-                    skipinitialspace=True,  # Skip spaces after delimiter
-                    skip_blank_lines=True,   # Skip blank lines
-                    na_values=['', 'NA', 'N/A', 'null', 'NULL'],  # Treat these as NaN
-                    keep_default_na=True
-                )
-                logger.info(f"Successfully parsed CSV: {len(df)} rows, {len(df.columns)} columns")
-            except pd.errors.ParserError as e:
-                error_msg = str(e)
-                logger.error(f"CSV parsing error: {error_msg}")
-                
-                # Extract line number from error if available
-                import re
-                line_match = re.search(r'line (\d+)', error_msg)
-                line_num = line_match.group(1) if line_match else "unknown"
-                
-                # Try with engine='python' which is more flexible
-                try:
-                    logger.info("Retrying with Python engine for more flexible parsing...")
-                    df = pd.read_csv(
-                        pd.io.common.BytesIO(contents), 
-                        engine='python',  # More flexible parser
-                        skipinitialspace=True,
-                        skip_blank_lines=True,
-                        na_values=['', 'NA', 'N/A', 'null', 'NULL'],
-                        keep_default_na=True,
-                        on_bad_lines='warn'  # Warn but don't skip
-                    )
-                    logger.info(f"Successfully parsed with Python engine: {len(df)} rows, {len(df.columns)} columns")
-                    
-                    # Update job with warning
-                    supabase_client.update_ingest_job(job_id, {
-                        "errors": [f"Warning: CSV had parsing issues at line {line_num}, but data was recovered."]
-                    })
-                except Exception as e2:
-                    # Last resort: try with on_bad_lines='skip'
-                    try:
-                        logger.warning("Trying with skip bad lines...")
-                        df = pd.read_csv(
-                            pd.io.common.BytesIO(contents), 
-                            engine='python',
-                            on_bad_lines='skip',
-                            skipinitialspace=True,
-                            skip_blank_lines=True
-                        )
-                        logger.warning(f"Skipped malformed lines. Processed {len(df)} rows.")
-                        
-                        supabase_client.update_ingest_job(job_id, {
-                            "errors": [f"Warning: Skipped malformed lines. Processed {len(df)} valid rows."]
-                        })
-                    except Exception as e3:
-                        # Complete failure
-                        supabase_client.update_ingest_job(job_id, {
-                            "status": "failed",
-                            "errors": [f"CSV parsing failed at line {line_num}. Please ensure all rows have the same number of columns. Error: {error_msg}"]
-                        })
-                        raise HTTPException(
-                            status_code=400, 
-                            detail=f"CSV file is malformed at line {line_num}. Please check that all rows have the same number of columns. Original error: {error_msg}"
-                        )
-        elif file.filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(pd.io.common.BytesIO(contents))
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file format. Please upload CSV or Excel files.")
-        
-        # Update job with total rows
-        supabase_client.update_ingest_job(job_id, {
-            "rows_total": len(df),
-            "status": "parsing"
-        })
-        
-        logger.info(f"Job {job_id}: Processing {len(df)} rows")
-        
-        # Validate
-        supabase_client.update_ingest_job(job_id, {"status": "validating"})
-        is_valid, errors = SchemaValidator.validate_dataframe(df)
-        
-        if not is_valid:
-            # Add helpful message about required columns
-            error_detail = {
-                "errors": errors,
-                "required_columns": ["timestamp", "supplier_id", "event_type"],
-                "optional_columns": ["distance_km", "load_kg", "vehicle_type", "fuel_type", "speed"],
-                "your_columns": list(df.columns),
-                "help": "Ensure your CSV has at minimum: timestamp, supplier_id, and event_type columns"
-            }
-            supabase_client.update_ingest_job(job_id, {
+        if not ingest_job_queue.submit(
+            job_id, path, file.filename,
+            skip_stages=skip_stages, file_hash=file_hash, supplier_id=supplier_id
+        ):
+            await async_db_client.update_ingest_job(job_id, {
                 "status": "failed",
-                "errors": errors
+                "errors": ["Too many uploads in progress. Please retry shortly."]
             })
-            raise HTTPException(status_code=400, detail=error_detail)
-        
-        # Normalize
-        supabase_client.update_ingest_job(job_id, {"status": "normalizing"})
-        df = DataNormalizer.normalize_dataframe(df)
-        
-        # Detect outliers
-        df = OutlierDetector.flag_outliers(df)
-        
-        # Fill gaps
-        df = gap_filler.fill_gaps(df)
-        
-        # Insert data
-        supabase_client.update_ingest_job(job_id, {"status": "inserting"})
-        
-        # Helper function to convert pandas values to JSON-safe values
-        def safe_value(value):
-            """Convert pandas NaN/NaT to None, handle timestamps"""
-            if pd.isna(value):
-                return None
-            elif isinstance(value, pd.Timestamp):
-                return value.isoformat()
-            elif isinstance(value, (int, float)):
-                return None if pd.isna(value) else float(value)
-            return value
-        
-        for idx, row in df.iterrows():
-            # Convert row to dict and handle timestamps
-            payload = row.to_dict()
-            for key, value in payload.items():
-                if pd.isna(value):
-                    payload[key] = None
-                elif isinstance(value, pd.Timestamp):
-                    payload[key] = value.isoformat()
-            
-            # Insert raw
-            raw_event = {
-                "supplier_id": safe_value(row.get("supplier_id")),
-                "timestamp": row.get("timestamp").isoformat() if pd.notna(row.get("timestamp")) else None,
-                "payload": payload,
-                "data_source": "file_upload",
-                "created_at": datetime.utcnow().isoformat()
-            }
-            supabase_client.insert_raw_event(raw_event)
-            
-            # Insert normalized
-            normalized_event = {
-                "event_type": safe_value(row.get("event_type")),
-                "supplier_id": safe_value(row.get("supplier_id")),
-                # Logistics fields
-                "distance_km": safe_value(row.get("distance_km")),
-                "load_kg": safe_value(row.get("load_kg")),
-                "vehicle_type": safe_value(row.get("vehicle_type")),
-                "fuel_type": safe_value(row.get("fuel_type")),
-                "speed": safe_value(row.get("speed")),
-                "stop_events": safe_value(row.get("stop_events")),
-                # Factory fields
-                "energy_kwh": safe_value(row.get("energy_kwh")),
-                "furnace_usage": safe_value(row.get("furnace_usage")),
-                "cooling_load": safe_value(row.get("cooling_load")),
-                "shift_hours": safe_value(row.get("shift_hours")),
-                # Warehouse fields
-                "temperature": safe_value(row.get("temperature")),
-                "refrigeration_load": safe_value(row.get("refrigeration_load")),
-                "inventory_volume": safe_value(row.get("inventory_volume")),
-                # Common fields
-                "timestamp": row.get("timestamp").isoformat() if pd.notna(row.get("timestamp")) else None,
-                "is_outlier": bool(row.get("is_outlier", False)) if pd.notna(row.get("is_outlier")) else False,
-                "created_at": datetime.utcnow().isoformat()
-            }
-            supabase_client.insert_normalized_event(normalized_event)
-            
-            # Update progress
-            if (idx + 1) % 50 == 0:
-                supabase_client.update_ingest_job(job_id, {"rows_processed": idx + 1})
+            os.remove(path)
+            raise HTTPException(status_code=429, detail="Too many uploads in progress. Please retry shortly.")
         
-        # Calculate quality metrics
-        metrics = QualityMetrics.calculate_metrics(df)
-        supabase_client.insert_quality_metrics(metrics)
-        
-        # Mark complete
-        supabase_client.update_ingest_job(job_id, {
-            "status": "complete",
-            "rows_processed": len(df)
-        })
-        
-        # 🚀 TRIGGER IMMEDIATE ANALYSIS
-        logger.info("🚀 Triggering immediate hotspot detection...")
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(f"{ORCHESTRATION_URL}/trigger-analysis")
-                if response.status_code == 200:
-                    analysis_result = response.json()
-                    logger.info(f"✅ Immediate analysis triggered: {analysis_result.get('hotspots_detected', 0)} hotspots detected")
-                else:
-                    logger.warning(f"⚠️ Analysis trigger failed with status {response.status_code}")
-        except Exception as e:
-            logger.warning(f"⚠️ Could not trigger immediate analysis: {e}")
-            # Don't fail the upload if analysis trigger fails
-        
-        return JSONResponse(content={
+        return JSONResponse(status_code=202, content={
             "jobId": job_id,
-            "message": "Upload received and processed. Immediate analysis triggered.",
-            "rows": len(df)
+            "status": "queued",
+            "message": "Upload received. Processing in background; poll /ingest/status/{jobId} for progress."
         })
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in upload: {e}")
-        if 'job_id' in locals():
-            supabase_client.update_ingest_job(job_id, {
-                "status": "failed",
-                "errors": [str(e)]
-            })
+        if os.path.exists(path):
+            os.remove(path)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/ingest/uploads", status_code=201)
+async def initiate_chunked_upload(filename: str = Query(..., description="Name of the file being uploaded; its extension selects the format")):
+    """
+    Start a resumable chunked upload
+    Then PUT chunks to /ingest/uploads/{jobId}/chunks/{n} (n from 0) and POST
+    /ingest/uploads/{jobId}/commit; /ingest/status/{jobId} shows chunks_received
+    """
+    try:
+        job = await chunked_upload_manager.initiate(filename)
+        return JSONResponse(status_code=201, content={
+            "jobId": job["job_id"],
+            "status": job["status"],
+            "maxChunkBytes": settings.upload_chunk_max_mb * 1024 * 1024
+        })
+    
+    except ChunkedUploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error initiating chunked upload: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.put("/ingest/uploads/{job_id}/chunks/{index}")
+async def put_upload_chunk(job_id: str, index: int, request: Request):
+    """Receive one numbered chunk of a chunked upload; chunks may be re-sent or arrive out of order"""
+    try:
+        result = await chunked_upload_manager.put_chunk(job_id, index, request.stream())
+        return JSONResponse(content={"jobId": job_id, **result})
+    
+    except ChunkedUploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error receiving chunk {index} of upload {job_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/ingest/uploads/{job_id}/commit", status_code=202)
+async def commit_chunked_upload(
+    job_id: str,
+    chunks: int = Query(..., ge=1, description="Total number of chunks sent"),
+    sha256: Optional[str] = Query(None, description="Hex SHA-256 of the whole file, checked before processing"),
+    skip: Optional[str] = Query(None, description="Comma-separated stages to skip: normalize, outliers, gap_fill"),
+    supplier_id: Optional[str] = Query(None, description=SUPPLIER_MAPPING_DESCRIPTION)
+):
+    """
+    Process a fully received chunked upload in the background
+    If processing fails, committing again resumes after the job's rows_committed offset
+    """
+    skip_stages = _skip_stages(skip)
+    try:
+        result = await chunked_upload_manager.commit(
+            job_id, chunks, sha256=sha256, skip_stages=skip_stages, supplier_id=supplier_id
+        )
+        return JSONResponse(status_code=202, content={
+            "jobId": job_id,
+            "status": result["status"],
+            "resumeFrom": result["resume_from"],
+            "message": "Upload committed. Processing in background; poll /ingest/status/{jobId} for progress."
+        })
+    
+    except ChunkedUploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error committing upload {job_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/ingest/status/{job_id}")
 async def get_job_status(job_id: str):
-    """Get upload job status"""
+    """
+    Get upload job status
+    stage_metrics holds wall time, rows in/out and memory delta per stage of each pass
+    """
     try:
-        job = supabase_client.get_ingest_job(job_id)
+        job = await async_db_client.get_ingest_job(job_id)
         
         if not job:
             raise HTTPException(status_code=404, detail="Job not found")
         
         return JSONResponse(content=job)
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching job status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -437,7 +343,7 @@ async def get_job_status(job_id: str):
 async def get_all_jobs(limit: int = 20):
     """Get all upload jobs (most recent first)"""
     try:
-        jobs = supabase_client.get_all_ingest_jobs(limit)
+        jobs = await async_db_client.get_all_ingest_jobs(limit)
         return JSONResponse(content=jobs)
     
     except Exception as e:
@@ -445,19 +351,68 @@ async def get_all_jobs(limit: int = 20):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/column-mappings/{supplier_id}")
+async def get_column_mapping(supplier_id: str):
+    """Get the header → standard column mapping registered for a supplier"""
+    mapping = await column_mapping_registry.get(supplier_id)
+    if not mapping:
+        raise HTTPException(status_code=404, detail=f"No column mapping registered for supplier {supplier_id}")
+    return JSONResponse(content={"supplier_id": supplier_id, "mapping": mapping})
+
+
+@router.put("/column-mappings/{supplier_id}")
+async def put_column_mapping(supplier_id: str, request: Request):
+    """
+    Confirm a supplier's header → standard column mapping, replacing the registered one
+    Body: {"header in the supplier's files": "standard column", ...}
+    """
+    try:
+        mapping = await request.json()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+    if not isinstance(mapping, dict) or not all(isinstance(v, str) for v in mapping.values()):
+        raise HTTPException(status_code=400, detail="Body must be an object mapping headers to standard column names")
+    
+    try:
+        mapping = await column_mapping_registry.replace(supplier_id, mapping)
+        return JSONResponse(content={"supplier_id": supplier_id, "mapping": mapping})
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error saving column mapping: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/data-quality/{supplier_id}")
-async def get_data_quality(supplier_id: str):
-    """Get data quality metrics for a supplier"""
+async def get_data_quality(
+    supplier_id: str,
+    granularity: str = Query("day", description="Rollup window: hour or day")
+):
+    """
+    Get data quality metrics for a supplier
+    Reads the latest precomputed hourly or daily rollup, maintained on ingest
+    """
+    if granularity not in ROLLUP_GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(ROLLUP_GRANULARITIES)}")
     try:
-        # This would fetch from data_quality table
-        # For now, return a placeholder
+        rollup = await async_db_client.get_quality_rollup(supplier_id, granularity)
+        if not rollup:
+            raise HTTPException(status_code=404, detail=f"No data quality metrics for supplier {supplier_id}")
+        
         return JSONResponse(content={
             "supplier_id": supplier_id,
-            "completeness_pct": 85,
-            "predicted_pct": 15,
-            "anomalies_count": 3
+            "granularity": granularity,
+            "window_start": rollup["window_start"],
+            "completeness_pct": rollup["completeness_pct"],
+            "predicted_pct": rollup["predicted_pct"],
+            "anomalies_count": rollup["anomalies_count"],
+            "total_rows": rollup["total_rows"],
+            "last_updated": rollup.get("updated_at")
         })
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching data quality: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -466,4 +421,19 @@ async def get_data_quality(supplier_id: str):
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "data-core"}
+    return {
+        "status": "healthy",
+        "service": "data-core",
+        "event_buffer": {
+            "pending": event_write_buffer.pending(),
+            "flushed": event_write_buffer.flushed,
+            "duplicates": event_write_buffer.duplicates,
+            "failed": event_write_buffer.failed
+        }
+    }
+
+
+@metrics_router.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage timings and row counts, job outcomes, queue depths"""
+    return Response(content=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
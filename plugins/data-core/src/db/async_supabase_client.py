@@ -0,0 +1,390 @@
+import asyncio
+import importlib.util
+import random
+from typing import Dict, List, Any, Optional, Set, Tuple
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.exceptions import APIError
+from postgrest.types import ReturnMethod
+from src.utils.config import settings
+from src.utils.logger import logger
+
+# Failures where the request never reached the server; always safe to retry
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Failures after the request may have been applied; retried only for idempotent calls
+TRANSIENT_ERRORS = (httpx.ReadTimeout, httpx.WriteTimeout, httpx.ReadError, httpx.WriteError, httpx.RemoteProtocolError)
+TRANSIENT_STATUS_CODES = {"408", "429", "500", "502", "503", "504"}
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """PostgREST client whose session uses a shared, size-limited HTTP/2 connection pool"""
+
+    def __init__(self, base_url: str, headers: Dict[str, str], timeout: httpx.Timeout, limits: httpx.Limits, http2: bool):
+        self._limits = limits
+        self._http2 = http2
+        super().__init__(base_url, headers={**headers, "Accept": "application/json", "Content-Type": "application/json"}, timeout=timeout)
+
+    def create_session(self, base_url: str, headers: Dict[str, str], timeout: httpx.Timeout) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=self._limits,
+            http2=self._http2
+        )
+
+
+class AsyncSupabaseClient:
+    """
+    Non-blocking counterpart of SupabaseClient for use from async code
+    Requests share one pooled connection, at most settings.db_max_concurrency run
+    at once, and transient failures are retried with exponential backoff and full jitter.
+    """
+
+    def __init__(self):
+        self._client: Optional[PooledPostgrestClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def client(self) -> PooledPostgrestClient:
+        if self._client is None:
+            http2 = settings.db_http2 and importlib.util.find_spec("h2") is not None
+            if settings.db_http2 and not http2:
+                logger.warning("h2 is not installed; database connections fall back to HTTP/1.1")
+
+            self._client = PooledPostgrestClient(
+                f"{settings.supabase_url}/rest/v1",
+                headers={
+                    "apikey": settings.supabase_service_key,
+                    "Authorization": f"Bearer {settings.supabase_service_key}"
+                },
+                timeout=httpx.Timeout(settings.db_timeout_seconds, connect=settings.db_connect_timeout_seconds),
+                limits=httpx.Limits(
+                    max_connections=settings.db_max_connections,
+                    max_keepalive_connections=settings.db_max_connections
+                ),
+                http2=http2
+            )
+            logger.info(f"Async Supabase client initialized (http2={http2}, max concurrency {settings.db_max_concurrency})")
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.db_max_concurrency)
+        return self._semaphore
+
+    async def close(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+            logger.info("Async Supabase client closed")
+
+    @staticmethod
+    def _is_retryable(error: Exception, idempotent: bool) -> bool:
+        if isinstance(error, CONNECT_ERRORS):
+            return True
+        if not idempotent:
+            return False
+        if isinstance(error, TRANSIENT_ERRORS):
+            return True
+        return isinstance(error, APIError) and str(error.code) in TRANSIENT_STATUS_CODES
+
+    async def _execute(
+        self,
+        query,
+        idempotent: bool = True,
+        max_retries: Optional[int] = None,
+        backoff: Optional[float] = None
+    ) -> Tuple[Any, int]:
+        """
+        Run a built query under the concurrency limit, retrying transient failures
+        Returns: (response, attempts)
+        """
+        max_retries = settings.db_max_retries if max_retries is None else max_retries
+        backoff = settings.db_retry_backoff_seconds if backoff is None else backoff
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with self.semaphore:
+                    return await query.execute(), attempt
+            except Exception as e:
+                if attempt > max_retries or not self._is_retryable(e, idempotent):
+                    e.attempts = attempt
+                    raise
+                delay = random.uniform(0, min(settings.db_retry_max_backoff_seconds, backoff * 2 ** (attempt - 1)))
+                logger.warning(f"Database request failed (attempt {attempt}), retrying in {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+
+    async def insert_raw_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert raw event into events_raw table"""
+        try:
+            result, _ = await self._execute(self.client.table("events_raw").insert(event), idempotent=False)
+            return result.data[0] if result.data else {}
+        except Exception as e:
+            logger.error(f"Error inserting raw event: {e}")
+            raise
+
+    async def insert_normalized_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert normalized event into events_normalized table"""
+        try:
+            result, _ = await self._execute(self.client.table("events_normalized").insert(event), idempotent=False)
+            return result.data[0] if result.data else {}
+        except Exception as e:
+            logger.error(f"Error inserting normalized event: {e}")
+            raise
+
+    async def bulk_insert(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        chunk_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        on_conflict: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert many rows into a table in size-capped chunks, sent concurrently.
+        With on_conflict, rows that collide with that unique key are silently skipped
+        and read timeouts are retried as well as connection failures.
+        Returns one result per chunk: {chunk, rows, inserted, attempts, error}
+        """
+        chunk_size = chunk_size or settings.insert_batch_size
+        max_retries = settings.insert_max_retries if max_retries is None else max_retries
+
+        async def insert_chunk(chunk_index: int, chunk: List[Dict[str, Any]]) -> Dict[str, Any]:
+            if on_conflict:
+                query = self.client.table(table).upsert(
+                    chunk, on_conflict=on_conflict, ignore_duplicates=True, returning=ReturnMethod.minimal
+                )
+            else:
+                query = self.client.table(table).insert(chunk, returning=ReturnMethod.minimal)
+
+            result = {"chunk": chunk_index, "rows": len(chunk), "inserted": 0, "attempts": 0, "error": None}
+            try:
+                _, result["attempts"] = await self._execute(
+                    query,
+                    idempotent=bool(on_conflict),
+                    max_retries=max_retries,
+                    backoff=settings.insert_retry_backoff_seconds
+                )
+                result["inserted"] = len(chunk)
+            except Exception as e:
+                result["attempts"] = getattr(e, "attempts", 1)
+                result["error"] = str(e)
+                logger.error(f"Chunk {chunk_index} into {table} failed after {result['attempts']} attempts: {e}")
+            return result
+
+        results = await asyncio.gather(*(
+            insert_chunk(chunk_index, rows[start:start + chunk_size])
+            for chunk_index, start in enumerate(range(0, len(rows), chunk_size))
+        ))
+
+        inserted = sum(r["inserted"] for r in results)
+        logger.info(f"Bulk inserted {inserted}/{len(rows)} rows into {table} in {len(results)} chunks")
+        return list(results)
+
+    async def insert_raw_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Bulk insert raw events into events_raw table, skipping content hashes already stored"""
+        return await self.bulk_insert("events_raw", events, on_conflict=self._hash_conflict(events))
+
+    async def insert_normalized_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Bulk insert normalized events into events_normalized table, skipping content hashes already stored"""
+        return await self.bulk_insert("events_normalized", events, on_conflict=self._hash_conflict(events))
+
+    @staticmethod
+    def _hash_conflict(events: List[Dict[str, Any]]) -> Optional[str]:
+        return "content_hash" if events and "content_hash" in events[0] else None
+
+    async def get_existing_content_hashes(self, hashes: List[str], chunk_size: int = 100) -> Set[str]:
+        """Return the subset of content hashes already present in events_normalized"""
+        results = await asyncio.gather(*(
+            self._execute(self.client.table("events_normalized").select("content_hash").in_("content_hash", hashes[start:start + chunk_size]))
+            for start in range(0, len(hashes), chunk_size)
+        ))
+        return {row["content_hash"] for result, _ in results for row in result.data or []}
+
+    async def get_recent_content_hashes(self, limit: int = 100000, page_size: int = 1000) -> List[str]:
+        """Get content hashes of the most recently stored normalized events"""
+        rows = await self._paginate(
+            lambda: self.client.table("events_normalized").select("content_hash").order("created_at", desc=True),
+            limit,
+            page_size,
+            "recent content hashes"
+        )
+        return [row["content_hash"] for row in rows if row.get("content_hash")]
+
+    async def insert_quality_metrics(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert data quality metrics"""
+        try:
+            result, _ = await self._execute(self.client.table("data_quality").insert(metrics), idempotent=False)
+            logger.debug(f"Inserted quality metrics for supplier: {metrics.get('supplier_id')}")
+            return result.data[0] if result.data else {}
+        except Exception as e:
+            logger.error(f"Error inserting quality metrics: {e}")
+            raise
+
+    async def merge_quality_rollups(self, rollups: List[Dict[str, Any]]) -> None:
+        """Add per-window quality counts into the stored hourly/daily rollups (merge_data_quality)"""
+        if not rollups:
+            return
+        try:
+            await self._execute(self.client.rpc("merge_data_quality", {"rollups": rollups}), idempotent=False)
+            logger.debug(f"Merged {len(rollups)} quality rollups")
+        except Exception as e:
+            logger.error(f"Error merging quality rollups: {e}")
+            raise
+
+    async def get_quality_rollup(self, supplier_id: str, granularity: str = "day") -> Optional[Dict[str, Any]]:
+        """Get the latest quality rollup window for a supplier"""
+        try:
+            result, _ = await self._execute(
+                self.client.table("data_quality").select("*")
+                .eq("supplier_id", supplier_id).eq("granularity", granularity)
+                .order("window_start", desc=True).limit(1)
+            )
+            return result.data[0] if result.data else None
+        except Exception as e:
+            logger.error(f"Error fetching quality rollup: {e}")
+            return None
+
+    async def get_normalized_events(self, limit: int = 50000, page_size: int = 1000) -> List[Dict[str, Any]]:
+        """Get the most recent normalized events, paging through results"""
+        return await self._paginate(
+            lambda: self.client.table("events_normalized").select("*").order("created_at", desc=True),
+            limit,
+            page_size,
+            "normalized events"
+        )
+
+    async def _paginate(self, build_query, limit: int, page_size: int, description: str) -> List[Dict[str, Any]]:
+        rows = []
+        try:
+            while len(rows) < limit:
+                start = len(rows)
+                end = min(start + page_size, limit) - 1
+                result, _ = await self._execute(build_query().range(start, end))
+                if not result.data:
+                    break
+                rows.extend(result.data)
+                if len(result.data) < end - start + 1:
+                    break
+            return rows
+        except Exception as e:
+            logger.error(f"Error fetching {description}: {e}")
+            return rows
+
+    async def get_outlier_baselines(self, supplier_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get stored outlier distribution summaries for suppliers"""
+        try:
+            result, _ = await self._execute(self.client.table("outlier_baselines").select("*").in_("supplier_id", supplier_ids))
+            return result.data if result.data else []
+        except Exception as e:
+            logger.error(f"Error fetching outlier baselines: {e}")
+            return []
+
+    async def upsert_outlier_baselines(self, baselines: List[Dict[str, Any]]) -> None:
+        """Insert or replace outlier distribution summaries"""
+        try:
+            await self._execute(self.client.table("outlier_baselines").upsert(
+                baselines,
+                on_conflict="supplier_id,event_type,field",
+                returning=ReturnMethod.minimal
+            ))
+            logger.debug(f"Upserted {len(baselines)} outlier baselines")
+        except Exception as e:
+            logger.error(f"Error upserting outlier baselines: {e}")
+            raise
+
+    async def get_column_mappings(self, supplier_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get the registered column mappings of suppliers"""
+        try:
+            result, _ = await self._execute(self.client.table("column_mappings").select("*").in_("supplier_id", supplier_ids))
+            return result.data if result.data else []
+        except Exception as e:
+            logger.error(f"Error fetching column mappings: {e}")
+            return []
+
+    async def upsert_column_mappings(self, mappings: List[Dict[str, Any]]) -> None:
+        """Insert or replace supplier column mappings"""
+        try:
+            await self._execute(self.client.table("column_mappings").upsert(
+                mappings,
+                on_conflict="supplier_id",
+                returning=ReturnMethod.minimal
+            ))
+            logger.debug(f"Upserted {len(mappings)} column mappings")
+        except Exception as e:
+            logger.error(f"Error upserting column mappings: {e}")
+            raise
+
+    async def get_supplier_baseline(self, supplier_id: str) -> Optional[Dict[str, Any]]:
+        """Get baseline data for a supplier"""
+        try:
+            result, _ = await self._execute(self.client.table("suppliers").select("*").eq("id", supplier_id))
+            return result.data[0] if result.data else None
+        except Exception as e:
+            logger.error(f"Error fetching supplier baseline: {e}")
+            return None
+
+    async def insert_ingest_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert ingest job tracking record"""
+        try:
+            result, _ = await self._execute(self.client.table("ingest_jobs").insert(job), idempotent=False)
+            logger.info(f"Created ingest job: {job.get('job_id')}")
+            return result.data[0] if result.data else {}
+        except Exception as e:
+            logger.error(f"Error creating ingest job: {e}")
+            raise
+
+    async def update_ingest_job(self, job_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        """Update ingest job status"""
+        try:
+            result, _ = await self._execute(self.client.table("ingest_jobs").update(updates).eq("job_id", job_id))
+            logger.debug(f"Updated ingest job {job_id}: {updates.get('status')}")
+            return result.data[0] if result.data else {}
+        except Exception as e:
+            logger.error(f"Error updating ingest job: {e}")
+            raise
+
+    async def get_ingest_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get ingest job by ID"""
+        try:
+            result, _ = await self._execute(self.client.table("ingest_jobs").select("*").eq("job_id", job_id))
+            return result.data[0] if result.data else None
+        except Exception as e:
+            logger.error(f"Error fetching ingest job: {e}")
+            return None
+
+    async def get_completed_job_by_file_hash(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Get the most recent completed ingest job for an identical file"""
+        try:
+            result, _ = await self._execute(
+                self.client.table("ingest_jobs")
+                .select("*")
+                .eq("file_hash", file_hash)
+                .eq("status", "complete")
+                .order("created_at", desc=True)
+                .limit(1)
+            )
+            return result.data[0] if result.data else None
+        except Exception as e:
+            logger.error(f"Error fetching ingest job by file hash: {e}")
+            return None
+
+    async def get_all_ingest_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get all ingest jobs (most recent first)"""
+        try:
+            result, _ = await self._execute(self.client.table("ingest_jobs").select("*").order("created_at", desc=True).limit(limit))
+            return result.data if result.data else []
+        except Exception as e:
+            logger.error(f"Error fetching all ingest jobs: {e}")
+            return []
+
+
+# Singleton instance
+async_supabase_client = AsyncSupabaseClient()
@@ -0,0 +1,503 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Any, Optional, Set
+from src.utils.constants import NORMALIZED_TEXT_FIELDS, NORMALIZED_NUMERIC_FIELDS
+from src.processing.quality_metrics import QualityMetrics, ROLLUP_COUNT_COLUMNS
+from src.utils.config import settings
+from src.utils.logger import logger
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS events_raw (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    supplier_id TEXT,
+    timestamp TEXT,
+    payload TEXT,
+    data_source TEXT,
+    content_hash TEXT UNIQUE,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS events_normalized (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    {", ".join(f"{field} TEXT" for field in NORMALIZED_TEXT_FIELDS)},
+    {", ".join(f"{field} REAL" for field in NORMALIZED_NUMERIC_FIELDS)},
+    timestamp TEXT,
+    is_outlier INTEGER DEFAULT 0,
+    content_hash TEXT UNIQUE,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS data_quality (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    supplier_id TEXT,
+    granularity TEXT,
+    window_start TEXT,
+    completeness_pct REAL,
+    predicted_pct REAL,
+    anomalies_count INTEGER,
+    total_rows INTEGER,
+    predicted_count INTEGER,
+    completeness_cells INTEGER,
+    completeness_total INTEGER,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT UNIQUE,
+    status TEXT,
+    filename TEXT,
+    rows_total INTEGER,
+    rows_processed INTEGER,
+    errors TEXT,
+    unmapped_values TEXT,
+    file_hash TEXT,
+    rows_duplicate INTEGER DEFAULT 0,
+    duplicate_of TEXT,
+    stage_metrics TEXT,
+    chunks_received INTEGER,
+    rows_committed INTEGER DEFAULT 0,
+    column_mapping TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS outlier_baselines (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    supplier_id TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    field TEXT NOT NULL,
+    sample_count INTEGER,
+    summary TEXT,
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    UNIQUE (supplier_id, event_type, field)
+);
+
+CREATE TABLE IF NOT EXISTS column_mappings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    supplier_id TEXT NOT NULL UNIQUE,
+    mapping TEXT NOT NULL,
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS suppliers (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_events_raw_supplier ON events_raw(supplier_id);
+CREATE INDEX IF NOT EXISTS idx_events_raw_timestamp ON events_raw(timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_normalized_supplier ON events_normalized(supplier_id);
+CREATE INDEX IF NOT EXISTS idx_events_normalized_timestamp ON events_normalized(timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_normalized_created_at ON events_normalized(created_at);
+CREATE INDEX IF NOT EXISTS idx_data_quality_supplier ON data_quality(supplier_id);
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_job_id ON ingest_jobs(job_id);
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_file_hash ON ingest_jobs(file_hash);
+CREATE INDEX IF NOT EXISTS idx_outlier_baselines_supplier ON outlier_baselines(supplier_id);
+"""
+
+# Columns stored as JSON text
+JSON_COLUMNS = {
+    "events_raw": {"payload"},
+    "ingest_jobs": {"errors", "unmapped_values", "stage_metrics", "column_mapping"},
+    "outlier_baselines": {"summary"},
+    "column_mappings": {"mapping"}
+}
+
+# Columns added after a table was first created; added to existing databases on startup
+ADDED_COLUMNS = {
+    "ingest_jobs": {
+        "stage_metrics": "TEXT",
+        "chunks_received": "INTEGER",
+        "rows_committed": "INTEGER DEFAULT 0",
+        "column_mapping": "TEXT"
+    },
+    "data_quality": {
+        "granularity": "TEXT",
+        "predicted_count": "INTEGER",
+        "completeness_cells": "INTEGER",
+        "completeness_total": "INTEGER",
+        "updated_at": "TEXT"
+    }
+}
+
+# Indexes over added columns, created once ADDED_COLUMNS are in place
+ADDED_INDEXES = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_data_quality_rollup ON data_quality(supplier_id, granularity, window_start);
+CREATE INDEX IF NOT EXISTS idx_data_quality_window ON data_quality(granularity, window_start);
+"""
+
+# Merge of a new rollup window into a stored one: counts are summed, percentages recomputed
+ROLLUP_MERGE = ", ".join(
+    [f"{column} = {column} + excluded.{column}" for column in ROLLUP_COUNT_COLUMNS]
+    + [
+        "completeness_pct = ROUND(100.0 * (completeness_cells + excluded.completeness_cells) "
+        "/ NULLIF(completeness_total + excluded.completeness_total, 0), 2)",
+        "predicted_pct = ROUND(100.0 * (predicted_count + excluded.predicted_count) / NULLIF(total_rows + excluded.total_rows, 0), 2)",
+        "updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+    ]
+)
+
+# Columns stored as 0/1
+BOOLEAN_COLUMNS = {
+    "events_normalized": {"is_outlier"}
+}
+
+
+class LocalStorageClient:
+    """
+    Embedded SQLite implementation of the SupabaseClient interface
+    For on-prem edge sites, offline runs and benchmarks; one connection is shared
+    across threads and serialized with a lock.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.sqlite_path
+        if self.path != ":memory:" and os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+            self._add_missing_columns()
+            self.connection.executescript(ADDED_INDEXES)
+        logger.info(f"Local storage initialized at {self.path}")
+    
+    def _add_missing_columns(self):
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {row["name"] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+            for column, column_type in columns.items():
+                if column not in existing:
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+                    logger.info(f"Added column {table}.{column} to local storage")
+    
+    def close(self):
+        with self._lock:
+            self.connection.close()
+    
+    def _encode(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        json_columns = JSON_COLUMNS.get(table, set())
+        return {
+            key: json.dumps(value) if key in json_columns and value is not None else value
+            for key, value in row.items()
+        }
+    
+    def _decode(self, table: str, row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        for key in JSON_COLUMNS.get(table, set()):
+            if record.get(key) is not None:
+                record[key] = json.loads(record[key])
+        for key in BOOLEAN_COLUMNS.get(table, set()):
+            if record.get(key) is not None:
+                record[key] = bool(record[key])
+        return record
+    
+    def _insert(self, table: str, rows: List[Dict[str, Any]], conflict_clause: str = "") -> List[int]:
+        """Insert rows that share the first row's columns. Returns the new row ids"""
+        columns = list(rows[0].keys())
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"{conflict_clause} RETURNING id"
+        )
+        ids = []
+        with self._lock, self.connection:
+            for row in rows:
+                encoded = self._encode(table, row)
+                result = self.connection.execute(sql, [encoded.get(column) for column in columns]).fetchone()
+                if result is not None:
+                    ids.append(result[0])
+        return ids
+    
+    def _select(self, table: str, sql: str, params: List[Any] = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self.connection.execute(sql, params).fetchall()
+        return [self._decode(table, row) for row in rows]
+    
+    def _get_by_id(self, table: str, row_id: int) -> Dict[str, Any]:
+        rows = self._select(table, f"SELECT * FROM {table} WHERE id = ?", [row_id])
+        return rows[0] if rows else {}
+    
+    def insert_raw_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert raw event into events_raw table"""
+        try:
+            ids = self._insert("events_raw", [event])
+            return self._get_by_id("events_raw", ids[0]) if ids else {}
+        except Exception as e:
+            logger.error(f"Error inserting raw event: {e}")
+            raise
+    
+    def insert_normalized_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert normalized event into events_normalized table"""
+        try:
+            ids = self._insert("events_normalized", [event])
+            return self._get_by_id("events_normalized", ids[0]) if ids else {}
+        except Exception as e:
+            logger.error(f"Error inserting normalized event: {e}")
+            raise
+    
+    def bulk_insert(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        chunk_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        on_conflict: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert many rows into a table, one transaction per chunk.
+        With on_conflict, rows that collide with that unique key are silently skipped.
+        Returns one result per chunk: {chunk, rows, inserted, attempts, error}
+        """
+        chunk_size = chunk_size or settings.insert_batch_size
+        conflict_clause = f"ON CONFLICT({on_conflict}) DO NOTHING" if on_conflict else ""
+        results = []
+        
+        for chunk_index, start in enumerate(range(0, len(rows), chunk_size)):
+            chunk = rows[start:start + chunk_size]
+            result = {"chunk": chunk_index, "rows": len(chunk), "inserted": 0, "attempts": 1, "error": None}
+            try:
+                self._insert(table, chunk, conflict_clause)
+                result["inserted"] = len(chunk)
+            except Exception as e:
+                result["error"] = str(e)
+                logger.error(f"Chunk {chunk_index} into {table} failed: {e}")
+            results.append(result)
+        
+        inserted = sum(r["inserted"] for r in results)
+        logger.info(f"Bulk inserted {inserted}/{len(rows)} rows into {table} in {len(results)} chunks")
+        return results
+    
+    def insert_raw_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Bulk insert raw events into events_raw table, skipping content hashes already stored"""
+        return self.bulk_insert("events_raw", events, on_conflict=self._hash_conflict(events))
+    
+    def insert_normalized_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Bulk insert normalized events into events_normalized table, skipping content hashes already stored"""
+        return self.bulk_insert("events_normalized", events, on_conflict=self._hash_conflict(events))
+    
+    @staticmethod
+    def _hash_conflict(events: List[Dict[str, Any]]) -> Optional[str]:
+        return "content_hash" if events and "content_hash" in events[0] else None
+    
+    def get_existing_content_hashes(self, hashes: List[str], chunk_size: int = 500) -> Set[str]:
+        """Return the subset of content hashes already present in events_normalized"""
+        existing = set()
+        for start in range(0, len(hashes), chunk_size):
+            chunk = hashes[start:start + chunk_size]
+            rows = self._select(
+                "events_normalized",
+                f"SELECT content_hash FROM events_normalized WHERE content_hash IN ({', '.join('?' for _ in chunk)})",
+                chunk
+            )
+            existing.update(row["content_hash"] for row in rows)
+        return existing
+    
+    def get_recent_content_hashes(self, limit: int = 100000, page_size: int = 1000) -> List[str]:
+        """Get content hashes of the most recently stored normalized events"""
+        rows = self._select(
+            "events_normalized",
+            "SELECT content_hash FROM events_normalized WHERE content_hash IS NOT NULL ORDER BY created_at DESC, id DESC LIMIT ?",
+            [limit]
+        )
+        return [row["content_hash"] for row in rows]
+    
+    def insert_quality_metrics(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert data quality metrics"""
+        try:
+            ids = self._insert("data_quality", [metrics])
+            logger.debug(f"Inserted quality metrics for supplier: {metrics.get('supplier_id')}")
+            return self._get_by_id("data_quality", ids[0]) if ids else {}
+        except Exception as e:
+            logger.error(f"Error inserting quality metrics: {e}")
+            raise
+    
+    def merge_quality_rollups(self, rollups: List[Dict[str, Any]]) -> None:
+        """Add per-window quality counts into the stored hourly/daily rollups"""
+        if not rollups:
+            return
+        
+        columns = ["supplier_id", "granularity", "window_start", *ROLLUP_COUNT_COLUMNS, "completeness_pct", "predicted_pct"]
+        try:
+            with self._lock, self.connection:
+                self.connection.executemany(
+                    f"INSERT INTO data_quality ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+                    f"ON CONFLICT(supplier_id, granularity, window_start) DO UPDATE SET {ROLLUP_MERGE}",
+                    [[{**rollup, **QualityMetrics.rollup_percentages(rollup)}[column] for column in columns] for rollup in rollups]
+                )
+            logger.debug(f"Merged {len(rollups)} quality rollups")
+        except Exception as e:
+            logger.error(f"Error merging quality rollups: {e}")
+            raise
+    
+    def get_quality_rollup(self, supplier_id: str, granularity: str = "day") -> Optional[Dict[str, Any]]:
+        """Get the latest quality rollup window for a supplier"""
+        try:
+            rows = self._select(
+                "data_quality",
+                "SELECT * FROM data_quality WHERE supplier_id = ? AND granularity = ? ORDER BY window_start DESC LIMIT 1",
+                [supplier_id, granularity]
+            )
+            return rows[0] if rows else None
+        except Exception as e:
+            logger.error(f"Error fetching quality rollup: {e}")
+            return None
+    
+    def get_normalized_events(self, limit: int = 50000, page_size: int = 1000) -> List[Dict[str, Any]]:
+        """Get the most recent normalized events"""
+        try:
+            return self._select(
+                "events_normalized",
+                "SELECT * FROM events_normalized ORDER BY created_at DESC, id DESC LIMIT ?",
+                [limit]
+            )
+        except Exception as e:
+            logger.error(f"Error fetching normalized events: {e}")
+            return []
+    
+    def get_outlier_baselines(self, supplier_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get stored outlier distribution summaries for suppliers"""
+        try:
+            return self._select(
+                "outlier_baselines",
+                f"SELECT * FROM outlier_baselines WHERE supplier_id IN ({', '.join('?' for _ in supplier_ids)})",
+                supplier_ids
+            )
+        except Exception as e:
+            logger.error(f"Error fetching outlier baselines: {e}")
+            return []
+    
+    def upsert_outlier_baselines(self, baselines: List[Dict[str, Any]]) -> None:
+        """Insert or replace outlier distribution summaries"""
+        try:
+            self._insert(
+                "outlier_baselines",
+                baselines,
+                "ON CONFLICT(supplier_id, event_type, field) DO UPDATE SET "
+                "sample_count = excluded.sample_count, summary = excluded.summary, updated_at = excluded.updated_at"
+            )
+            logger.debug(f"Upserted {len(baselines)} outlier baselines")
+        except Exception as e:
+            logger.error(f"Error upserting outlier baselines: {e}")
+            raise
+    
+    def get_column_mappings(self, supplier_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get the registered column mappings of suppliers"""
+        try:
+            return self._select(
+                "column_mappings",
+                f"SELECT * FROM column_mappings WHERE supplier_id IN ({', '.join('?' for _ in supplier_ids)})",
+                supplier_ids
+            )
+        except Exception as e:
+            logger.error(f"Error fetching column mappings: {e}")
+            return []
+    
+    def upsert_column_mappings(self, mappings: List[Dict[str, Any]]) -> None:
+        """Insert or replace supplier column mappings"""
+        try:
+            self._insert(
+                "column_mappings",
+                mappings,
+                "ON CONFLICT(supplier_id) DO UPDATE SET mapping = excluded.mapping, updated_at = excluded.updated_at"
+            )
+            logger.debug(f"Upserted {len(mappings)} column mappings")
+        except Exception as e:
+            logger.error(f"Error upserting column mappings: {e}")
+            raise
+    
+    def get_supplier_baseline(self, supplier_id: str) -> Optional[Dict[str, Any]]:
+        """Get baseline data for a supplier"""
+        try:
+            rows = self._select("suppliers", "SELECT * FROM suppliers WHERE id = ?", [supplier_id])
+            return rows[0] if rows else None
+        except Exception as e:
+            logger.error(f"Error fetching supplier baseline: {e}")
+            return None
+    
+    def insert_ingest_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert ingest job tracking record"""
+        try:
+            ids = self._insert("ingest_jobs", [job])
+            logger.info(f"Created ingest job: {job.get('job_id')}")
+            return self._get_by_id("ingest_jobs", ids[0]) if ids else {}
+        except Exception as e:
+            logger.error(f"Error creating ingest job: {e}")
+            raise
+    
+    def update_ingest_job(self, job_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        """Update ingest job status"""
+        try:
+            encoded = self._encode("ingest_jobs", updates)
+            assignments = ", ".join(f"{column} = ?" for column in encoded)
+            with self._lock, self.connection:
+                self.connection.execute(
+                    f"UPDATE ingest_jobs SET {assignments} WHERE job_id = ?",
+                    [*encoded.values(), job_id]
+                )
+            logger.debug(f"Updated ingest job {job_id}: {updates.get('status')}")
+            return self.get_ingest_job(job_id) or {}
+        except Exception as e:
+            logger.error(f"Error updating ingest job: {e}")
+            raise
+    
+    def get_ingest_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get ingest job by ID"""
+        try:
+            rows = self._select("ingest_jobs", "SELECT * FROM ingest_jobs WHERE job_id = ?", [job_id])
+            return rows[0] if rows else None
+        except Exception as e:
+            logger.error(f"Error fetching ingest job: {e}")
+            return None
+    
+    def get_completed_job_by_file_hash(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Get the most recent completed ingest job for an identical file"""
+        try:
+            rows = self._select(
+                "ingest_jobs",
+                "SELECT * FROM ingest_jobs WHERE file_hash = ? AND status = 'complete' ORDER BY created_at DESC LIMIT 1",
+                [file_hash]
+            )
+            return rows[0] if rows else None
+        except Exception as e:
+            logger.error(f"Error fetching ingest job by file hash: {e}")
+            return None
+    
+    def get_all_ingest_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get all ingest jobs (most recent first)"""
+        try:
+            return self._select("ingest_jobs", "SELECT * FROM ingest_jobs ORDER BY created_at DESC, id DESC LIMIT ?", [limit])
+        except Exception as e:
+            logger.error(f"Error fetching all ingest jobs: {e}")
+            return []
+
+
+class AsyncLocalStorageClient:
+    """
+    Async facade over LocalStorageClient with the same interface as AsyncSupabaseClient
+    Each call runs in a worker thread so SQLite I/O never blocks the event loop.
+    """
+    
+    def __init__(self, client: LocalStorageClient):
+        self.sync_client = client
+    
+    def __getattr__(self, name: str):
+        method = getattr(self.sync_client, name)
+        
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+        
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
+    
+    async def close(self):
+        """The embedded connection lives as long as the process; nothing to release per app instance"""
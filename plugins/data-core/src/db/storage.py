@@ -0,0 +1,27 @@
+from src.utils.config import settings
+from src.utils.logger import logger
+
+STORAGE_BACKENDS = ("supabase", "sqlite")
+
+
+def _create_backend():
+    """
+    Build the (sync, async) storage clients selected by settings.storage_backend
+    Clients are imported lazily so a local deployment needs no Supabase credentials.
+    """
+    if settings.storage_backend == "supabase":
+        from src.db.supabase_client import supabase_client
+        from src.db.async_supabase_client import async_supabase_client
+        return supabase_client, async_supabase_client
+    
+    if settings.storage_backend == "sqlite":
+        from src.db.local_storage_client import LocalStorageClient, AsyncLocalStorageClient
+        client = LocalStorageClient(settings.sqlite_path)
+        return client, AsyncLocalStorageClient(client)
+    
+    raise ValueError(f"Unknown storage backend: {settings.storage_backend} (expected one of {', '.join(STORAGE_BACKENDS)})")
+
+
+# Singleton instances
+db_client, async_db_client = _create_backend()
+logger.info(f"Storage backend: {settings.storage_backend}")
@@ -1,10 +1,16 @@
 from supabase import create_client, Client
 from src.utils.config import settings
 from src.utils.logger import logger
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any
 
 
 class SupabaseClient:
+    """
+    Blocking client for offline scripts (scripts/train_gap_filler.py)
+    The service itself uses AsyncSupabaseClient; add new storage methods there and
+    only mirror them here when a script needs them.
+    """
+    
     def __init__(self):
         self.client: Client = create_client(
             settings.supabase_url,
@@ -12,82 +18,23 @@ class SupabaseClient:
         )
         logger.info("Supabase client initialized")
     
-    def insert_raw_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
-        """Insert raw event into events_raw table"""
-        try:
-            result = self.client.table("events_raw").insert(event).execute()
-            logger.debug(f"Inserted raw event: {event.get('id', 'unknown')}")
-            return result.data[0] if result.data else {}
-        except Exception as e:
-            logger.error(f"Error inserting raw event: {e}")
-            raise
-    
-    def insert_normalized_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
-        """Insert normalized event into events_normalized table"""
-        try:
-            result = self.client.table("events_normalized").insert(event).execute()
-            logger.debug(f"Inserted normalized event: {event.get('id', 'unknown')}")
-            return result.data[0] if result.data else {}
-        except Exception as e:
-            logger.error(f"Error inserting normalized event: {e}")
-            raise
-    
-    def insert_quality_metrics(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
-        """Insert data quality metrics"""
-        try:
-            result = self.client.table("data_quality").insert(metrics).execute()
-            logger.debug(f"Inserted quality metrics for supplier: {metrics.get('supplier_id')}")
-            return result.data[0] if result.data else {}
-        except Exception as e:
-            logger.error(f"Error inserting quality metrics: {e}")
-            raise
-    
-    def get_supplier_baseline(self, supplier_id: str) -> Optional[Dict[str, Any]]:
-        """Get baseline data for a supplier"""
-        try:
-            result = self.client.table("suppliers").select("*").eq("id", supplier_id).execute()
-            return result.data[0] if result.data else None
-        except Exception as e:
-            logger.error(f"Error fetching supplier baseline: {e}")
-            return None
-    
-    def insert_ingest_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
-        """Insert ingest job tracking record"""
-        try:
-            result = self.client.table("ingest_jobs").insert(job).execute()
-            logger.info(f"Created ingest job: {job.get('job_id')}")
-            return result.data[0] if result.data else {}
-        except Exception as e:
-            logger.error(f"Error creating ingest job: {e}")
-            raise
-    
-    def update_ingest_job(self, job_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
-        """Update ingest job status"""
-        try:
-            result = self.client.table("ingest_jobs").update(updates).eq("job_id", job_id).execute()
-            logger.debug(f"Updated ingest job {job_id}: {updates.get('status')}")
-            return result.data[0] if result.data else {}
-        except Exception as e:
-            logger.error(f"Error updating ingest job: {e}")
-            raise
-    
-    def get_ingest_job(self, job_id: str) -> Optional[Dict[str, Any]]:
-        """Get ingest job by ID"""
-        try:
-            result = self.client.table("ingest_jobs").select("*").eq("job_id", job_id).execute()
-            return result.data[0] if result.data else None
-        except Exception as e:
-            logger.error(f"Error fetching ingest job: {e}")
-            return None
-    
-    def get_all_ingest_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
-        """Get all ingest jobs (most recent first)"""
-        try:
-            result = self.client.table("ingest_jobs").select("*").order("created_at", desc=True).limit(limit).execute()
-            return result.data if result.data else []
-        except Exception as e:
-            logger.error(f"Error fetching all ingest jobs: {e}")
-            return []
+    def get_normalized_events(self, limit: int = 50000, page_size: int = 1000) -> List[Dict[str, Any]]:
+        """Get the most recent normalized events, paging through results"""
+        events = []
+        try:
+            while len(events) < limit:
+                start = len(events)
+                end = min(start + page_size, limit) - 1
+                result = self.client.table("events_normalized").select("*").order("created_at", desc=True).range(start, end).execute()
+                if not result.data:
+                    break
+                events.extend(result.data)
+                if len(result.data) < end - start + 1:
+                    break
+            return events
+        except Exception as e:
+            logger.error(f"Error fetching normalized events: {e}")
+            return events
 
 
 # Singleton instance
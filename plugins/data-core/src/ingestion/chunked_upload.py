@@ -0,0 +1,218 @@
+import asyncio
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import Dict, Any, Optional, Set, Tuple, AsyncIterator
+from src.ingestion import file_reader
+from src.ingestion.job_queue import ingest_job_queue
+from src.processing.dedup import file_hasher
+from src.db.storage import async_db_client
+from src.utils.config import settings
+from src.utils.logger import logger
+
+# Job statuses in which chunks are accepted, and from which a commit may be (re)tried
+UPLOADING = "uploading"
+COMMITTABLE_STATUSES = (UPLOADING, "failed")
+
+READ_BLOCK_BYTES = 1024 * 1024
+
+
+class ChunkedUploadError(Exception):
+    """Request does not fit the state of a chunked upload; status_code is the HTTP status to answer with"""
+    
+    def __init__(self, message: str, status_code: int = 409):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ChunkedUploadManager:
+    """
+    Resumable upload protocol: initiate → PUT numbered chunks → commit
+    Chunks are spooled to disk as they arrive and appended to the upload file in
+    order, so a dropped connection only costs the chunk in flight; a client asks
+    for the job (chunks_received) and carries on from there. Commit hashes the file
+    and queues it like a regular upload. If processing fails, the file is kept and
+    a repeated commit resumes from the job's rows_committed offset.
+    """
+    
+    def __init__(self, spool_dir: str):
+        self.spool_dir = spool_dir
+        self._locks: Dict[str, asyncio.Lock] = {}
+    
+    def upload_path(self, job_id: str, filename: str) -> str:
+        return os.path.join(self.spool_dir, f"{job_id}{os.path.splitext(filename)[1]}")
+    
+    def parts_dir(self, job_id: str) -> str:
+        return os.path.join(self.spool_dir, f"{job_id}.parts")
+    
+    def _part_path(self, job_id: str, index: int) -> str:
+        return os.path.join(self.parts_dir(job_id), f"{index:08d}.part")
+    
+    def _lock(self, job_id: str) -> asyncio.Lock:
+        return self._locks.setdefault(job_id, asyncio.Lock())
+    
+    async def initiate(self, filename: str) -> Dict[str, Any]:
+        """Create the ingest job and spool directory for a chunked upload"""
+        if not file_reader.is_supported(filename):
+            raise ChunkedUploadError("Unsupported file format. Please upload CSV, Excel, Parquet or Arrow IPC files.", 400)
+        
+        job_id = str(uuid.uuid4())
+        os.makedirs(self.parts_dir(job_id), exist_ok=True)
+        open(self.upload_path(job_id, filename), "wb").close()
+        
+        job = {
+            "job_id": job_id,
+            "status": UPLOADING,
+            "filename": filename,
+            "rows_total": None,
+            "rows_processed": 0,
+            "errors": [],
+            "chunks_received": 0,
+            "rows_committed": 0,
+            "created_at": datetime.utcnow().isoformat()
+        }
+        await async_db_client.insert_ingest_job(job)
+        logger.info(f"Job {job_id}: Chunked upload of {filename} initiated")
+        return job
+    
+    async def _get_job(self, job_id: str) -> Dict[str, Any]:
+        job = await async_db_client.get_ingest_job(job_id)
+        if not job or job.get("chunks_received") is None:
+            raise ChunkedUploadError("Chunked upload not found", 404)
+        return job
+    
+    async def put_chunk(self, job_id: str, index: int, body: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """
+        Spool chunk `index` (numbered from 0) and append every chunk now in sequence to the upload file
+        Re-sending a chunk that was already appended is acknowledged without rewriting it.
+        Returns: {chunk, chunks_received, rows_received}
+        """
+        job = await self._get_job(job_id)
+        if job["status"] != UPLOADING:
+            raise ChunkedUploadError(f"Upload is {job['status']}; chunks are no longer accepted")
+        if index < 0:
+            raise ChunkedUploadError("Chunk numbers start at 0", 400)
+        
+        if index >= job["chunks_received"]:
+            await self._spool_part(job_id, index, body)
+        
+        async with self._lock(job_id):
+            job = await self._get_job(job_id)
+            appended, lines = await asyncio.to_thread(
+                self._append_parts, job_id, job["filename"], job["chunks_received"]
+            )
+            if appended:
+                job = await async_db_client.update_ingest_job(job_id, {
+                    "chunks_received": job["chunks_received"] + appended,
+                    "rows_total": self._rows_received(job.get("rows_total"), lines)
+                })
+        
+        return {"chunk": index, "chunks_received": job["chunks_received"], "rows_received": job.get("rows_total")}
+    
+    async def _spool_part(self, job_id: str, index: int, body: AsyncIterator[bytes]) -> None:
+        max_bytes = settings.upload_chunk_max_mb * 1024 * 1024
+        part_path = self._part_path(job_id, index)
+        temp_path = f"{part_path}.{uuid.uuid4().hex}.tmp"
+        size = 0
+        try:
+            with open(temp_path, "wb") as out:
+                async for data in body:
+                    size += len(data)
+                    if size > max_bytes:
+                        raise ChunkedUploadError(f"Chunk exceeds {settings.upload_chunk_max_mb} MB", 413)
+                    out.write(data)
+            # A chunk only counts once it arrived in full
+            os.replace(temp_path, part_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def _append_parts(self, job_id: str, filename: str, next_index: int) -> Tuple[int, Optional[int]]:
+        """
+        Append consecutive spooled parts, starting at next_index, to the upload file
+        CSV line breaks are counted as the bytes go by (None for other formats)
+        Returns: (parts appended, line breaks appended)
+        """
+        appended = 0
+        lines = 0 if filename.endswith(".csv") else None
+        with open(self.upload_path(job_id, filename), "ab") as out:
+            while os.path.exists(part_path := self._part_path(job_id, next_index + appended)):
+                with open(part_path, "rb") as part:
+                    while data := part.read(READ_BLOCK_BYTES):
+                        out.write(data)
+                        if lines is not None:
+                            lines += data.count(b"\n")
+                os.remove(part_path)
+                appended += 1
+        return appended, lines
+    
+    @staticmethod
+    def _rows_received(rows_total: Optional[int], lines: Optional[int]) -> Optional[int]:
+        """Complete CSV rows so far; None until the header line is complete"""
+        if lines is None:
+            return None
+        if rows_total is None:
+            return lines - 1 if lines else None
+        return rows_total + lines
+    
+    def _hash_file(self, path: str) -> str:
+        hasher = file_hasher()
+        with open(path, "rb") as f:
+            while data := f.read(READ_BLOCK_BYTES):
+                hasher.update(data)
+        return hasher.hexdigest()
+    
+    async def commit(
+        self,
+        job_id: str,
+        chunks: int,
+        sha256: Optional[str] = None,
+        skip_stages: Optional[Set[str]] = None,
+        supplier_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Queue a fully received upload for processing
+        A failed job is queued again and resumes after its rows_committed offset.
+        Returns: {job_id, status, resume_from}
+        """
+        async with self._lock(job_id):
+            job = await self._get_job(job_id)
+            if job["status"] not in COMMITTABLE_STATUSES:
+                raise ChunkedUploadError(f"Upload is {job['status']} and cannot be committed")
+            
+            path = self.upload_path(job_id, job["filename"])
+            if job["status"] == UPLOADING:
+                # Parts after a gap stay spooled until the gap is filled, so they count as missing too
+                if job["chunks_received"] > chunks:
+                    raise ChunkedUploadError(f"{job['chunks_received']} chunks were received, more than the {chunks} committed", 400)
+                missing = list(range(job["chunks_received"], chunks))
+                if missing:
+                    raise ChunkedUploadError(f"Missing chunks: {', '.join(map(str, missing[:20]))}")
+            if not os.path.exists(path):
+                raise ChunkedUploadError("Upload file is no longer available; start a new upload", 410)
+            
+            file_hash = job.get("file_hash") or await asyncio.to_thread(self._hash_file, path)
+            if sha256 and sha256.lower() != file_hash:
+                raise ChunkedUploadError("Checksum mismatch: received file does not match sha256", 400)
+            
+            resume_from = job.get("rows_committed") or 0
+            await async_db_client.update_ingest_job(job_id, {"status": "queued", "file_hash": file_hash})
+            if not ingest_job_queue.submit(
+                job_id, path, job["filename"],
+                skip_stages=skip_stages, file_hash=file_hash, resumable=True, supplier_id=supplier_id
+            ):
+                await async_db_client.update_ingest_job(job_id, {
+                    "status": job["status"],
+                    "errors": (job.get("errors") or []) + ["Too many uploads in progress. Please retry the commit shortly."]
+                })
+                raise ChunkedUploadError("Too many uploads in progress. Please retry shortly.", 429)
+        
+        shutil.rmtree(self.parts_dir(job_id), ignore_errors=True)
+        self._locks.pop(job_id, None)
+        logger.info(f"Job {job_id}: Chunked upload committed, resuming from row {resume_from}")
+        return {"job_id": job_id, "status": "queued", "resume_from": resume_from}
+
+
+# Singleton instance
+chunked_upload_manager = ChunkedUploadManager(settings.upload_spool_dir)
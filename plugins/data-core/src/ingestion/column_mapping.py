@@ -0,0 +1,152 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional
+import pandas as pd
+from src.ingestion.schema_validator import SchemaValidator
+from src.db.storage import async_db_client
+from src.utils.constants import REQUIRED_COLUMNS, OPTIONAL_COLUMNS
+from src.utils.config import settings
+from src.utils.logger import logger
+
+STANDARD_COLUMNS = set(REQUIRED_COLUMNS + OPTIONAL_COLUMNS)
+
+
+class ColumnMappingRegistry:
+    """
+    Confirmed header → standard column mappings per supplier
+    Mappings are persisted to column_mappings and kept in an in-process LRU cache.
+    A supplier's repeat upload with known headers is mapped with dict lookups;
+    only headers the registry has not seen go through fuzzy matching.
+    """
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Optional[Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    async def get(self, supplier_id: str) -> Dict[str, str]:
+        """Registered mapping of a supplier (empty if none)"""
+        return (await self.get_many([supplier_id]))[supplier_id]
+    
+    async def get_many(self, supplier_ids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """Registered mappings of suppliers; cache misses are loaded from the DB in one query"""
+        supplier_ids = list(supplier_ids)
+        with self._lock:
+            missing = [supplier_id for supplier_id in supplier_ids if supplier_id not in self._cache]
+        
+        if missing:
+            loaded = {row["supplier_id"]: row["mapping"] for row in await async_db_client.get_column_mappings(missing)}
+            with self._lock:
+                for supplier_id in missing:
+                    self._put(supplier_id, loaded.get(supplier_id))
+        
+        with self._lock:
+            mappings = {}
+            for supplier_id in supplier_ids:
+                if supplier_id in self._cache:
+                    self._cache.move_to_end(supplier_id)
+                mappings[supplier_id] = dict(self._cache.get(supplier_id) or {})
+            return mappings
+    
+    async def resolve(self, df: pd.DataFrame, supplier_id: Optional[str] = None) -> Dict[str, str]:
+        """
+        Mapping to apply to a frame's headers (only headers that need renaming)
+        The supplier is supplier_id if given, else the first value of the frame's
+        supplier column. Its registered mapping is applied first; remaining unknown
+        headers are fuzzy matched, so a fully registered supplier_id file needs
+        dict lookups only.
+        """
+        unknown = [header for header in df.columns if header not in STANDARD_COLUMNS]
+        if not unknown:
+            return {}
+        
+        # Fuzzy matching finds the supplier column when the file has no supplier_id
+        detected = None
+        if not supplier_id and "supplier_id" not in df.columns:
+            detected = SchemaValidator.detect_header_mapping(list(df.columns))
+        supplier_id = supplier_id or self._first_supplier(df, detected)
+        registered = await self.get(supplier_id) if supplier_id else {}
+        
+        mapping = {header: registered[header] for header in unknown if header in registered}
+        if len(mapping) < len(unknown):
+            if detected is None or mapping:
+                remaining = [header for header in df.columns if header not in mapping]
+                detected = SchemaValidator.detect_header_mapping(remaining + list(mapping.values()))
+            mapping.update({header: column for header, column in detected.items() if header in unknown})
+        
+        # Never map onto a column the frame already has, or two headers onto one column
+        targets = set()
+        for header, column in list(mapping.items()):
+            if column in df.columns or column in targets:
+                del mapping[header]
+            else:
+                targets.add(column)
+        return mapping
+    
+    @staticmethod
+    def _first_supplier(df: pd.DataFrame, detected: Optional[Dict[str, str]]) -> Optional[str]:
+        """First supplier in the frame, from supplier_id or the header detected as supplier_id"""
+        column = "supplier_id" if "supplier_id" in df.columns else next(
+            (header for header, standard in (detected or {}).items() if standard == "supplier_id"),
+            None
+        )
+        if column is None:
+            return None
+        values = df[column].dropna()
+        return str(values.iloc[0]) if len(values) else None
+    
+    async def confirm(self, supplier_ids: Iterable[str], mapping: Dict[str, str]) -> None:
+        """Add a mapping that produced a stored upload to each supplier's registered mapping"""
+        if not mapping:
+            return
+        
+        rows = []
+        now = datetime.utcnow().isoformat()
+        for supplier_id, registered in (await self.get_many(supplier_ids)).items():
+            merged = {**registered, **mapping}
+            if merged == registered:
+                continue
+            with self._lock:
+                self._put(supplier_id, merged)
+            rows.append({"supplier_id": supplier_id, "mapping": merged, "updated_at": now})
+        
+        if rows:
+            try:
+                await async_db_client.upsert_column_mappings(rows)
+                logger.info(f"Registered column mappings for {len(rows)} suppliers")
+            except Exception as e:
+                logger.warning(f"Could not persist column mappings: {e}")
+    
+    async def replace(self, supplier_id: str, mapping: Dict[str, str]) -> Dict[str, str]:
+        """
+        Set a supplier's confirmed mapping, replacing what was registered
+        Raises ValueError if a target is not a standard column
+        """
+        invalid = sorted(set(mapping.values()) - STANDARD_COLUMNS)
+        if invalid:
+            raise ValueError(f"Not standard columns: {', '.join(invalid)}")
+        
+        await async_db_client.upsert_column_mappings([
+            {"supplier_id": supplier_id, "mapping": mapping, "updated_at": datetime.utcnow().isoformat()}
+        ])
+        with self._lock:
+            self._put(supplier_id, dict(mapping))
+        return mapping
+    
+    def _put(self, supplier_id: str, mapping: Optional[Dict[str, str]]):
+        self._cache[supplier_id] = mapping
+        self._cache.move_to_end(supplier_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+
+def supplier_ids(df: pd.DataFrame) -> List[str]:
+    """Distinct supplier ids of a (mapped) frame"""
+    if "supplier_id" not in df.columns:
+        return []
+    return [str(value) for value in df["supplier_id"].dropna().unique()]
+
+
+# Singleton instance
+column_mapping_registry = ColumnMappingRegistry(max_entries=settings.column_mapping_cache_size)
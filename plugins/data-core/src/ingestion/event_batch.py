@@ -0,0 +1,212 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+import pandas as pd
+from src.ingestion import file_reader
+from src.ingestion.schema_validator import SchemaValidator
+from src.processing.normalizer import DataNormalizer
+from src.processing.serializer import RecordSerializer
+from src.processing.dedup import event_deduplicator, tag_content_hashes
+from src.processing.quality_metrics import QualityMetrics
+from src.db.storage import async_db_client
+from src.utils.config import settings
+from src.utils.logger import logger
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+PARQUET_CONTENT_TYPES = ("application/vnd.apache.parquet", "application/x-parquet")
+ARROW_CONTENT_TYPES = ("application/vnd.apache.arrow.stream", "application/vnd.apache.arrow.file")
+
+
+def is_columnar(content_type: str) -> bool:
+    """Whether a request body is Parquet or Arrow IPC rather than JSON"""
+    return content_type.split(";")[0].strip().lower() in PARQUET_CONTENT_TYPES + ARROW_CONTENT_TYPES
+
+
+def parse_columnar_batch(body: bytes, content_type: str) -> pd.DataFrame:
+    """
+    Read a Parquet or Arrow IPC request body into a typed DataFrame
+    Raises file_reader.FileFormatError if the body is not in the declared format
+    """
+    parquet = content_type.split(";")[0].strip().lower() in PARQUET_CONTENT_TYPES
+    return file_reader.read_arrow_buffer(body, parquet=parquet)
+
+
+def parse_event_batch(body: bytes, content_type: str = "") -> Tuple[List[Any], Dict[int, List[str]]]:
+    """
+    Parse a JSON array or NDJSON (one event per line) request body
+    NDJSON lines that are not valid JSON are kept as None so indexes stay aligned;
+    blank lines are ignored and do not count towards indexes.
+    Raises ValueError if a JSON array body cannot be parsed at all
+    Returns: (events, {index: parse errors})
+    """
+    text = body.decode("utf-8")
+    is_ndjson = content_type.split(";")[0].strip().lower() in NDJSON_CONTENT_TYPES
+    
+    if not is_ndjson and text.lstrip().startswith("["):
+        events = json.loads(text)
+        return events, {}
+    
+    events = []
+    errors = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            events.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            errors[len(events)] = [f"Invalid JSON: {e.msg}"]
+            events.append(None)
+    return events, errors
+
+
+def _normalized_records(events: List[Dict[str, Any]], report: Optional[Dict[str, Dict[str, int]]]) -> List[Dict[str, Any]]:
+    _, normalized_events = _frame_records(pd.DataFrame.from_records(events), list(range(len(events))), report)
+    return normalized_events
+
+
+async def store_events(events: List[Dict[str, Any]], report: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, Any]:
+    """
+    Normalize, deduplicate and bulk insert already-validated events
+    Returns: {stored, duplicates, errors: {position in events: errors} for rows in failed insert chunks}
+    """
+    if not events:
+        return {"stored": 0, "duplicates": 0, "errors": {}}
+    
+    normalized_events = await asyncio.to_thread(_normalized_records, events, report)
+    
+    created_at = datetime.utcnow().isoformat()
+    raw_events = [
+        {
+            "supplier_id": event.get("supplier_id"),
+            "timestamp": event.get("timestamp"),
+            "payload": event,
+            "data_source": "api",
+            "created_at": created_at
+        }
+        for event in events
+    ]
+    return await _store_records(raw_events, normalized_events)
+
+
+async def record_quality_rollups(df: pd.DataFrame) -> None:
+    """
+    Fold newly stored rows into the per-supplier hourly/daily quality rollups
+    Rollups are derived data, so a failed merge is logged instead of failing an
+    ingest whose events are already stored.
+    """
+    try:
+        rollups = await asyncio.to_thread(QualityMetrics.calculate_rollups, df)
+        await async_db_client.merge_quality_rollups(rollups)
+    except Exception as e:
+        logger.warning(f"Quality rollups not updated for {len(df)} rows: {e}")
+
+
+async def _store_records(raw_events: List[Dict[str, Any]], normalized_events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Deduplicate and bulk insert aligned raw/normalized records
+    Returns: {stored, duplicates, errors: {record position: errors} for rows in failed insert chunks}
+    """
+    received = len(normalized_events)
+    raw_events, normalized_events, kept = await event_deduplicator.filter_records(raw_events, normalized_events)
+    
+    raw_results, normalized_results = await asyncio.gather(
+        async_db_client.insert_raw_events(raw_events),
+        async_db_client.insert_normalized_events(normalized_events)
+    )
+    
+    # Both tables are chunked identically, so a failed chunk maps back to event positions
+    errors = {}
+    for table, results in (("events_raw", raw_results), ("events_normalized", normalized_results)):
+        for result in results:
+            if not result["error"]:
+                continue
+            start = result["chunk"] * settings.insert_batch_size
+            for position in kept[start:start + result["rows"]]:
+                errors.setdefault(position, []).append(f"Insert into {table} failed: {result['error']}")
+    
+    # Only rows that reached events_normalized count towards the quality rollups
+    stored = [
+        normalized_events[position]
+        for r in normalized_results if not r["error"]
+        for position in range(r["chunk"] * settings.insert_batch_size, r["chunk"] * settings.insert_batch_size + r["rows"])
+    ]
+    if stored:
+        await record_quality_rollups(pd.DataFrame(stored))
+    
+    return {
+        "stored": sum(r["inserted"] for r in normalized_results),
+        "duplicates": received - len(kept),
+        "errors": errors
+    }
+
+
+async def ingest_event_batch(events: List[Any], parse_errors: Optional[Dict[int, List[str]]] = None) -> Dict[str, Any]:
+    """
+    Validate, normalize and bulk insert a batch of events
+    Invalid events are skipped and reported by index instead of failing the batch
+    Returns: {received, stored, rejected, errors: [{index, errors}], unmapped_values}
+    """
+    errors = await asyncio.to_thread(SchemaValidator.validate_events, events)
+    errors.update(parse_errors or {})
+    
+    valid_indexes = [i for i in range(len(events)) if i not in errors]
+    valid_events = [events[i] for i in valid_indexes]
+    unmapped_values = {}
+    
+    result = await store_events(valid_events, report=unmapped_values)
+    return _batch_result(len(events), errors, valid_indexes, result, unmapped_values)
+
+
+def _frame_records(
+    df: pd.DataFrame,
+    valid_indexes: List[int],
+    report: Dict[str, Dict[str, int]]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    if len(valid_indexes) < len(df):
+        df = df.iloc[valid_indexes].reset_index(drop=True)
+    if "timestamp" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+        df["timestamp"] = pd.to_datetime(df["timestamp"].astype(str), errors="coerce", utc=True, format="ISO8601")
+    tag_content_hashes(df)
+    DataNormalizer.normalize_dataframe(df, report=report, inplace=True)
+    return RecordSerializer.to_records(df, data_source="api")
+
+
+async def ingest_event_frame(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Validate, normalize and bulk insert a columnar (Parquet/Arrow) batch of events
+    Typed columns go straight through without string coercion; invalid rows are
+    skipped and reported by row index like ingest_event_batch
+    Returns: {received, stored, rejected, errors: [{index, errors}], unmapped_values}
+    """
+    errors = await asyncio.to_thread(SchemaValidator.validate_rows, df)
+    valid_indexes = [i for i in range(len(df)) if i not in errors]
+    unmapped_values = {}
+    
+    result = {"stored": 0, "duplicates": 0, "errors": {}}
+    if valid_indexes:
+        raw_events, normalized_events = await asyncio.to_thread(_frame_records, df, valid_indexes, unmapped_values)
+        result = await _store_records(raw_events, normalized_events)
+    return _batch_result(len(df), errors, valid_indexes, result, unmapped_values)
+
+
+def _batch_result(
+    received: int,
+    errors: Dict[int, List[str]],
+    valid_indexes: List[int],
+    result: Dict[str, Any],
+    unmapped_values: Dict[str, Dict[str, int]]
+) -> Dict[str, Any]:
+    """Merge insert failures into the validation errors and build the batch response"""
+    for position, messages in result["errors"].items():
+        errors.setdefault(valid_indexes[position], []).extend(messages)
+    
+    logger.info(f"Batch ingest: {result['stored']}/{received} events stored, {result['duplicates']} duplicates, {len(errors)} with errors")
+    return {
+        "received": received,
+        "stored": result["stored"],
+        "duplicates": result["duplicates"],
+        "rejected": received - len(valid_indexes),
+        "errors": [{"index": i, "errors": errors[i]} for i in sorted(errors)],
+        "unmapped_values": unmapped_values
+    }
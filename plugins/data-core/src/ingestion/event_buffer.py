@@ -0,0 +1,112 @@
+import asyncio
+from typing import Dict, Any, List, Optional
+from src.ingestion.event_batch import store_events
+from src.utils.config import settings
+from src.utils.logger import logger
+
+
+class EventWriteBuffer:
+    """
+    Bounded write-behind buffer for single events
+    Events are queued in memory and a flusher task writes them in micro-batches
+    of up to `flush_rows` rows, or whatever has arrived after `flush_interval_ms`.
+    """
+    
+    def __init__(self, max_size: int, flush_rows: int, flush_interval_ms: int, drain_timeout_seconds: float):
+        self.max_size = max_size
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval_ms / 1000
+        self.drain_timeout = drain_timeout_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.duplicates = 0
+        self.failed = 0
+    
+    async def start(self):
+        """Start the flusher task on the running event loop"""
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._task = asyncio.create_task(self._flusher(), name="event-buffer-flusher")
+        logger.info(f"Event write buffer started ({self.flush_rows} rows / {self.flush_interval * 1000:.0f} ms batches)")
+    
+    async def stop(self):
+        """Flush everything still queued, then stop the flusher"""
+        if self._task is None:
+            return
+        
+        pending = self._queue.qsize()
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+            logger.info(f"Event write buffer drained ({pending} events flushed on shutdown)")
+        except asyncio.TimeoutError:
+            logger.error(f"Event write buffer drain timed out; {self._queue.qsize()} events dropped")
+        
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+    
+    def submit(self, event: Dict[str, Any]) -> bool:
+        """Queue a validated event. Returns False if the buffer is full"""
+        if self._queue is None:
+            raise RuntimeError("Event write buffer is not running")
+        
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            return False
+        return True
+    
+    def pending(self) -> int:
+        """Number of events waiting to be written"""
+        return self._queue.qsize() if self._queue is not None else 0
+    
+    async def _flusher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            
+            while len(batch) < self.flush_rows:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        try:
+            result = await store_events(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Event buffer flush of {len(batch)} events failed: {e}")
+            return
+        
+        self.flushed += result["stored"]
+        self.duplicates += result["duplicates"]
+        if result["errors"]:
+            self.failed += len(result["errors"])
+            logger.error(f"Event buffer flush: {len(result['errors'])}/{len(batch)} events failed to insert")
+        logger.debug(f"Event buffer flushed {result['stored']} events")
+
+
+# Singleton instance
+event_write_buffer = EventWriteBuffer(
+    max_size=settings.event_buffer_size,
+    flush_rows=settings.event_flush_rows,
+    flush_interval_ms=settings.event_flush_interval_ms,
+    drain_timeout_seconds=settings.event_drain_timeout_seconds
+)
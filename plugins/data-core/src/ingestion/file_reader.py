@@ -0,0 +1,250 @@
+import warnings
+from typing import Iterator, Optional, Callable, Tuple
+import pandas as pd
+from src.utils.logger import logger
+
+CSV_NA_VALUES = ['', 'NA', 'N/A', 'null', 'NULL']
+
+# Block size used when scanning files without parsing them
+SCAN_BLOCK_BYTES = 1024 * 1024
+
+# Columnar formats read through pyarrow with their column types intact
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.arrow', '.arrows', '.feather', '.ipc')
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx', '.xls') + PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+
+
+class FileFormatError(Exception):
+    """Upload is in a format that cannot be read"""
+
+
+def is_supported(filename: str) -> bool:
+    """Whether the upload extension can be streamed"""
+    return filename.endswith(SUPPORTED_EXTENSIONS)
+
+
+def estimate_rows(path: str, filename: str) -> Optional[int]:
+    """
+    Cheap row count for progress reporting, without parsing the file
+    CSV: line breaks outside quoted fields, minus header. Blank and malformed lines
+    are still counted, so the job's rows_total is replaced by the parsed count after
+    validation. XLSX: sheet dimensions. Parquet: file footer.
+    Arrow IPC file: record batch lengths. None if unknown.
+    """
+    try:
+        if filename.endswith('.csv'):
+            lines = 0
+            quoted = False
+            last = b""
+            with open(path, "rb") as f:
+                while block := f.read(SCAN_BLOCK_BYTES):
+                    lines, quoted = _count_record_breaks(block, lines, quoted)
+                    last = block
+            if last and not last.endswith(b"\n"):
+                lines += 1
+            return max(lines - 1, 0)
+        if filename.endswith('.xlsx'):
+            from openpyxl import load_workbook
+            workbook = load_workbook(path, read_only=True)
+            try:
+                max_row = workbook.active.max_row
+            finally:
+                workbook.close()
+            return max(max_row - 1, 0) if max_row else None
+        if filename.endswith(PARQUET_EXTENSIONS):
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(path).metadata.num_rows
+        if filename.endswith(ARROW_EXTENSIONS):
+            import pyarrow as pa
+            with pa.memory_map(path) as source:
+                reader = _open_arrow_ipc(source)
+                if isinstance(reader, pa.ipc.RecordBatchFileReader):
+                    return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    except Exception as e:
+        logger.warning(f"Could not estimate row count for {filename}: {e}")
+    return None
+
+
+def _count_record_breaks(block: bytes, lines: int, quoted: bool) -> Tuple[int, bool]:
+    """
+    Add the line breaks in block that end a CSV record
+    Line breaks inside a quoted field are skipped; an escaped quote ("") toggles twice.
+    Returns: (line breaks so far, whether block ended inside a quoted field)
+    """
+    for i, part in enumerate(block.split(b'"')):
+        if i:
+            quoted = not quoted
+        if not quoted:
+            lines += part.count(b"\n")
+    return lines, quoted
+
+
+def iter_chunks(
+    path: str,
+    filename: str,
+    chunksize: int,
+    on_warning: Optional[Callable[[str], None]] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream an upload as DataFrames of at most `chunksize` rows
+    Peak memory is bounded by the chunk size, not the file size
+    """
+    if filename.endswith('.csv'):
+        yield from _iter_csv_chunks(path, chunksize, on_warning)
+    elif filename.endswith('.xlsx'):
+        yield from _iter_xlsx_chunks(path, chunksize)
+    elif filename.endswith('.xls'):
+        # Legacy binary Excel cannot be streamed; read once and slice
+        df = pd.read_excel(path)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize].reset_index(drop=True)
+    elif filename.endswith(PARQUET_EXTENSIONS):
+        yield from _iter_parquet_chunks(path, chunksize)
+    elif filename.endswith(ARROW_EXTENSIONS):
+        yield from _iter_arrow_chunks(path, chunksize)
+    else:
+        raise FileFormatError("Unsupported file format. Please upload CSV, Excel, Parquet or Arrow IPC files.")
+
+
+def read_arrow_buffer(body: bytes, parquet: bool = False) -> pd.DataFrame:
+    """
+    Read a Parquet file or Arrow IPC stream/file held in memory into a typed DataFrame
+    Raises FileFormatError if the bytes are not in that format
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    source = pa.BufferReader(body)
+    try:
+        if parquet:
+            table = pq.read_table(source)
+        else:
+            table = _open_arrow_ipc(source).read_all()
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise FileFormatError(f"Could not read {'Parquet' if parquet else 'Arrow IPC'} data: {e}")
+    return _to_pandas(table)
+
+
+def _iter_csv_chunks(path: str, chunksize: int, on_warning: Optional[Callable[[str], None]]) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV in one pass
+    Malformed lines are skipped and reported instead of re-parsing the whole file
+    """
+    reader = pd.read_csv(
+        path,
+        chunksize=chunksize,
+        skipinitialspace=True,  # Skip spaces after delimiter
+        skip_blank_lines=True,   # Skip blank lines
+        na_values=CSV_NA_VALUES,  # Treat these as NaN
+        keep_default_na=True,
+        on_bad_lines='warn'  # Skip malformed lines with a warning
+    )
+    
+    with reader:
+        while True:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always", pd.errors.ParserWarning)
+                try:
+                    chunk = next(reader)
+                except StopIteration:
+                    return
+            
+            if caught and on_warning:
+                for w in caught:
+                    if issubclass(w.category, pd.errors.ParserWarning):
+                        on_warning(f"Warning: Skipped malformed CSV lines: {str(w.message).strip()}")
+            yield chunk
+
+
+def _iter_xlsx_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Stream the active sheet of an XLSX workbook row by row"""
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+        
+        buffer = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            buffer.append(row)
+            if len(buffer) >= chunksize:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def _to_pandas(table) -> pd.DataFrame:
+    """
+    Convert an Arrow table to pandas keeping column types
+    Numeric and timestamp columns become numpy-backed without passing through strings;
+    split_blocks avoids consolidating columns into one copied 2D block, so columns
+    without nulls are handed over zero-copy.
+    """
+    return table.to_pandas(split_blocks=True)
+
+
+def _open_arrow_ipc(source):
+    """Reader for an Arrow IPC file, or for an IPC stream if there is no file footer"""
+    import pyarrow as pa
+    
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source)
+
+
+def _record_batches(reader):
+    """Record batches from an IPC file or stream reader"""
+    import pyarrow as pa
+    
+    if isinstance(reader, pa.ipc.RecordBatchFileReader):
+        return (reader.get_batch(i) for i in range(reader.num_record_batches))
+    return iter(reader)
+
+
+def _rechunk(batches, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Regroup Arrow record batches of any size into DataFrames of `chunksize` rows"""
+    import pyarrow as pa
+    
+    pending = []
+    pending_rows = 0
+    for batch in batches:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= chunksize:
+            table = pa.Table.from_batches(pending)
+            yield _to_pandas(table.slice(0, chunksize))
+            rest = table.slice(chunksize)
+            pending = rest.to_batches()
+            pending_rows = rest.num_rows
+    if pending_rows:
+        yield _to_pandas(pa.Table.from_batches(pending))
+
+
+def _iter_parquet_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Stream a Parquet file row group by row group"""
+    import pyarrow.parquet as pq
+    
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    try:
+        yield from _rechunk(parquet_file.iter_batches(batch_size=chunksize), chunksize)
+    finally:
+        parquet_file.close()
+
+
+def _iter_arrow_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Stream an Arrow IPC file or stream from a memory map without copying it into memory"""
+    import pyarrow as pa
+    
+    with pa.memory_map(path) as source:
+        yield from _rechunk(_record_batches(_open_arrow_ipc(source)), chunksize)
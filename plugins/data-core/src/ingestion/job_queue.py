@@ -0,0 +1,106 @@
+import asyncio
+import os
+from typing import Optional, List, Dict, Tuple, Any
+from src.ingestion.upload_pipeline import process_upload
+from src.db.storage import async_db_client
+from src.utils.config import settings
+from src.utils.logger import logger
+
+
+class IngestJobQueue:
+    """
+    Bounded background worker pool for upload jobs
+    At most `workers` uploads run at once; at most `max_pending` wait in the queue
+    """
+    
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[int, Tuple[str, str, str, Dict[str, Any]]] = {}
+    
+    async def start(self):
+        """Start worker tasks on the running event loop"""
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"ingest-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Ingest job queue started with {self.workers} workers")
+    
+    async def stop(self):
+        """
+        Cancel worker tasks and fail the jobs left behind
+        Queued jobs and jobs interrupted mid-run are marked failed and their spooled
+        files removed, except resumable uploads, whose file is kept so a new commit
+        resumes them
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        
+        abandoned = list(self._running.values())
+        self._running = {}
+        while self._queue is not None and not self._queue.empty():
+            abandoned.append(self._queue.get_nowait())
+            self._queue.task_done()
+        for job_id, path, filename, options in abandoned:
+            await self._fail_abandoned(job_id, path, options)
+        logger.info(f"Ingest job queue stopped, {len(abandoned)} unfinished jobs failed")
+    
+    def submit(self, job_id: str, path: str, filename: str, **options: Any) -> bool:
+        """
+        Queue an upload for processing; options are passed on to process_upload
+        Returns False if the queue is full
+        """
+        if self._queue is None:
+            raise RuntimeError("Ingest job queue is not running")
+        
+        try:
+            self._queue.put_nowait((job_id, path, filename, options))
+        except asyncio.QueueFull:
+            return False
+        
+        logger.info(f"Job {job_id}: Queued ({self._queue.qsize()} pending)")
+        return True
+    
+    def pending(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize() if self._queue is not None else 0
+    
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            job_id, path, filename, options = job
+            # Stays set if the worker is cancelled mid-job, so stop() can fail the job
+            self._running[worker_id] = job
+            try:
+                logger.info(f"Worker {worker_id}: Starting job {job_id}")
+                await process_upload(job_id, path, filename, **options)
+            except Exception as e:
+                logger.error(f"Worker {worker_id}: Job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+            del self._running[worker_id]
+    
+    async def _fail_abandoned(self, job_id: str, path: str, options: Dict[str, Any]):
+        resumable = options.get("resumable", False)
+        retry_hint = "commit the upload again to resume it" if resumable else "upload the file again"
+        try:
+            await async_db_client.update_ingest_job(job_id, {
+                "status": "failed",
+                "errors": [f"Service stopped before the upload finished; {retry_hint}"]
+            })
+        except Exception as e:
+            logger.error(f"Job {job_id}: Could not mark job failed on shutdown: {e}")
+        if not resumable and os.path.exists(path):
+            os.remove(path)
+
+
+# Singleton instance
+ingest_job_queue = IngestJobQueue(
+    workers=settings.ingest_workers,
+    max_pending=settings.ingest_queue_size
+)
@@ -1,5 +1,6 @@
 from typing import Dict, List, Any, Tuple
 import pandas as pd
+import numpy as np
 from datetime import datetime
 from src.utils.constants import REQUIRED_COLUMNS, OPTIONAL_COLUMNS
 from src.utils.logger import logger
@@ -25,8 +26,8 @@ class SchemaValidator:
         if df.empty:
             errors.append("DataFrame is empty")
         
-        # Validate timestamp format
-        if "timestamp" in df.columns:
+        # Validate timestamp format (already-parsed columns are not parsed again)
+        if "timestamp" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
             try:
                 pd.to_datetime(df["timestamp"])
             except Exception as e:
@@ -73,18 +74,91 @@ class SchemaValidator:
         is_valid = len(errors) == 0
         return is_valid, errors
     
+    @staticmethod
+    def validate_events(events: List[Any]) -> Dict[int, List[str]]:
+        """
+        Validate a batch of events column-wise with the same rules as validate_event
+        (a required field that is null counts as missing)
+        Returns: {batch index: list_of_errors} for invalid events only
+        """
+        errors: Dict[int, List[str]] = {}
+        
+        # Anything that is not a JSON object is rejected outright
+        positions = np.array([i for i, event in enumerate(events) if isinstance(event, dict)], dtype=int)
+        for i, event in enumerate(events):
+            if not isinstance(event, dict):
+                errors[i] = ["Event must be a JSON object"]
+        if len(positions) == 0:
+            return errors
+        
+        df = pd.DataFrame.from_records([events[i] for i in positions])
+        for index, messages in SchemaValidator.validate_rows(df).items():
+            errors.setdefault(int(positions[index]), []).extend(messages)
+        
+        return errors
+    
+    @staticmethod
+    def validate_rows(df: pd.DataFrame) -> Dict[int, List[str]]:
+        """
+        Validate each row of an event DataFrame with the same rules as validate_event
+        Columns that are already typed (datetime timestamps, numeric fields) are not
+        coerced from strings again; only their missing values are checked.
+        Returns: {row position: list_of_errors} for invalid rows only
+        """
+        errors: Dict[int, List[str]] = {}
+        
+        def add(mask: np.ndarray, message: str):
+            for index in np.flatnonzero(mask):
+                errors.setdefault(int(index), []).append(message)
+        
+        # Check required fields
+        for field in REQUIRED_COLUMNS:
+            if field not in df.columns:
+                add(np.ones(len(df), dtype=bool), f"Missing required field: {field}")
+            else:
+                add(df[field].isna().to_numpy(), f"Missing required field: {field}")
+        
+        # Validate timestamps
+        if "timestamp" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+            present = df["timestamp"].notna()
+            parsed = pd.to_datetime(df["timestamp"].astype(str), errors="coerce", utc=True, format="ISO8601")
+            add((present & parsed.isna()).to_numpy(), "Invalid timestamp: not an ISO 8601 timestamp")
+        
+        # Validate numeric fields
+        numeric_fields = ["distance_km", "load_kg", "energy_kwh", "speed"]
+        for field in numeric_fields:
+            if field not in df.columns or pd.api.types.is_numeric_dtype(df[field]):
+                continue
+            present = df[field].notna()
+            try:
+                numeric = pd.to_numeric(df[field], errors="coerce")
+            except TypeError:
+                # Nested objects/lists in the column; coerce value by value
+                numeric = pd.to_numeric(df[field].map(lambda v: v if np.isscalar(v) else None), errors="coerce")
+            add((present & numeric.isna()).to_numpy(), f"Invalid numeric value for {field}")
+        
+        return errors
+    
     @staticmethod
     def detect_column_mapping(df: pd.DataFrame) -> Dict[str, str]:
         """
         Auto-detect column mappings using fuzzy matching
+        Headers are compared case-insensitively with spaces and hyphens read as
+        underscores; a standard column the frame already has is never mapped to.
         Returns: dict mapping detected_column -> standard_column
         """
+        return SchemaValidator.detect_header_mapping(list(df.columns))
+    
+    @staticmethod
+    def detect_header_mapping(headers: List[str]) -> Dict[str, str]:
+        """detect_column_mapping on a list of headers; see there"""
         mapping = {}
         
         # Simple fuzzy matching rules
         fuzzy_rules = {
             "timestamp": ["time", "date", "datetime", "created_at"],
             "supplier_id": ["supplier", "vendor_id", "vendor"],
+            "event_type": ["type", "event"],
             "distance_km": ["distance", "dist", "km"],
             "load_kg": ["load", "weight", "cargo"],
             "vehicle_type": ["vehicle", "transport_type"],
@@ -92,15 +166,25 @@ class SchemaValidator:
             "energy_kwh": ["energy", "power"],
         }
         
-        df_columns_lower = {col.lower(): col for col in df.columns}
+        normalized_headers = {}
+        for header in headers:
+            normalized_headers.setdefault(normalize_header(header), header)
         
-        for standard_col, alternatives in fuzzy_rules.items():
-            for alt in alternatives:
-                if alt in df_columns_lower:
-                    mapping[df_columns_lower[alt]] = standard_col
+        for standard_col in REQUIRED_COLUMNS + OPTIONAL_COLUMNS:
+            if standard_col in headers:
+                continue
+            for alt in [standard_col] + fuzzy_rules.get(standard_col, []):
+                header = normalized_headers.get(alt)
+                if header is not None and header not in mapping:
+                    mapping[header] = standard_col
                     break
         
         if mapping:
             logger.info(f"Auto-detected column mappings: {mapping}")
         
         return mapping
+
+
+def normalize_header(header: Any) -> str:
+    """Header as compared for mapping: lower case, trimmed, spaces/hyphens as underscores"""
+    return "_".join(str(header).strip().lower().replace("-", " ").split())
@@ -0,0 +1,298 @@
+import asyncio
+import os
+import time
+from typing import Dict, Any, List, Optional, Callable, AsyncIterator, Set
+import httpx
+import pandas as pd
+
+from src.ingestion import file_reader
+from src.ingestion.event_batch import record_quality_rollups
+from src.ingestion.column_mapping import column_mapping_registry, supplier_ids
+from src.processing.pipeline import (
+    PipelineContext, PipelineValidationError, OUTLIERS, validation_pipeline, processing_pipeline, log_stage_timings
+)
+from src.processing.streaming_stats import OutlierStatistics
+from src.processing.outlier_baselines import outlier_baseline_store, BASELINE_GROUP_COLUMNS
+from src.processing.serializer import RecordSerializer
+from src.processing.dedup import event_deduplicator
+from src.db.storage import async_db_client
+from src.utils.constants import OUTLIER_FIELDS
+from src.utils.config import settings
+from src.utils.logger import logger
+from src.utils.metrics import INGEST_JOBS, INGEST_JOB_SECONDS
+
+# Orchestration engine URL
+ORCHESTRATION_URL = os.getenv("ORCHESTRATION_ENGINE_URL", "http://localhost:8000")
+
+
+class UploadError(Exception):
+    """Upload could not be processed; errors are recorded on the ingest job"""
+    
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+async def update_job(job_id: str, updates: Dict[str, Any]) -> None:
+    """Update the ingest job"""
+    await async_db_client.update_ingest_job(job_id, updates)
+
+
+def job_stage_metrics(validation_context: PipelineContext, processing_context: PipelineContext) -> Dict[str, Any]:
+    """Per-stage metrics of both passes, as stored on the ingest job"""
+    return {
+        "validation": validation_context.metrics_summary(),
+        "processing": processing_context.metrics_summary()
+    }
+
+
+async def stream_chunks(
+    path: str,
+    filename: str,
+    context: PipelineContext,
+    on_warning: Optional[Callable[[str], None]] = None
+) -> AsyncIterator[pd.DataFrame]:
+    """Stream an upload chunk by chunk, parsing in a worker thread; parse time is measured as the "read" stage"""
+    chunks = file_reader.iter_chunks(path, filename, settings.ingest_chunk_rows, on_warning=on_warning)
+    try:
+        while True:
+            with context.measure("read") as call:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                call.rows_in = call.rows_out = len(chunk) if chunk is not None else 0
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        chunks.close()
+
+
+async def insert_chunk(chunk_start: int, raw_events: List[Dict[str, Any]], normalized_events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Bulk insert one chunk of records
+    Returns: {rows_inserted, stored: positions of the records stored in events_normalized, errors}
+    """
+    raw_results, normalized_results = await asyncio.gather(
+        async_db_client.insert_raw_events(raw_events),
+        async_db_client.insert_normalized_events(normalized_events)
+    )
+    
+    errors = [
+        f"{table} rows {chunk_start + r['chunk'] * settings.insert_batch_size}+ ({r['rows']} rows) failed after {r['attempts']} attempts: {r['error']}"
+        for table, results in (("events_raw", raw_results), ("events_normalized", normalized_results))
+        for r in results if r["error"]
+    ]
+    stored = [
+        position
+        for r in normalized_results if not r["error"]
+        for position in range(r["chunk"] * settings.insert_batch_size, r["chunk"] * settings.insert_batch_size + r["rows"])
+    ]
+    return {"rows_inserted": sum(r["inserted"] for r in normalized_results), "stored": stored, "errors": errors}
+
+
+async def trigger_immediate_analysis() -> None:
+    """Ask the orchestration engine to run hotspot detection now"""
+    logger.info("🚀 Triggering immediate hotspot detection...")
+    try:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.post(f"{ORCHESTRATION_URL}/trigger-analysis")
+            if response.status_code == 200:
+                analysis_result = response.json()
+                logger.info(f"✅ Immediate analysis triggered: {analysis_result.get('hotspots_detected', 0)} hotspots detected")
+            else:
+                logger.warning(f"⚠️ Analysis trigger failed with status {response.status_code}")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not trigger immediate analysis: {e}")
+        # Don't fail the upload if analysis trigger fails
+
+
+async def process_upload(
+    job_id: str,
+    path: str,
+    filename: str,
+    skip_stages: Optional[Set[str]] = None,
+    file_hash: Optional[str] = None,
+    resumable: bool = False,
+    supplier_id: Optional[str] = None
+) -> None:
+    """
+    Run the full ingestion pipeline for a spooled upload, streaming it twice
+    Pass 1 per chunk: parse → validate → accumulate outlier statistics
+    Pass 2 per chunk: parse → normalize → flag outliers → fill gaps → store → quality rollups
+    Then: outlier baselines → analyze
+    Each chunk goes through its pass as one frame modified in place, with
+    timestamps parsed once; skip_stages turns off optional stages for this job.
+    A file identical to one already ingested (same file_hash) is not processed again,
+    and rows already stored by any earlier upload are skipped by content hash.
+    Headers are mapped to standard columns with the mapping resolved from the first
+    chunk (supplier_id, or the file's first supplier, picks the registered mapping);
+    a mapping that produced a stored upload is registered for its suppliers.
+    Outliers are flagged against per-(supplier_id, event_type) history merged with
+    this upload; keys with too few samples use the file-wide bounds.
+    Chunks are settings.ingest_chunk_rows rows so peak memory is bounded by chunk
+    size, and a file that fails validation is rejected before anything is written.
+    CPU-bound stages run in worker threads so the event loop stays responsive.
+    Wall time, rows in/out and RSS change of every stage are kept on the job
+    (stage_metrics) as it runs and exported to /metrics.
+    After each stored chunk the job's rows_committed records the file row offset
+    stored so far. The job fails at the first chunk with insert errors, leaving
+    rows_committed at the end of the last fully stored chunk. A resumable (chunked)
+    upload keeps its file when it fails, and its next run skips pass 2 up to that
+    offset (rows of the failed chunk that did get stored are skipped by content hash).
+    """
+    warnings = []
+    rows_read = 0
+    rows_inserted = 0
+    rows_duplicate = 0
+    skip_stages = skip_stages or set()
+    validation_context = PipelineContext()
+    processing_context = PipelineContext(disabled_stages=skip_stages)
+    started = time.perf_counter()
+    status = "failed"
+    resume_from = 0
+    
+    try:
+        if resumable:
+            job = await async_db_client.get_ingest_job(job_id) or {}
+            resume_from = job.get("rows_committed") or 0
+            rows_inserted = job.get("rows_processed") or 0
+            rows_duplicate = job.get("rows_duplicate") or 0
+        
+        if file_hash and settings.dedup_enabled:
+            previous = await async_db_client.get_completed_job_by_file_hash(file_hash)
+            if previous and previous.get("job_id") != job_id:
+                await update_job(job_id, {
+                    "status": "complete",
+                    "rows_total": previous.get("rows_total"),
+                    "rows_processed": 0,
+                    "rows_duplicate": previous.get("rows_total"),
+                    "duplicate_of": previous["job_id"]
+                })
+                logger.info(f"Job {job_id}: Identical to completed job {previous['job_id']}, skipping")
+                status = "duplicate"
+                return
+        
+        await update_job(job_id, {"status": "parsing"})
+        rows_total = await asyncio.to_thread(file_reader.estimate_rows, path, filename)
+        await update_job(job_id, {"rows_total": rows_total, "status": "validating"})
+        
+        # Pass 1: validate and collect file-wide outlier statistics
+        file_stats = OutlierStatistics(OUTLIER_FIELDS)
+        upload_stats = OutlierStatistics(OUTLIER_FIELDS, BASELINE_GROUP_COLUMNS)
+        validation_context.collect_stats = [file_stats, upload_stats]
+        suppliers = set()
+        async for chunk in stream_chunks(path, filename, validation_context, on_warning=warnings.append):
+            chunk_start = rows_read
+            rows_read += len(chunk)
+            if chunk_start == 0:
+                column_mapping = await column_mapping_registry.resolve(chunk, supplier_id)
+                validation_context.column_mapping = processing_context.column_mapping = column_mapping
+                if column_mapping:
+                    logger.info(f"Job {job_id}: Mapping columns {column_mapping}")
+                    await update_job(job_id, {"column_mapping": column_mapping})
+            
+            try:
+                await asyncio.to_thread(validation_pipeline.run, chunk, validation_context)
+            except PipelineValidationError as e:
+                raise UploadError(e.errors + [
+                    f"Rows {chunk_start + 1}-{rows_read}: ensure your file has at minimum: timestamp, supplier_id, and event_type columns. "
+                    f"Your columns: {', '.join(map(str, chunk.columns))}"
+                ])
+            suppliers.update(supplier_ids(chunk))
+        
+        if rows_read == 0:
+            raise UploadError(["DataFrame is empty"])
+        if OUTLIERS.name not in skip_stages:
+            processing_context.outlier_stats = await outlier_baseline_store.with_history(upload_stats)
+            processing_context.fallback_stats = file_stats
+        await update_job(job_id, {
+            "rows_total": rows_read,
+            "status": "inserting",
+            "stage_metrics": job_stage_metrics(validation_context, processing_context)
+        })
+        
+        # Pass 2: process and store each chunk, after any rows an earlier run committed
+        if resume_from:
+            logger.info(f"Job {job_id}: Resuming after row {resume_from}")
+        rows_done = 0
+        async for chunk in stream_chunks(path, filename, processing_context):
+            chunk_start = rows_done
+            rows_done += len(chunk)
+            if rows_done <= resume_from:
+                continue
+            if chunk_start < resume_from:
+                chunk = chunk.iloc[resume_from - chunk_start:].reset_index(drop=True)
+                chunk_start = resume_from
+            
+            chunk = await asyncio.to_thread(processing_pipeline.run, chunk, processing_context)
+            with processing_context.measure("serialize", len(chunk)):
+                raw_events, normalized_events = await asyncio.to_thread(RecordSerializer.to_records, chunk, "file_upload")
+            with processing_context.measure("dedup", len(chunk)) as call:
+                raw_events, normalized_events, kept = await event_deduplicator.filter_records(raw_events, normalized_events)
+                call.rows_out = len(kept)
+            rows_duplicate += len(chunk) - len(kept)
+            with processing_context.measure("insert", len(kept)) as call:
+                result = await insert_chunk(chunk_start, raw_events, normalized_events)
+                call.rows_out = result["rows_inserted"]
+            rows_inserted += result["rows_inserted"]
+            with processing_context.measure("quality_metrics", len(result["stored"])):
+                await record_quality_rollups(chunk.iloc[[kept[position] for position in result["stored"]]])
+            if result["errors"]:
+                # Stop here so rows_committed never moves past rows that were not stored
+                resume_hint = "; commit again to resume from there" if resumable else ""
+                raise UploadError(result["errors"] + [f"Stopped at row {chunk_start + 1}, the first chunk not fully stored{resume_hint}"])
+            
+            await update_job(job_id, {
+                "rows_processed": rows_inserted,
+                "rows_duplicate": rows_duplicate,
+                "rows_committed": rows_done,
+                "stage_metrics": job_stage_metrics(validation_context, processing_context)
+            })
+            logger.info(f"Job {job_id}: {rows_done}/{rows_read} rows processed, {rows_inserted} inserted, {rows_duplicate} duplicates")
+        
+        # Fold this upload into the per-supplier outlier history and confirm its column mapping
+        if processing_context.outlier_stats is not None:
+            await outlier_baseline_store.commit(upload_stats)
+        await column_mapping_registry.confirm(suppliers, processing_context.column_mapping)
+        
+        # Mark complete
+        job_update = {
+            "status": "complete",
+            "rows_processed": rows_inserted,
+            "rows_duplicate": rows_duplicate,
+            "unmapped_values": processing_context.unmapped_values,
+            "stage_metrics": job_stage_metrics(validation_context, processing_context)
+        }
+        if warnings:
+            job_update["errors"] = warnings
+        await update_job(job_id, job_update)
+        status = "complete"
+        logger.info(f"Job {job_id}: Complete, {rows_inserted}/{rows_read} rows inserted")
+        log_stage_timings(f"Job {job_id} validation", validation_context)
+        log_stage_timings(f"Job {job_id} processing", processing_context)
+        
+        await trigger_immediate_analysis()
+    
+    except (UploadError, file_reader.FileFormatError, pd.errors.ParserError) as e:
+        errors = e.errors if isinstance(e, UploadError) else [str(e)]
+        logger.warning(f"Job {job_id}: Upload rejected after {rows_inserted} rows: {e}")
+        await update_job(job_id, {
+            "status": "failed",
+            "rows_processed": rows_inserted,
+            "rows_duplicate": rows_duplicate,
+            "errors": warnings + errors,
+            "stage_metrics": job_stage_metrics(validation_context, processing_context)
+        })
+    except Exception as e:
+        logger.error(f"Job {job_id}: Error processing upload: {e}")
+        await update_job(job_id, {
+            "status": "failed",
+            "rows_processed": rows_inserted,
+            "rows_duplicate": rows_duplicate,
+            "errors": warnings + [str(e)],
+            "stage_metrics": job_stage_metrics(validation_context, processing_context)
+        })
+    finally:
+        INGEST_JOBS.labels(status).inc()
+        INGEST_JOB_SECONDS.observe(time.perf_counter() - started)
+        if os.path.exists(path) and not (resumable and status == "failed"):
+            os.remove(path)
@@ -1,7 +1,11 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from src.api.routes import router
+from src.api.routes import router, metrics_router
+from src.ingestion.job_queue import ingest_job_queue
+from src.ingestion.event_buffer import event_write_buffer
+from src.processing.dedup import event_deduplicator
+from src.db.storage import async_db_client
 from src.utils.config import settings
 from src.utils.logger import logger
 import uvicorn
@@ -12,9 +16,16 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Data Core service starting up...")
     logger.info(f"API running on {settings.api_host}:{settings.api_port}")
+    await ingest_job_queue.start()
+    await event_write_buffer.start()
+    if settings.dedup_enabled:
+        await event_deduplicator.warm(settings.dedup_warm_rows)
     yield
     # Shutdown
     logger.info("Data Core service shutting down...")
+    await event_write_buffer.stop()
+    await ingest_job_queue.stop()
+    await async_db_client.close()
 
 
 # Create FastAPI app
@@ -36,6 +47,7 @@ app.add_middleware(
 
 # Include routes
 app.include_router(router, prefix="/api/v1", tags=["data-core"])
+app.include_router(metrics_router, tags=["monitoring"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import math
+import asyncio
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Tuple
+from src.db.storage import async_db_client
+from src.processing.serializer import RecordSerializer
+from src.utils.constants import NORMALIZED_TEXT_FIELDS, NORMALIZED_NUMERIC_FIELDS
+from src.utils.config import settings
+from src.utils.logger import logger
+
+# Fields that identify an event, hashed as supplied (derived flags and created_at excluded)
+CONTENT_HASH_FIELDS = ["timestamp"] + NORMALIZED_TEXT_FIELDS + NORMALIZED_NUMERIC_FIELDS
+
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """Stable 128-bit hex hash of an event's identity fields"""
+    content = json.dumps([record.get(field) for field in CONTENT_HASH_FIELDS], default=str)
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def tag_content_hashes(df: pd.DataFrame) -> None:
+    """
+    Add a content_hash column hashing each row's identity fields as supplied
+    Run after timestamp parsing and before normalization or gap filling, so
+    re-sending a row matches its stored hash even when unit mappings or the
+    gap filling models have changed since
+    """
+    n = len(df)
+    columns = [
+        RecordSerializer._column_values(df[field]) if field in df.columns else [None] * n
+        for field in CONTENT_HASH_FIELDS
+    ]
+    df["content_hash"] = [content_hash(dict(zip(CONTENT_HASH_FIELDS, values))) for values in zip(*columns)]
+
+
+def file_hasher():
+    """Incremental hash for whole uploads; feed with .update(bytes), read .hexdigest()"""
+    return hashlib.sha256()
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over hex content hashes
+    Bit positions come from double hashing two 64-bit slices of the hash itself,
+    so no extra hashing is done per lookup.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, hashes: List[str]) -> np.ndarray:
+        """Bit positions, shape (len(hashes), hash_count)"""
+        h1 = np.array([int(h[:16], 16) for h in hashes], dtype=np.uint64)
+        h2 = np.array([int(h[16:32], 16) | 1 for h in hashes], dtype=np.uint64)
+        i = np.arange(self.hash_count, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            return (h1[:, None] + i[None, :] * h2[:, None]) % np.uint64(self.size)
+
+    def add_many(self, hashes: List[str]) -> None:
+        if not hashes:
+            return
+        positions = self._positions(hashes).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3), (1 << (positions & np.uint64(7))).astype(np.uint8))
+        self.count += len(hashes)
+        if self.count > self.capacity:
+            logger.warning(f"Bloom filter holds {self.count} hashes, over its capacity of {self.capacity}")
+
+    def contains_many(self, hashes: List[str]) -> np.ndarray:
+        """Boolean mask: False means definitely not added, True means probably added"""
+        if not hashes:
+            return np.zeros(0, dtype=bool)
+        positions = self._positions(hashes)
+        set_bits = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return set_bits.all(axis=1)
+
+
+class EventDeduplicator:
+    """
+    Skips events that have already been stored
+    Hashes the Bloom filter has not seen are new; hashes it may have seen are
+    confirmed against events_normalized. A unique index on content_hash is the
+    final guard for rows stored by other processes.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.bloom = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+
+    async def warm(self, limit: int) -> None:
+        """Seed the filter with recently stored hashes"""
+        hashes = await async_db_client.get_recent_content_hashes(limit=limit)
+        with self._lock:
+            self.bloom.add_many(hashes)
+        logger.info(f"Deduplication filter warmed with {len(hashes)} stored content hashes")
+
+    async def find_duplicates(self, hashes: List[str]) -> np.ndarray:
+        """
+        Mark hashes already stored or repeated earlier in the same batch
+        New hashes are added to the filter
+        Returns: boolean mask of duplicates
+        """
+        duplicates = np.zeros(len(hashes), dtype=bool)
+        first_seen = {}
+        for i, h in enumerate(hashes):
+            if h in first_seen:
+                duplicates[i] = True
+            else:
+                first_seen[h] = i
+
+        unique = list(first_seen)
+        with self._lock:
+            maybe_seen = self.bloom.contains_many(unique)
+
+        candidates = [h for h, seen in zip(unique, maybe_seen) if seen]
+        if candidates:
+            try:
+                stored = await async_db_client.get_existing_content_hashes(candidates)
+            except Exception as e:
+                # The unique index still rejects real duplicates on insert
+                logger.warning(f"Could not confirm {len(candidates)} possible duplicates: {e}")
+                stored = set()
+            for h in stored:
+                duplicates[first_seen[h]] = True
+
+        with self._lock:
+            self.bloom.add_many([h for h, seen in zip(unique, maybe_seen) if not seen])
+        return duplicates
+
+    async def filter_records(
+        self,
+        raw_records: List[Dict[str, Any]],
+        normalized_records: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[int]]:
+        """
+        Tag aligned raw/normalized records with content_hash and drop duplicates
+        Returns: (raw_records, normalized_records, positions of the records kept)
+        """
+        hashes = await asyncio.to_thread(self._tag_records, raw_records, normalized_records)
+
+        kept = list(range(len(hashes)))
+        if not settings.dedup_enabled:
+            return raw_records, normalized_records, kept
+
+        duplicates = await self.find_duplicates(hashes)
+        if not duplicates.any():
+            return raw_records, normalized_records, kept
+
+        kept = np.flatnonzero(~duplicates).tolist()
+        logger.info(f"Skipping {len(hashes) - len(kept)} duplicate events")
+        return [raw_records[i] for i in kept], [normalized_records[i] for i in kept], kept
+    
+    @staticmethod
+    def _tag_records(raw_records: List[Dict[str, Any]], normalized_records: List[Dict[str, Any]]) -> List[str]:
+        # Records serialized from a tagged frame carry the hash of their rows as supplied
+        hashes = [record.get("content_hash") or content_hash(record) for record in normalized_records]
+        for raw, normalized, h in zip(raw_records, normalized_records, hashes):
+            raw["content_hash"] = h
+            normalized["content_hash"] = h
+        return hashes
+
+
+# Singleton instance
+event_deduplicator = EventDeduplicator(
+    capacity=settings.dedup_bloom_capacity,
+    error_rate=settings.dedup_bloom_error_rate
+)
@@ -1,111 +1,179 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Tuple
 from sklearn.linear_model import LinearRegression
-from src.utils.constants import GAP_FILLABLE_FIELDS
+from src.utils.constants import GAP_FILLABLE_FIELDS, EVENT_TYPE_GAP_FIELDS, NORMALIZED_NUMERIC_FIELDS
 from src.utils.config import settings
 from src.utils.logger import logger
 import pickle
 import os
 
+MODEL_PATH = "models/gap_filler_model.pkl"
+
+# Minimum history rows needed to fit a model for one (event_type, field)
+MIN_TRAINING_ROWS = 20
+
+# A feature is used only if at least this share of training rows has it
+MIN_FEATURE_COVERAGE = 0.5
+
+# Confidence assigned to median-filled values
+MEDIAN_CONFIDENCE = 0.6
+
 
 class GapFiller:
-    """Fills missing values using ML-based regression"""
+    """Fills missing values using per-event-type regression models"""
     
-    def __init__(self):
-        self.models = {}
+    def __init__(self, model_path: str = MODEL_PATH):
+        self.model_path = model_path
+        self.models: Dict[Tuple[str, str], Dict[str, Any]] = {}
         self._load_models()
     
     def _load_models(self):
         """Load pre-trained gap filling models"""
-        model_path = "models/gap_filler_model.pkl"
-        
-        if os.path.exists(model_path):
+        if os.path.exists(self.model_path):
             try:
-                with open(model_path, "rb") as f:
+                with open(self.model_path, "rb") as f:
                     self.models = pickle.load(f)
-                logger.info("Loaded gap filling models")
+                logger.info(f"Loaded {len(self.models)} gap filling models")
             except Exception as e:
                 logger.warning(f"Could not load gap filling models: {e}")
-                self._initialize_default_models()
+                self.models = {}
         else:
-            logger.info("No pre-trained models found, using default models")
-            self._initialize_default_models()
+            logger.info("No pre-trained models found, filling gaps with medians")
     
-    def _initialize_default_models(self):
-        """Initialize simple default models"""
-        for field in GAP_FILLABLE_FIELDS:
-            self.models[field] = LinearRegression()
+    def fit(self, history: pd.DataFrame) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        Fit one regression per (event_type, field) from stored history
+        Features are the other numeric fields well populated for that event type.
+        Residual RMSE is kept with each model to derive fill confidence.
+        """
+        models = {}
+        numeric = history.reindex(columns=NORMALIZED_NUMERIC_FIELDS).apply(pd.to_numeric, errors="coerce")
+        
+        for event_type, fields in EVENT_TYPE_GAP_FIELDS.items():
+            rows = numeric[history["event_type"] == event_type]
+            
+            for field in fields:
+                train = rows[rows[field].notna()]
+                if len(train) < MIN_TRAINING_ROWS:
+                    continue
+                
+                features = [
+                    col for col in NORMALIZED_NUMERIC_FIELDS
+                    if col != field and train[col].notna().mean() >= MIN_FEATURE_COVERAGE
+                ]
+                target = train[field].to_numpy(dtype="float64")
+                entry = {
+                    "features": features,
+                    "feature_medians": train[features].median().to_dict(),
+                    "median": float(np.median(target)),
+                    "model": None,
+                    "rmse": float(np.std(target)),
+                    "training_rows": len(train)
+                }
+                
+                if features:
+                    X = train[features].fillna(entry["feature_medians"]).to_numpy(dtype="float64")
+                    model = LinearRegression().fit(X, target)
+                    residuals = target - model.predict(X)
+                    entry["model"] = model
+                    entry["rmse"] = float(np.sqrt(np.mean(residuals ** 2)))
+                
+                models[(event_type, field)] = entry
+                logger.info(
+                    f"Fitted gap filler for {event_type}.{field} on {len(train)} rows "
+                    f"(features={features}, rmse={entry['rmse']:.3f})"
+                )
+        
+        self.models = models
+        return models
     
-    def fill_gaps(self, df: pd.DataFrame) -> pd.DataFrame:
+    def save_models(self):
+        """Persist fitted models to disk"""
+        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
+        with open(self.model_path, "wb") as f:
+            pickle.dump(self.models, f)
+        logger.info(f"Saved {len(self.models)} gap filling models to {self.model_path}")
+    
+    def fill_gaps(self, df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
         """
         Fill missing values in DataFrame based on event type.
         Only fills gaps for fields relevant to each event type.
+        Each field is filled in one pass: a batched predict per event type with a
+        fitted model, then a groupwise median for everything else (including
+        predictions below settings.gap_fill_confidence_threshold).
         Adds columns: {field}_filled, {field}_confidence
         """
-        df = df.copy()
+        if not inplace:
+            df = df.copy()
+        if "event_type" not in df.columns:
+            return df
         
-        # Define which fields are relevant for each event type
-        event_type_fields = {
-            "logistics": ["distance_km", "load_kg", "speed"],
-            "factory": ["energy_kwh"],
-            "warehouse": ["energy_kwh"],
-            "delivery": ["distance_km", "speed"]
-        }
+        event_types = df["event_type"]
         
         for field in GAP_FILLABLE_FIELDS:
             if field not in df.columns:
                 continue
             
-            # Only fill gaps for rows where this field is relevant to the event type
-            for event_type, relevant_fields in event_type_fields.items():
-                if field not in relevant_fields:
-                    continue
-                
-                # Get mask for this event type with missing values
-                event_mask = df["event_type"] == event_type
-                missing_mask = event_mask & df[field].isna()
-                missing_count = missing_mask.sum()
-                
-                if missing_count == 0:
+            relevant_types = [et for et, fields in EVENT_TYPE_GAP_FIELDS.items() if field in fields]
+            values = pd.to_numeric(df[field], errors="coerce")
+            missing = values.isna() & event_types.isin(relevant_types)
+            missing_count = int(missing.sum())
+            
+            if missing_count == 0:
+                continue
+            
+            filled = pd.Series(np.nan, index=df.index)
+            confidence = pd.Series(np.nan, index=df.index)
+            
+            # Batched model predictions
+            for event_type in relevant_types:
+                entry = self.models.get((event_type, field))
+                rows = missing & (event_types == event_type)
+                if entry is None or not rows.any():
                     continue
+                predictions, confidences = self._predict(entry, df.loc[rows])
                 
-                logger.info(f"Filling {missing_count} missing values for {field} in {event_type} events")
-                
-                # Use median-based filling as fallback
-                filled_values, confidences = self._fill_with_median(df[event_mask], field, df[event_mask][field].isna())
-                
-                # Mark filled values
-                if f"{field}_filled" not in df.columns:
-                    df[f"{field}_filled"] = False
-                if f"{field}_confidence" not in df.columns:
-                    df[f"{field}_confidence"] = 1.0
-                    
-                df.loc[missing_mask, f"{field}_filled"] = True
-                df.loc[missing_mask, field] = filled_values
-                df.loc[missing_mask, f"{field}_confidence"] = confidences
+                # Low-confidence predictions fall through to the median
+                confident = confidences >= settings.gap_fill_confidence_threshold
+                filled[rows] = np.where(confident, predictions, np.nan)
+                confidence[rows] = np.where(confident, confidences, np.nan)
+            
+            # Median of the same event type for rows without a (confident) model
+            fallback = missing & filled.isna()
+            if fallback.any():
+                medians = values.groupby(event_types).transform("median")
+                filled[fallback] = medians[fallback].fillna(0.0)
+                confidence[fallback] = MEDIAN_CONFIDENCE
+            
+            logger.info(f"Filling {missing_count} missing values for {field} ({int(fallback.sum())} by median)")
+            
+            df[field] = values.where(~missing, filled)
+            df[f"{field}_filled"] = missing
+            df[f"{field}_confidence"] = confidence.where(missing, 1.0)
         
         return df
     
-    def _fill_with_median(self, df: pd.DataFrame, field: str, missing_mask: pd.Series) -> tuple:
-        """Fill missing values with median (simple fallback)"""
-        median_value = df[field].median()
-        
-        if pd.isna(median_value):
-            median_value = 0.0
-        
-        filled_values = [median_value] * missing_mask.sum()
-        confidences = [0.6] * missing_mask.sum()  # Medium confidence for median
-        
-        return filled_values, confidences
-    
-    def _fill_with_regression(self, df: pd.DataFrame, field: str, missing_mask: pd.Series) -> tuple:
-        """Fill missing values using regression (advanced)"""
-        # This is a placeholder for more sophisticated regression-based filling
-        # Would use features like supplier_id, event_type, etc. to predict
+    def _predict(self, entry: Dict[str, Any], rows: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Predict a field for rows and derive confidence from the model's residual RMSE
+        confidence = 1 - rmse / |prediction|, clipped to [0.1, 0.95]
+        """
+        if entry["model"] is None:
+            predictions = np.full(len(rows), entry["median"])
+        else:
+            X = (
+                rows.reindex(columns=entry["features"])
+                .apply(pd.to_numeric, errors="coerce")
+                .fillna(entry["feature_medians"])
+                .to_numpy(dtype="float64")
+            )
+            predictions = np.clip(entry["model"].predict(X), 0.0, None)
         
-        # For now, fall back to median
-        return self._fill_with_median(df, field, missing_mask)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            confidences = 1.0 - entry["rmse"] / np.abs(predictions)
+        confidences = np.clip(np.nan_to_num(confidences, nan=0.1, neginf=0.1), 0.1, 0.95)
+        return predictions, confidences
     
     def fill_single_value(self, field: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -115,8 +183,16 @@ class GapFiller:
         if field not in GAP_FILLABLE_FIELDS:
             return {"value": None, "confidence": 0.0, "method": "none"}
         
-        # Simple median-based filling for single values
-        # In production, this would use historical data from the same supplier
+        entry = self.models.get((context.get("event_type"), field))
+        if entry is not None:
+            predictions, confidences = self._predict(entry, pd.DataFrame([context]))
+            return {
+                "value": float(predictions[0]),
+                "confidence": float(confidences[0]),
+                "method": "regression" if entry["model"] is not None else "median"
+            }
+        
+        # Defaults when no history has been fitted
         default_values = {
             "distance_km": 50.0,
             "energy_kwh": 100.0,
@@ -1,5 +1,6 @@
 import pandas as pd
-from typing import Dict, Any
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
 from src.utils.constants import VEHICLE_TYPE_MAPPING, FUEL_TYPE_MAPPING
 from src.utils.logger import logger
 
@@ -8,34 +9,46 @@ class DataNormalizer:
     """Normalizes raw data into consistent format"""
     
     @staticmethod
-    def normalize_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-        """Normalize entire DataFrame"""
-        df = df.copy()
+    def normalize_dataframe(
+        df: pd.DataFrame,
+        report: Optional[Dict[str, Dict[str, int]]] = None,
+        inplace: bool = False
+    ) -> pd.DataFrame:
+        """
+        Normalize entire DataFrame
+        If report is given, counts of values with no known mapping are added to it:
+        {"vehicle_type": {"hovercraft": 3}, ...}
+        With inplace=True the frame is modified without copying and missing values
+        are left as NaN (the record serializer converts them to None)
+        """
+        if not inplace:
+            df = df.copy()
         
-        # Normalize vehicle types
-        if "vehicle_type" in df.columns:
-            df["vehicle_type"] = df["vehicle_type"].apply(
-                DataNormalizer._normalize_vehicle_type
-            )
-        
-        # Normalize fuel types
-        if "fuel_type" in df.columns:
-            df["fuel_type"] = df["fuel_type"].apply(
-                DataNormalizer._normalize_fuel_type
-            )
+        # Normalize vehicle and fuel types over unique values only
+        for field, mapping in (("vehicle_type", VEHICLE_TYPE_MAPPING), ("fuel_type", FUEL_TYPE_MAPPING)):
+            if field not in df.columns:
+                continue
+            df[field], unmapped = DataNormalizer._map_unique_values(df[field], mapping)
+            if unmapped:
+                logger.info(f"Unmapped {field} values: {unmapped}")
+                if report is not None:
+                    field_report = report.setdefault(field, {})
+                    for value, count in unmapped.items():
+                        field_report[value] = field_report.get(value, 0) + count
         
-        # Ensure numeric fields are proper types
+        # Ensure numeric fields are proper types (typed columns, e.g. from Parquet, are kept)
         numeric_fields = ["distance_km", "load_kg", "energy_kwh", "speed", "temperature"]
         for field in numeric_fields:
-            if field in df.columns:
+            if field in df.columns and not pd.api.types.is_numeric_dtype(df[field]):
                 df[field] = pd.to_numeric(df[field], errors="coerce")
         
-        # Normalize timestamp
-        if "timestamp" in df.columns:
+        # Normalize timestamp (skipped if already parsed)
+        if "timestamp" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
             df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
         
         # Fill NaN with None for JSON serialization
-        df = df.where(pd.notnull(df), None)
+        if not inplace:
+            df = df.where(pd.notnull(df), None)
         
         logger.info(f"Normalized {len(df)} rows")
         return df
@@ -68,6 +81,44 @@ class DataNormalizer:
         
         return normalized
     
+    @staticmethod
+    def normalize_events(events: List[Dict[str, Any]], report: Optional[Dict[str, Dict[str, int]]] = None) -> pd.DataFrame:
+        """
+        Batch form of normalize_event: one DataFrame, one column-wise pass
+        Timestamps are parsed as UTC; unparseable values become NaT
+        """
+        df = pd.DataFrame.from_records(events)
+        if "timestamp" in df.columns:
+            df["timestamp"] = pd.to_datetime(df["timestamp"].astype(str), errors="coerce", utc=True, format="ISO8601")
+        return DataNormalizer.normalize_dataframe(df, report=report, inplace=True)
+    
+    @staticmethod
+    def _map_unique_values(series: pd.Series, mapping: Dict[str, str]) -> Tuple[pd.Series, Dict[str, int]]:
+        """
+        Lower/strip and map each distinct value once, then broadcast back by code
+        Returns: (normalized series, {unmapped value: row count})
+        """
+        codes, uniques = pd.factorize(series)
+        if len(uniques) == 0:
+            return pd.Series(None, index=series.index, dtype=object), {}
+        
+        keys = pd.Index(uniques).astype(str).str.lower().str.strip()
+        mapped = keys.map(mapping)
+        normalized = np.where(pd.isna(mapped), keys, mapped).astype(object)
+        
+        # Missing values (code -1) stay None
+        values = np.append(normalized, None)[codes]
+        result = pd.Series(values, index=series.index, dtype=object)
+        
+        known = set(mapping.values())
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        unmapped = {}
+        for key, is_unmapped, count in zip(keys, pd.isna(mapped), counts):
+            if is_unmapped and key not in known:
+                unmapped[key] = unmapped.get(key, 0) + int(count)
+        
+        return result, unmapped
+    
     @staticmethod
     def _normalize_vehicle_type(vehicle_type: Any) -> str:
         """Normalize vehicle type to standard format"""
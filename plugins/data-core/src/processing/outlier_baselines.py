@@ -0,0 +1,119 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from src.processing.streaming_stats import OutlierStatistics, FieldStatistics
+from src.db.storage import async_db_client
+from src.utils.constants import OUTLIER_FIELDS
+from src.utils.config import settings
+from src.utils.logger import logger
+
+BASELINE_GROUP_COLUMNS = ["supplier_id", "event_type"]
+
+
+class OutlierBaselineStore:
+    """
+    Historical per-(supplier_id, event_type, field) distribution summaries
+    Summaries are merged with each ingest, persisted to outlier_baselines and kept
+    in an in-process LRU cache so flagging never rescans history
+    """
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple, Optional[FieldStatistics]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._commit_lock = asyncio.Lock()
+    
+    async def get(self, keys: List[Tuple]) -> OutlierStatistics:
+        """
+        Historical summaries for the given (supplier_id, event_type, field) keys
+        Cache misses are loaded from the DB in one query
+        """
+        with self._lock:
+            missing = [key for key in keys if key not in self._cache]
+        
+        if missing:
+            loaded = await self._load(missing)
+            with self._lock:
+                for key in missing:
+                    self._put(key, loaded.get(key))
+        
+        history = OutlierStatistics(OUTLIER_FIELDS, BASELINE_GROUP_COLUMNS)
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    if self._cache[key] is not None:
+                        history.stats[key] = FieldStatistics.from_dict(self._cache[key].to_dict())
+        return history
+    
+    async def with_history(self, upload_stats: OutlierStatistics) -> OutlierStatistics:
+        """Merge an upload's grouped statistics with the stored history for the same keys"""
+        keys = [key for key in upload_stats.stats if key[0] is not None and key[1] is not None]
+        history = await self.get(keys)
+        return history.merge(upload_stats)
+    
+    async def commit(self, upload_stats: OutlierStatistics):
+        """
+        Fold an upload's own statistics into the stored history once the upload has been stored
+        History is re-read and merged under a lock at write time, so two uploads for the same
+        supplier committing together both count instead of the last write winning
+        """
+        keys = [key for key in upload_stats.stats if key[0] is not None and key[1] is not None]
+        if not keys:
+            return
+        
+        async with self._commit_lock:
+            try:
+                combined = OutlierStatistics(OUTLIER_FIELDS, BASELINE_GROUP_COLUMNS)
+                combined.stats = await self._load(keys)
+                combined.merge(upload_stats)
+            except Exception as e:
+                logger.warning(f"Could not persist outlier baselines: {e}")
+                return
+            
+            rows = []
+            now = datetime.utcnow().isoformat()
+            with self._lock:
+                for key in keys:
+                    supplier_id, event_type, field = key
+                    field_stats = combined.stats[key]
+                    self._put(key, field_stats)
+                    rows.append({
+                        "supplier_id": supplier_id,
+                        "event_type": event_type,
+                        "field": field,
+                        "sample_count": field_stats.moments.count,
+                        "summary": field_stats.to_dict(),
+                        "updated_at": now
+                    })
+            
+            try:
+                await async_db_client.upsert_outlier_baselines(rows)
+            except Exception as e:
+                logger.warning(f"Could not persist outlier baselines: {e}")
+    
+    def _put(self, key: Tuple, value: Optional[FieldStatistics]):
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+    
+    async def _load(self, keys: List[Tuple]) -> Dict[Tuple, FieldStatistics]:
+        supplier_ids = sorted({key[0] for key in keys if key[0] is not None})
+        if not supplier_ids:
+            return {}
+        
+        wanted = set(keys)
+        loaded = {}
+        for row in await async_db_client.get_outlier_baselines(supplier_ids):
+            key = (row["supplier_id"], row["event_type"], row["field"])
+            if key in wanted:
+                loaded[key] = FieldStatistics.from_dict(row["summary"])
+        logger.info(f"Loaded {len(loaded)} outlier baselines for {len(supplier_ids)} suppliers")
+        return loaded
+
+
+# Singleton instance
+outlier_baseline_store = OutlierBaselineStore(max_entries=settings.outlier_baseline_cache_size)
@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
-from typing import List
+from typing import List, Optional
+from src.processing.streaming_stats import OutlierStatistics
+from src.utils.constants import OUTLIER_FIELDS
 from src.utils.config import settings
 from src.utils.logger import logger
 
@@ -9,12 +11,13 @@ class OutlierDetector:
     """Detects outliers in numerical data"""
     
     @staticmethod
-    def detect_outliers_iqr(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    def detect_outliers_iqr(df: pd.DataFrame, columns: List[str], inplace: bool = False) -> pd.DataFrame:
         """
         Detect outliers using IQR method
         Adds 'is_outlier' column to DataFrame
         """
-        df = df.copy()
+        if not inplace:
+            df = df.copy()
         df["is_outlier"] = False
         
         for col in columns:
@@ -42,11 +45,12 @@ class OutlierDetector:
         return df
     
     @staticmethod
-    def detect_outliers_zscore(df: pd.DataFrame, columns: List[str], threshold: float = 3.0) -> pd.DataFrame:
+    def detect_outliers_zscore(df: pd.DataFrame, columns: List[str], threshold: float = 3.0, inplace: bool = False) -> pd.DataFrame:
         """
         Detect outliers using Z-score method
         """
-        df = df.copy()
+        if not inplace:
+            df = df.copy()
         df["is_outlier"] = False
         
         for col in columns:
@@ -73,16 +77,91 @@ class OutlierDetector:
         return df
     
     @staticmethod
-    def flag_outliers(df: pd.DataFrame) -> pd.DataFrame:
+    def collect_statistics(df: pd.DataFrame, stats: Optional[OutlierStatistics] = None) -> OutlierStatistics:
+        """
+        First pass of streaming detection: fold a chunk into mergeable
+        quantile sketches and running moments
+        """
+        stats = stats or OutlierStatistics(OUTLIER_FIELDS)
+        return stats.update(df)
+    
+    @staticmethod
+    def flag_outliers_with_statistics(
+        df: pd.DataFrame,
+        stats: OutlierStatistics,
+        fallback: Optional[OutlierStatistics] = None,
+        min_samples: int = 0,
+        inplace: bool = False
+    ) -> pd.DataFrame:
+        """
+        Second pass of streaming detection: flag rows against bounds
+        accumulated over the whole file (or persisted from earlier uploads).
+        Bounds are looked up per row with one merge per field. Rows whose key has
+        fewer than min_samples values use the fallback statistics' bounds instead.
+        """
+        if not inplace:
+            df = df.copy()
+        df["is_outlier"] = False
+        
+        method = "zscore" if settings.outlier_method == "zscore" else "iqr"
+        
+        for field in stats.fields:
+            if field not in df.columns:
+                continue
+            numeric_data = pd.to_numeric(df[field], errors="coerce").to_numpy(dtype="float64")
+            
+            lower, upper = OutlierDetector._lookup_bounds(df, stats, field, method, min_samples)
+            if fallback is not None:
+                fallback_lower, fallback_upper = OutlierDetector._lookup_bounds(df, fallback, field, method, 0)
+                missing = np.isnan(lower)
+                lower = np.where(missing, fallback_lower, lower)
+                upper = np.where(missing, fallback_upper, upper)
+            
+            # NaN bounds (no spread or not enough history) never flag
+            outliers = (numeric_data < lower) | (numeric_data > upper)
+            df.loc[outliers, "is_outlier"] = True
+        
+        outlier_count = df["is_outlier"].sum()
+        logger.info(f"Detected {outlier_count} outliers using streaming {method} bounds")
+        
+        return df
+    
+    @staticmethod
+    def _lookup_bounds(df: pd.DataFrame, stats: OutlierStatistics, field: str, method: str, min_samples: int) -> tuple:
+        """Per-row (lower, upper) bound arrays for a field, NaN where no bounds exist"""
+        nan = np.full(len(df), np.nan)
+        bounds = stats.bounds(method, iqr_multiplier=settings.iqr_multiplier, min_samples=min_samples)
+        
+        if not stats.group_columns:
+            if (field,) not in bounds:
+                return nan, nan
+            lower, upper = bounds[(field,)]
+            return np.full(len(df), lower), np.full(len(df), upper)
+        
+        if not set(stats.group_columns).issubset(df.columns):
+            return nan, nan
+        
+        field_bounds = pd.DataFrame(
+            [(*key[:-1], lower, upper) for key, (lower, upper) in bounds.items() if key[-1] == field],
+            columns=stats.group_columns + ["_lower", "_upper"]
+        )
+        if field_bounds.empty:
+            return nan, nan
+        
+        aligned = stats.group_keys(df).merge(field_bounds, on=stats.group_columns, how="left")
+        return aligned["_lower"].to_numpy(dtype="float64"), aligned["_upper"].to_numpy(dtype="float64")
+    
+    @staticmethod
+    def flag_outliers(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
         """
         Main method to flag outliers based on configuration
         """
-        numeric_columns = ["distance_km", "load_kg", "energy_kwh", "speed"]
+        numeric_columns = OUTLIER_FIELDS
         
         if settings.outlier_method == "iqr":
-            return OutlierDetector.detect_outliers_iqr(df, numeric_columns)
+            return OutlierDetector.detect_outliers_iqr(df, numeric_columns, inplace=inplace)
         elif settings.outlier_method == "zscore":
-            return OutlierDetector.detect_outliers_zscore(df, numeric_columns)
+            return OutlierDetector.detect_outliers_zscore(df, numeric_columns, inplace=inplace)
         else:
             logger.warning(f"Unknown outlier method: {settings.outlier_method}, defaulting to IQR")
-            return OutlierDetector.detect_outliers_iqr(df, numeric_columns)
+            return OutlierDetector.detect_outliers_iqr(df, numeric_columns, inplace=inplace)
@@ -0,0 +1,232 @@
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+import pandas as pd
+
+from src.ingestion.schema_validator import SchemaValidator
+from src.processing.normalizer import DataNormalizer
+from src.processing.dedup import tag_content_hashes
+from src.processing.outlier_detector import OutlierDetector
+from src.processing.streaming_stats import OutlierStatistics
+from src.processing.gap_filler import gap_filler
+from src.utils.config import settings
+from src.utils.logger import logger
+from src.utils.metrics import current_rss_bytes, observe_stage
+
+
+class PipelineValidationError(Exception):
+    """A frame failed the validate stage"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+@dataclass
+class StageMetrics:
+    """Wall time, row counts and RSS change of a stage, summed over its calls"""
+    calls: int = 0
+    seconds: float = 0.0
+    rows_in: int = 0
+    rows_out: int = 0
+    memory_delta_bytes: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "seconds": round(self.seconds, 4),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "memory_delta_mb": round(self.memory_delta_bytes / (1024 * 1024), 2)
+        }
+
+
+@dataclass
+class PipelineContext:
+    """
+    Per-job state shared by the stages of a pipeline run
+    The same context is reused for every chunk of a job, so timings and
+    counters accumulate across chunks.
+    """
+    disabled_stages: Set[str] = field(default_factory=set)
+    outlier_stats: Optional[OutlierStatistics] = None
+    fallback_stats: Optional[OutlierStatistics] = None
+    collect_stats: List[OutlierStatistics] = field(default_factory=list)
+    unmapped_values: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    column_mapping: Dict[str, str] = field(default_factory=dict)
+    invalid_timestamps: int = 0
+    stage_metrics: Dict[str, StageMetrics] = field(default_factory=dict)
+
+    @property
+    def stage_timings(self) -> Dict[str, float]:
+        """Accumulated wall time per stage"""
+        return {name: metrics.seconds for name, metrics in self.stage_metrics.items()}
+
+    @contextmanager
+    def measure(self, stage: str, rows_in: int = 0) -> Iterator[StageMetrics]:
+        """
+        Measure a block as one call of `stage`, also exported to /metrics
+        Set rows_out (and rows_in, if only known afterwards) on the yielded call.
+        Memory delta is the change in process RSS, so concurrent jobs show up in it too.
+        """
+        call = StageMetrics(calls=1, rows_in=rows_in, rows_out=rows_in)
+        rss_before = current_rss_bytes()
+        started = time.perf_counter()
+        try:
+            yield call
+        finally:
+            call.seconds = time.perf_counter() - started
+            call.memory_delta_bytes = current_rss_bytes() - rss_before
+
+            total = self.stage_metrics.setdefault(stage, StageMetrics())
+            total.calls += 1
+            total.seconds += call.seconds
+            total.rows_in += call.rows_in
+            total.rows_out += call.rows_out
+            total.memory_delta_bytes += call.memory_delta_bytes
+            observe_stage(stage, call.seconds, call.rows_in, call.rows_out, call.memory_delta_bytes)
+
+    def metrics_summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage metrics as JSON-safe dicts"""
+        return {name: metrics.to_dict() for name, metrics in self.stage_metrics.items()}
+
+
+@dataclass
+class PipelineStage:
+    """A named step that modifies the frame in place"""
+    name: str
+    run: Callable[[pd.DataFrame, PipelineContext], None]
+    optional: bool = True
+
+
+class IngestPipeline:
+    """
+    Runs declared stages in order on one frame, in place
+    Optional stages can be switched off per job via PipelineContext.disabled_stages;
+    required stages (timestamp parsing, validation) always run.
+    """
+
+    def __init__(self, stages: List[PipelineStage]):
+        self.stages = stages
+
+    @property
+    def stage_names(self) -> List[str]:
+        return [stage.name for stage in self.stages]
+
+    def run(self, df: pd.DataFrame, context: PipelineContext) -> pd.DataFrame:
+        """
+        Run every enabled stage on df, adding each stage's measurements to context.stage_metrics
+        Returns: the same frame
+        """
+        for stage in self.stages:
+            if stage.optional and stage.name in context.disabled_stages:
+                continue
+
+            with context.measure(stage.name, len(df)) as call:
+                stage.run(df, context)
+                call.rows_out = len(df)
+
+        return df
+
+
+def parse_stage_names(value: Optional[str]) -> Set[str]:
+    """
+    Parse a comma-separated list of stage names, e.g. "outliers,gap_fill"
+    Raises ValueError for names that are not optional stages
+    """
+    if not value:
+        return set()
+
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = names - set(OPTIONAL_STAGES)
+    if unknown:
+        raise ValueError(
+            f"Unknown or required pipeline stages: {', '.join(sorted(unknown))}. "
+            f"Stages that can be skipped: {', '.join(OPTIONAL_STAGES)}"
+        )
+    return names
+
+
+def _map_columns(df: pd.DataFrame, context: PipelineContext) -> None:
+    """Rename headers to standard columns (mapping resolved once per job, see column_mapping)"""
+    if context.column_mapping:
+        df.rename(columns=context.column_mapping, inplace=True)
+
+
+def _parse_timestamps(df: pd.DataFrame, context: PipelineContext) -> None:
+    """Parse the timestamp column once; later stages reuse the datetime column"""
+    if "timestamp" not in df.columns or pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+        return
+
+    original = df["timestamp"]
+    parsed = pd.to_datetime(original, errors="coerce")
+    context.invalid_timestamps += int((parsed.isna() & original.notna()).sum())
+    df["timestamp"] = parsed
+
+
+def _hash_content(df: pd.DataFrame, context: PipelineContext) -> None:
+    """Hash rows as supplied, before normalization and gap filling change their values"""
+    tag_content_hashes(df)
+
+
+def _validate(df: pd.DataFrame, context: PipelineContext) -> None:
+    is_valid, errors = SchemaValidator.validate_dataframe(df)
+    if context.invalid_timestamps:
+        errors.append(f"Invalid timestamp format: {context.invalid_timestamps} values could not be parsed")
+    if errors:
+        raise PipelineValidationError(errors)
+
+
+def _collect_outlier_stats(df: pd.DataFrame, context: PipelineContext) -> None:
+    for stats in context.collect_stats:
+        OutlierDetector.collect_statistics(df, stats)
+
+
+def _normalize(df: pd.DataFrame, context: PipelineContext) -> None:
+    DataNormalizer.normalize_dataframe(df, report=context.unmapped_values, inplace=True)
+
+
+def _flag_outliers(df: pd.DataFrame, context: PipelineContext) -> None:
+    if context.outlier_stats is not None:
+        OutlierDetector.flag_outliers_with_statistics(
+            df,
+            context.outlier_stats,
+            fallback=context.fallback_stats,
+            min_samples=settings.outlier_min_samples,
+            inplace=True
+        )
+    else:
+        OutlierDetector.flag_outliers(df, inplace=True)
+
+
+def _fill_gaps(df: pd.DataFrame, context: PipelineContext) -> None:
+    gap_filler.fill_gaps(df, inplace=True)
+
+
+MAP_COLUMNS = PipelineStage("map_columns", _map_columns, optional=False)
+PARSE_TIMESTAMPS = PipelineStage("parse_timestamps", _parse_timestamps, optional=False)
+HASH_CONTENT = PipelineStage("content_hash", _hash_content, optional=False)
+VALIDATE = PipelineStage("validate", _validate, optional=False)
+COLLECT_OUTLIER_STATS = PipelineStage("collect_outlier_stats", _collect_outlier_stats, optional=False)
+NORMALIZE = PipelineStage("normalize", _normalize)
+OUTLIERS = PipelineStage("outliers", _flag_outliers)
+GAP_FILL = PipelineStage("gap_fill", _fill_gaps)
+
+# Stages a job may switch off
+OPTIONAL_STAGES = [NORMALIZE.name, OUTLIERS.name, GAP_FILL.name]
+
+# Pass 1 of a streamed upload: reject bad files before anything is written
+validation_pipeline = IngestPipeline([MAP_COLUMNS, PARSE_TIMESTAMPS, VALIDATE, COLLECT_OUTLIER_STATS])
+
+# Pass 2 of a streamed upload
+processing_pipeline = IngestPipeline([MAP_COLUMNS, PARSE_TIMESTAMPS, HASH_CONTENT, NORMALIZE, OUTLIERS, GAP_FILL])
+
+# Whole frame in one pass (small in-memory uploads)
+full_pipeline = IngestPipeline([MAP_COLUMNS, PARSE_TIMESTAMPS, VALIDATE, HASH_CONTENT, NORMALIZE, OUTLIERS, GAP_FILL])
+
+
+def log_stage_timings(label: str, context: PipelineContext) -> None:
+    """Log accumulated per-stage wall time"""
+    timings = ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in context.stage_timings.items())
+    logger.info(f"{label}: stage timings {timings}")
@@ -1,8 +1,18 @@
 import pandas as pd
-from typing import Dict, Any
+import numpy as np
+from typing import Dict, Any, List
 from datetime import datetime
 from src.utils.logger import logger
 
+# Fields whose presence makes up completeness
+COMPLETENESS_FIELDS = ["distance_km", "load_kg", "vehicle_type", "fuel_type"]
+
+# Rollup granularity -> pandas frequency of its windows
+ROLLUP_GRANULARITIES = {"hour": "h", "day": "D"}
+
+# Additive columns of a rollup row; percentages are derived from these
+ROLLUP_COUNT_COLUMNS = ["total_rows", "predicted_count", "anomalies_count", "completeness_cells", "completeness_total"]
+
 
 class QualityMetrics:
     """Calculate data quality metrics"""
@@ -40,9 +50,7 @@ class QualityMetrics:
         
         # Calculate completeness (non-null values)
         completeness_scores = []
-        important_fields = ["distance_km", "load_kg", "vehicle_type", "fuel_type"]
-        
-        for field in important_fields:
+        for field in COMPLETENESS_FIELDS:
             if field in df.columns:
                 non_null_pct = (df[field].notna().sum() / total_rows) * 100
                 completeness_scores.append(non_null_pct)
@@ -61,6 +69,29 @@ class QualityMetrics:
         logger.info(f"Quality metrics: {metrics}")
         return metrics
     
+    @staticmethod
+    def merge_metrics(metrics_list: List[Dict[str, Any]], supplier_id: str = None) -> Dict[str, Any]:
+        """
+        Combine metrics calculated on separate chunks of one upload
+        Percentages are weighted by each chunk's row count
+        """
+        total_rows = sum(m.get("total_rows", 0) for m in metrics_list)
+        
+        if total_rows == 0:
+            return QualityMetrics.calculate_metrics(pd.DataFrame(), supplier_id)
+        
+        def weighted(key: str) -> float:
+            return sum(m[key] * m.get("total_rows", 0) for m in metrics_list) / total_rows
+        
+        return {
+            "supplier_id": supplier_id,
+            "window_start": datetime.utcnow().isoformat(),
+            "completeness_pct": round(weighted("completeness_pct"), 2),
+            "predicted_pct": round(weighted("predicted_pct"), 2),
+            "anomalies_count": int(sum(m["anomalies_count"] for m in metrics_list)),
+            "total_rows": total_rows
+        }
+    
     @staticmethod
     def calculate_field_completeness(df: pd.DataFrame) -> Dict[str, float]:
         """Calculate completeness percentage for each field"""
@@ -75,3 +106,52 @@ class QualityMetrics:
             completeness[col] = (non_null_count / total_count * 100) if total_count > 0 else 0
         
         return completeness
+    
+    @staticmethod
+    def calculate_rollups(df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Per-supplier quality counts for each hourly and daily window, from one groupby
+        Counts are additive, so rollups of separate chunks or uploads can be summed
+        into the stored windows; rows without a supplier or timestamp are not counted.
+        Returns rows for the data_quality table: supplier_id, granularity, window_start
+        and ROLLUP_COUNT_COLUMNS
+        """
+        if df.empty or "supplier_id" not in df.columns or "timestamp" not in df.columns:
+            return []
+        
+        timestamps = df["timestamp"]
+        if not pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps, errors="coerce", utc=True, format="ISO8601")
+        elif timestamps.dt.tz is None:
+            timestamps = timestamps.dt.tz_localize("UTC")
+        
+        filled_columns = [col for col in df.columns if col.endswith("_filled")]
+        present_fields = [field for field in COMPLETENESS_FIELDS if field in df.columns]
+        counts = pd.DataFrame({
+            "supplier_id": df["supplier_id"].to_numpy(),
+            "window_start": timestamps.dt.floor(ROLLUP_GRANULARITIES["hour"]).to_numpy(),
+            "total_rows": 1,
+            "predicted_count": df[filled_columns].fillna(False).astype(bool).sum(axis=1).to_numpy() if filled_columns else 0,
+            "anomalies_count": df["is_outlier"].fillna(False).astype(bool).to_numpy().astype(int) if "is_outlier" in df.columns else 0,
+            "completeness_cells": df[present_fields].notna().sum(axis=1).to_numpy() if present_fields else 0,
+            "completeness_total": len(present_fields)
+        })
+        
+        hourly = counts.groupby(["supplier_id", "window_start"], sort=False)[ROLLUP_COUNT_COLUMNS].sum().reset_index()
+        daily = hourly.assign(window_start=hourly["window_start"].dt.floor(ROLLUP_GRANULARITIES["day"]))
+        daily = daily.groupby(["supplier_id", "window_start"], sort=False)[ROLLUP_COUNT_COLUMNS].sum().reset_index()
+        
+        rollups = pd.concat([hourly.assign(granularity="hour"), daily.assign(granularity="day")], ignore_index=True)
+        rollups["window_start"] = rollups["window_start"].dt.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+        rollups[ROLLUP_COUNT_COLUMNS] = rollups[ROLLUP_COUNT_COLUMNS].astype(np.int64)
+        return rollups.to_dict(orient="records")
+    
+    @staticmethod
+    def rollup_percentages(rollup: Dict[str, Any]) -> Dict[str, Any]:
+        """Completeness and predicted percentages of a stored rollup row"""
+        total_rows = rollup.get("total_rows") or 0
+        completeness_total = rollup.get("completeness_total") or 0
+        return {
+            "completeness_pct": round(rollup["completeness_cells"] / completeness_total * 100, 2) if completeness_total else 0,
+            "predicted_pct": round(rollup["predicted_count"] / total_rows * 100, 2) if total_rows else 0
+        }
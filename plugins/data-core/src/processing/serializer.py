@@ -0,0 +1,111 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, Any, List, Tuple
+from datetime import datetime
+from src.utils.constants import NORMALIZED_TEXT_FIELDS, NORMALIZED_NUMERIC_FIELDS
+from src.utils.logger import logger
+
+
+class RecordSerializer:
+    """Converts a processed DataFrame into JSON-safe DB records column by column"""
+    
+    @staticmethod
+    def to_records(df: pd.DataFrame, data_source: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Build events_raw and events_normalized records in one columnar pass.
+        NaN/NaT become None, timestamps become ISO strings, numerics become float.
+        A content_hash column (dedup.tag_content_hashes) goes on the normalized records, not the payload.
+        Returns: (raw_records, normalized_records)
+        """
+        n = len(df)
+        if n == 0:
+            return [], []
+        
+        created_at = datetime.utcnow().isoformat()
+        columns = {col: RecordSerializer._column_values(df[col]) for col in df.columns}
+        content_hashes = columns.pop("content_hash", None)
+        
+        # Normalized event columns, coerced to the events_normalized types
+        timestamps = RecordSerializer._column_values(df["timestamp"]) if "timestamp" in df.columns else [None] * n
+        normalized_columns = {}
+        for field in NORMALIZED_TEXT_FIELDS:
+            normalized_columns[field] = columns.get(field, [None] * n)
+        for field in NORMALIZED_NUMERIC_FIELDS:
+            if field in df.columns:
+                normalized_columns[field] = RecordSerializer._float_values(df[field])
+            else:
+                normalized_columns[field] = [None] * n
+        normalized_columns["timestamp"] = timestamps
+        if "is_outlier" in df.columns:
+            normalized_columns["is_outlier"] = df["is_outlier"].fillna(False).astype(bool).tolist()
+        else:
+            normalized_columns["is_outlier"] = [False] * n
+        normalized_columns["created_at"] = [created_at] * n
+        if content_hashes is not None:
+            normalized_columns["content_hash"] = content_hashes
+        
+        payload_keys = list(columns.keys())
+        payloads = [dict(zip(payload_keys, values)) for values in zip(*columns.values())]
+        supplier_ids = columns.get("supplier_id", [None] * n)
+        
+        raw_records = [
+            {
+                "supplier_id": supplier_id,
+                "timestamp": timestamp,
+                "payload": payload,
+                "data_source": data_source,
+                "created_at": created_at
+            }
+            for supplier_id, timestamp, payload in zip(supplier_ids, timestamps, payloads)
+        ]
+        
+        normalized_keys = list(normalized_columns.keys())
+        normalized_records = [dict(zip(normalized_keys, values)) for values in zip(*normalized_columns.values())]
+        
+        logger.info(f"Serialized {n} rows into raw and normalized records")
+        return raw_records, normalized_records
+    
+    @staticmethod
+    def _column_values(series: pd.Series) -> List[Any]:
+        """Convert a column to a list of JSON-safe Python values"""
+        if series.dtype == object:
+            series = series.infer_objects()
+        
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return RecordSerializer._iso_values(series)
+        if pd.api.types.is_bool_dtype(series):
+            return series.astype(object).where(series.notna(), None).tolist()
+        if pd.api.types.is_numeric_dtype(series):
+            return RecordSerializer._float_values(series)
+        
+        values = series.to_numpy(dtype=object, copy=True)
+        values[pd.isna(values)] = None
+        
+        # Timestamps left inside object columns
+        is_timestamp = np.fromiter((isinstance(v, (pd.Timestamp, datetime)) for v in values), dtype=bool, count=len(values))
+        if is_timestamp.any():
+            values[is_timestamp] = [v.isoformat() for v in values[is_timestamp]]
+        return values.tolist()
+    
+    @staticmethod
+    def _float_values(series: pd.Series) -> List[Any]:
+        """Convert a column to floats, with None for missing or non-numeric values"""
+        if not pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series, errors="coerce")
+        numeric = series.astype("float64").to_numpy()
+        values = numeric.astype(object)
+        values[np.isnan(numeric)] = None
+        return values.tolist()
+    
+    @staticmethod
+    def _iso_values(series: pd.Series) -> List[Any]:
+        """Convert a datetime column to ISO 8601 strings"""
+        suffix = ""
+        if getattr(series.dt, "tz", None) is not None:
+            series = series.dt.tz_convert("UTC").dt.tz_localize(None)
+            suffix = "+00:00"
+        
+        raw = series.to_numpy(dtype="datetime64[us]")
+        values = np.char.add(np.datetime_as_string(raw, unit="us"), suffix).astype(object)
+        values[np.isnat(raw)] = None
+        return values.tolist()
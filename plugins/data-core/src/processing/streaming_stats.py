@@ -0,0 +1,263 @@
+import math
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class RunningMoments:
+    """
+    Welford running mean/variance
+    Batches are folded in with Chan's parallel update so accumulators from
+    separate chunks or workers can be merged exactly
+    """
+    
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+    
+    def update(self, values: np.ndarray) -> "RunningMoments":
+        """Fold a batch of values (NaN ignored) into the accumulator"""
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        return self._combine(len(values), batch_mean, batch_m2)
+    
+    def merge(self, other: "RunningMoments") -> "RunningMoments":
+        """Merge another accumulator into this one"""
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+        return self
+    
+    def _combine(self, count: int, mean: float, m2: float) -> "RunningMoments":
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+        return self
+    
+    @property
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1, as pandas)"""
+        if self.count < 2:
+            return float("nan")
+        return math.sqrt(self.m2 / (self.count - 1))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "mean": self.mean, "m2": self.m2}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunningMoments":
+        return cls(int(data["count"]), float(data["mean"]), float(data["m2"]))
+
+
+class KLLSketch:
+    """
+    KLL streaming quantile sketch
+    Keeps O(k log n) items in a stack of compactors; each compaction promotes every
+    other sorted item to the next level with double weight. Mergeable, and exact
+    while nothing has been compacted.
+    """
+    
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        self.k = k
+        self.count = 0
+        self.compactors: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+    
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+    
+    def update(self, values: np.ndarray) -> "KLLSketch":
+        """Add a batch of values (NaN ignored)"""
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        
+        self.count += len(values)
+        self.compactors[0] = np.concatenate([self.compactors[0], values])
+        self._compress()
+        return self
+    
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Merge another sketch into this one"""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append(np.empty(0))
+        for level, items in enumerate(other.compactors):
+            self.compactors[level] = np.concatenate([self.compactors[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+    
+    def _compress(self):
+        level = 0
+        while level < len(self.compactors):
+            items = self.compactors[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append(np.empty(0))
+                items = np.sort(items)
+                # Keep one item back when the count is odd so total weight is preserved
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[:len(items) - len(keep)]
+                offset = int(self._rng.integers(0, 2))
+                self.compactors[level + 1] = np.concatenate([self.compactors[level + 1], pairs[offset::2]])
+                self.compactors[level] = keep
+            level += 1
+    
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile; exact (linear interpolation) before any compaction"""
+        if self.count == 0:
+            return float("nan")
+        if len(self.compactors) == 1:
+            return float(np.quantile(self.compactors[0], q))
+        
+        items = np.concatenate(self.compactors)
+        weights = np.concatenate([
+            np.full(len(c), 2 ** level, dtype="float64") for level, c in enumerate(self.compactors)
+        ])
+        order = np.argsort(items)
+        cumulative = np.cumsum(weights[order])
+        rank = q * cumulative[-1]
+        index = min(int(np.searchsorted(cumulative, rank, side="left")), len(items) - 1)
+        return float(items[order][index])
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "count": self.count, "compactors": [c.tolist() for c in self.compactors]}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(k=int(data["k"]))
+        sketch.count = int(data["count"])
+        sketch.compactors = [np.asarray(c, dtype="float64") for c in data["compactors"]] or [np.empty(0)]
+        return sketch
+
+
+class FieldStatistics:
+    """Quantile sketch and running moments for one numeric field"""
+    
+    def __init__(self, sketch: Optional[KLLSketch] = None, moments: Optional[RunningMoments] = None):
+        self.sketch = sketch or KLLSketch()
+        self.moments = moments or RunningMoments()
+    
+    def update(self, values: np.ndarray) -> "FieldStatistics":
+        self.sketch.update(values)
+        self.moments.update(values)
+        return self
+    
+    def merge(self, other: "FieldStatistics") -> "FieldStatistics":
+        self.sketch.merge(other.sketch)
+        self.moments.merge(other.moments)
+        return self
+    
+    def iqr_bounds(self, multiplier: float) -> Tuple[float, float]:
+        """(lower, upper) bounds Q1 - m*IQR, Q3 + m*IQR"""
+        q1 = self.sketch.quantile(0.25)
+        q3 = self.sketch.quantile(0.75)
+        iqr = q3 - q1
+        return q1 - multiplier * iqr, q3 + multiplier * iqr
+    
+    def zscore_bounds(self, threshold: float) -> Tuple[float, float]:
+        """(lower, upper) bounds mean ± threshold*std; NaN when std is 0 or undefined"""
+        std = self.moments.std
+        if not std or math.isnan(std):
+            return float("nan"), float("nan")
+        return self.moments.mean - threshold * std, self.moments.mean + threshold * std
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"sketch": self.sketch.to_dict(), "moments": self.moments.to_dict()}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FieldStatistics":
+        return cls(KLLSketch.from_dict(data["sketch"]), RunningMoments.from_dict(data["moments"]))
+
+
+class OutlierStatistics:
+    """
+    Mergeable per-field distribution summaries, optionally split by group columns
+    (e.g. supplier_id, event_type). Keys are (*group_values, field).
+    """
+    
+    def __init__(self, fields: List[str], group_columns: Optional[List[str]] = None):
+        self.fields = list(fields)
+        self.group_columns = list(group_columns or [])
+        self.stats: Dict[Tuple, FieldStatistics] = {}
+    
+    def update(self, df: pd.DataFrame) -> "OutlierStatistics":
+        """Fold a chunk of rows into the summaries"""
+        fields = [f for f in self.fields if f in df.columns]
+        if not fields or df.empty:
+            return self
+        
+        numeric = df[fields].apply(pd.to_numeric, errors="coerce")
+        if not self.group_columns:
+            for field in fields:
+                self._get((field,)).update(numeric[field].to_numpy())
+            return self
+        
+        groups = self.group_keys(df)
+        for group_key, index in numeric.groupby([groups[c] for c in self.group_columns], dropna=False).groups.items():
+            group_key = group_key if isinstance(group_key, tuple) else (group_key,)
+            group_key = tuple(None if pd.isna(v) else v for v in group_key)
+            rows = numeric.loc[index]
+            for field in fields:
+                self._get(group_key + (field,)).update(rows[field].to_numpy())
+        return self
+    
+    def group_keys(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Group column values as strings (None when missing), so ids match across file types and the DB"""
+        keys = df[self.group_columns].astype(object)
+        return keys.where(keys.isna(), keys.astype(str)).where(keys.notna(), None)
+    
+    def merge(self, other: "OutlierStatistics") -> "OutlierStatistics":
+        """Merge summaries from another chunk or worker"""
+        for key, field_stats in other.stats.items():
+            self._get(key).merge(field_stats)
+        return self
+    
+    def _get(self, key: Tuple) -> FieldStatistics:
+        if key not in self.stats:
+            self.stats[key] = FieldStatistics()
+        return self.stats[key]
+    
+    def bounds(
+        self,
+        method: str,
+        iqr_multiplier: float = 1.5,
+        z_threshold: float = 3.0,
+        min_samples: int = 0
+    ) -> Dict[Tuple, Tuple[float, float]]:
+        """
+        Outlier bounds for every key, by 'iqr' or 'zscore'
+        Keys with fewer than min_samples values get NaN bounds (never flag)
+        """
+        bounds = {}
+        for key, s in self.stats.items():
+            if s.moments.count < max(min_samples, 1):
+                bounds[key] = (float("nan"), float("nan"))
+            elif method == "zscore":
+                bounds[key] = s.zscore_bounds(z_threshold)
+            else:
+                bounds[key] = s.iqr_bounds(iqr_multiplier)
+        return bounds
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fields": self.fields,
+            "group_columns": self.group_columns,
+            "stats": [{"key": list(key), **s.to_dict()} for key, s in self.stats.items()]
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "OutlierStatistics":
+        stats = cls(data["fields"], data.get("group_columns"))
+        for entry in data["stats"]:
+            stats.stats[tuple(entry["key"])] = FieldStatistics.from_dict(entry)
+        return stats
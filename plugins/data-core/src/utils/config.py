@@ -2,9 +2,13 @@ from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
-    # Supabase
-    supabase_url: str
-    supabase_service_key: str
+    # Storage
+    storage_backend: str = "supabase"  # supabase or sqlite
+    sqlite_path: str = "data/data_core.db"
+    
+    # Supabase (required when storage_backend is supabase)
+    supabase_url: str = ""
+    supabase_service_key: str = ""
     
     # API Config
     api_host: str = "0.0.0.0"
@@ -14,6 +18,46 @@ class Settings(BaseSettings):
     max_file_size_mb: int = 50
     outlier_method: str = "iqr"
     iqr_multiplier: float = 1.5
+    outlier_min_samples: int = 30
+    outlier_baseline_cache_size: int = 10000
+    column_mapping_cache_size: int = 10000
+    
+    # Database Access
+    db_max_concurrency: int = 10
+    db_max_connections: int = 20
+    db_http2: bool = True
+    db_timeout_seconds: float = 10.0
+    db_connect_timeout_seconds: float = 5.0
+    db_max_retries: int = 3
+    db_retry_backoff_seconds: float = 0.2
+    db_retry_max_backoff_seconds: float = 5.0
+    
+    # Bulk Inserts
+    insert_batch_size: int = 500
+    insert_max_retries: int = 3
+    insert_retry_backoff_seconds: float = 0.5
+    
+    # Background Ingestion
+    ingest_workers: int = 2
+    ingest_queue_size: int = 20
+    upload_spool_dir: str = "uploads"
+    upload_chunk_max_mb: int = 64
+    ingest_chunk_rows: int = 10000
+    
+    # Batch Event Ingestion
+    max_batch_events: int = 10000
+    
+    # Event Write Buffer
+    event_buffer_size: int = 10000
+    event_flush_rows: int = 500
+    event_flush_interval_ms: int = 200
+    event_drain_timeout_seconds: float = 10.0
+    
+    # Deduplication
+    dedup_enabled: bool = True
+    dedup_bloom_capacity: int = 1000000
+    dedup_bloom_error_rate: float = 0.01
+    dedup_warm_rows: int = 100000
     
     # Gap Filling
     gap_fill_confidence_threshold: float = 0.5
@@ -63,6 +63,14 @@ EVENT_TYPES = [
     "delivery"
 ]
 
+# Fields checked for outliers
+OUTLIER_FIELDS = [
+    "distance_km",
+    "load_kg",
+    "energy_kwh",
+    "speed"
+]
+
 # Gap fillable fields
 GAP_FILLABLE_FIELDS = [
     "distance_km",
@@ -70,3 +78,36 @@ GAP_FILLABLE_FIELDS = [
     "load_kg",
     "speed"
 ]
+
+# Columns written to events_normalized
+NORMALIZED_TEXT_FIELDS = [
+    "event_type",
+    "supplier_id",
+    "vehicle_type",
+    "fuel_type"
+]
+
+NORMALIZED_NUMERIC_FIELDS = [
+    # Logistics fields
+    "distance_km",
+    "load_kg",
+    "speed",
+    "stop_events",
+    # Factory fields
+    "energy_kwh",
+    "furnace_usage",
+    "cooling_load",
+    "shift_hours",
+    # Warehouse fields
+    "temperature",
+    "refrigeration_load",
+    "inventory_volume"
+]
+
+# Gap fillable fields relevant to each event type
+EVENT_TYPE_GAP_FIELDS = {
+    "logistics": ["distance_km", "load_kg", "speed"],
+    "factory": ["energy_kwh"],
+    "warehouse": ["energy_kwh"],
+    "delivery": ["distance_km", "speed"]
+}
@@ -0,0 +1,50 @@
+import os
+import resource
+import sys
+from prometheus_client import Counter, Gauge, Histogram
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# Pipeline stages (one observation per stage call, i.e. per chunk)
+STAGE_SECONDS = Histogram(
+    "data_core_stage_seconds",
+    "Wall time of one pipeline stage call",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+STAGE_ROWS_IN = Counter("data_core_stage_rows_in", "Rows entering a pipeline stage", ["stage"])
+STAGE_ROWS_OUT = Counter("data_core_stage_rows_out", "Rows leaving a pipeline stage", ["stage"])
+STAGE_MEMORY_DELTA_BYTES = Gauge(
+    "data_core_stage_memory_delta_bytes",
+    "Process RSS change over the most recent call of a pipeline stage",
+    ["stage"]
+)
+
+# Upload jobs
+INGEST_JOBS = Counter("data_core_ingest_jobs", "Finished upload jobs by final status", ["status"])
+INGEST_JOB_SECONDS = Histogram(
+    "data_core_ingest_job_seconds",
+    "Upload job wall time from start of processing to completion",
+    buckets=(0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+)
+INGEST_QUEUE_PENDING = Gauge("data_core_ingest_queue_pending", "Upload jobs waiting for a worker")
+EVENT_BUFFER_PENDING = Gauge("data_core_event_buffer_pending", "Single events waiting in the write buffer")
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def observe_stage(stage: str, seconds: float, rows_in: int, rows_out: int, memory_delta_bytes: int) -> None:
+    """Export one stage call"""
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    STAGE_ROWS_IN.labels(stage).inc(rows_in)
+    STAGE_ROWS_OUT.labels(stage).inc(rows_out)
+    STAGE_MEMORY_DELTA_BYTES.labels(stage).set(memory_delta_bytes)
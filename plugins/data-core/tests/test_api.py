@@ -1,6 +1,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from src.main import app
+from src.db.storage import async_db_client
 
 client = TestClient(app)
 
@@ -13,7 +14,7 @@ def test_health_check():
 
 
 def test_ingest_event():
-    """Test single event ingestion"""
+    """Test single event ingestion is queued for the write buffer"""
     event = {
         "timestamp": "2025-11-28T12:00:00Z",
         "supplier_id": "S-TEST-1",
@@ -24,9 +25,10 @@ def test_ingest_event():
         "fuel_type": "diesel"
     }
     
-    response = client.post("/api/v1/ingest/event", json=event)
-    assert response.status_code == 200
-    assert response.json()["status"] == "stored"
+    with TestClient(app) as buffered_client:
+        response = buffered_client.post("/api/v1/ingest/event", json=event)
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
 
 
 def test_ingest_event_missing_fields():
@@ -40,8 +42,30 @@ def test_ingest_event_missing_fields():
     assert "errors" in response.json()["detail"]
 
 
-def test_data_quality_endpoint():
-    """Test data quality metrics endpoint"""
-    response = client.get("/api/v1/data-quality/S-TEST-1")
+def test_metrics_endpoint():
+    """Test Prometheus metrics are exposed at the app root"""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "data_core_ingest_queue_pending" in response.text
+
+
+def test_data_quality_endpoint(monkeypatch):
+    """Test data quality endpoint reads the latest supplier rollup"""
+    async def fake_rollup(supplier_id, granularity):
+        if supplier_id != "S-TEST-1":
+            return None
+        return {
+            "supplier_id": supplier_id, "granularity": granularity, "window_start": "2025-11-28T00:00:00+00:00",
+            "completeness_pct": 87.5, "predicted_pct": 12.5, "anomalies_count": 3, "total_rows": 40,
+            "updated_at": "2025-11-28T12:00:00"
+        }
+    
+    monkeypatch.setattr(async_db_client, "get_quality_rollup", fake_rollup)
+    
+    response = client.get("/api/v1/data-quality/S-TEST-1?granularity=hour")
     assert response.status_code == 200
-    assert "completeness_pct" in response.json()
+    assert response.json()["completeness_pct"] == 87.5
+    assert response.json()["granularity"] == "hour"
+    assert client.get("/api/v1/data-quality/S-OTHER").status_code == 404
+    assert client.get("/api/v1/data-quality/S-TEST-1?granularity=week").status_code == 400
@@ -0,0 +1,35 @@
+import asyncio
+import httpx
+import pytest
+from src.db.async_supabase_client import AsyncSupabaseClient
+from src.utils.config import settings
+
+
+class _FlakyQuery:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+    
+    async def execute(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def test_execute_retries_transient_failures(monkeypatch):
+    monkeypatch.setattr(settings, "db_retry_backoff_seconds", 0)
+    query = _FlakyQuery([httpx.ConnectError("refused"), httpx.ReadTimeout("slow")])
+    
+    result, attempts = asyncio.run(AsyncSupabaseClient()._execute(query, idempotent=True, max_retries=3))
+    
+    assert (result, attempts) == ("ok", 3)
+
+
+def test_execute_does_not_retry_non_idempotent_read_timeouts(monkeypatch):
+    monkeypatch.setattr(settings, "db_retry_backoff_seconds", 0)
+    query = _FlakyQuery([httpx.ReadTimeout("slow")])
+    
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(AsyncSupabaseClient()._execute(query, idempotent=False, max_retries=3))
+    assert query.calls == 1
@@ -0,0 +1,30 @@
+import pytest
+from scripts.benchmark_ingest import parse_mix, generate_events, write_events, run_benchmark
+
+
+def test_generate_events_follows_mix_and_missing_rate():
+    mix = parse_mix("logistics=3,factory=1")
+    
+    df = generate_events(2000, mix, missing_rate=0.2, seed=1)
+    
+    assert mix == {"logistics": 0.75, "factory": 0.25}
+    assert len(df) == 2000
+    assert set(df["event_type"]) == {"logistics", "factory"}
+    assert 0.7 < (df["event_type"] == "logistics").mean() < 0.8
+    assert df[["timestamp", "supplier_id", "event_type"]].notna().all().all()
+    assert 0.15 < df["distance_km"][df["event_type"] == "logistics"].isna().mean() < 0.25
+    assert generate_events(50, mix, 0.2, seed=1).equals(generate_events(50, mix, 0.2, seed=1))
+    with pytest.raises(ValueError):
+        parse_mix("spaceship=1")
+
+
+def test_run_benchmark_reports_every_stage(tmp_path):
+    path = tmp_path / "events.csv"
+    write_events(generate_events(300, parse_mix("logistics=1,warehouse=1"), 0.1), path, "csv")
+    
+    result = run_benchmark(str(path), 100, str(tmp_path / "bench.db"))
+    
+    assert result["rows"] == 300
+    assert result["rows_per_second"] > 0
+    assert result["peak_rss_mb"] > 0
+    assert {"read", "validate", "normalize", "outliers", "gap_fill", "serialize", "hash", "store"} <= set(result["stage_seconds"])
@@ -0,0 +1,104 @@
+import asyncio
+import httpx
+import pytest
+from src.db.async_supabase_client import AsyncSupabaseClient
+from src.db.local_storage_client import LocalStorageClient, AsyncLocalStorageClient
+from src.ingestion import event_batch
+from src.ingestion.event_batch import ingest_event_batch
+from src.processing import dedup
+from src.utils.config import settings
+
+
+class _FakeQuery:
+    def __init__(self, table):
+        self.table = table
+    
+    def insert(self, rows, **kwargs):
+        self.rows = rows
+        return self
+    
+    async def execute(self):
+        self.table.calls.append(len(self.rows))
+        if self.table.failures > 0:
+            self.table.failures -= 1
+            raise httpx.ConnectError("temporary failure")
+        return None
+
+
+class _FakeClient:
+    def __init__(self, failures=0):
+        self.calls = []
+        self.failures = failures
+    
+    def table(self, name):
+        return _FakeQuery(self)
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    monkeypatch.setattr(settings, "insert_retry_backoff_seconds", 0)
+    
+    def _install(failures=0):
+        client = AsyncSupabaseClient()
+        client._client = _FakeClient(failures)
+        return client
+    return _install
+
+
+def test_bulk_insert_chunks_rows(fake_client):
+    client = fake_client()
+    rows = [{"supplier_id": f"S-{i}"} for i in range(25)]
+    
+    results = asyncio.run(client.bulk_insert("events_raw", rows, chunk_size=10))
+    
+    assert sorted(client.client.calls) == [5, 10, 10]
+    assert [r["inserted"] for r in results] == [10, 10, 5]
+    assert all(r["error"] is None for r in results)
+
+
+def test_bulk_insert_retries_failed_chunk(fake_client):
+    client = fake_client(failures=1)
+    rows = [{"supplier_id": "S-1"}] * 4
+    
+    results = asyncio.run(client.bulk_insert("events_raw", rows, chunk_size=4, max_retries=2))
+    
+    assert results[0]["attempts"] == 2
+    assert results[0]["inserted"] == 4
+    assert results[0]["error"] is None
+
+
+def test_bulk_insert_reports_exhausted_chunk(fake_client):
+    client = fake_client(failures=10)
+    rows = [{"supplier_id": "S-1"}] * 3
+    
+    results = asyncio.run(client.bulk_insert("events_raw", rows, chunk_size=2, max_retries=1))
+    
+    assert [r["attempts"] for r in results] == [2, 2]
+    assert all(r["inserted"] == 0 and r["error"] for r in results)
+
+
+def test_sqlite_backend_stores_deduplicates_and_tracks_jobs(tmp_path, monkeypatch):
+    store = LocalStorageClient(str(tmp_path / "db.sqlite"))
+    storage = AsyncLocalStorageClient(store)
+    for module in (event_batch, dedup):
+        monkeypatch.setattr(module, "async_db_client", storage)
+    monkeypatch.setattr(dedup, "event_deduplicator", dedup.EventDeduplicator(capacity=1000, error_rate=0.01))
+    monkeypatch.setattr(event_batch, "event_deduplicator", dedup.event_deduplicator)
+    events = [
+        {"timestamp": f"2025-11-28T{h:02d}:00:00Z", "supplier_id": "S-1", "event_type": "logistics", "distance_km": 10 + h}
+        for h in range(3)
+    ]
+    
+    async def run():
+        first = await ingest_event_batch(events)
+        second = await ingest_event_batch(events + [{**events[0], "timestamp": "2025-11-28T09:00:00Z"}])
+        await storage.insert_ingest_job({"job_id": "job-1", "status": "processing", "filename": "a.csv", "file_hash": "abc"})
+        await storage.update_ingest_job("job-1", {"status": "complete", "rows_processed": first["stored"]})
+        return first, second, await storage.get_completed_job_by_file_hash("abc")
+    
+    first, second, job = asyncio.run(run())
+    
+    assert (first["stored"], first["duplicates"]) == (3, 0)
+    assert (second["stored"], second["duplicates"]) == (1, 3)
+    assert len(store.get_normalized_events()) == 4
+    assert (job["job_id"], job["rows_processed"]) == ("job-1", 3)
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import pytest
+from src.db.local_storage_client import LocalStorageClient, AsyncLocalStorageClient
+from src.ingestion import chunked_upload, upload_pipeline, column_mapping, event_batch
+from src.processing import dedup, outlier_baselines
+from src.ingestion.chunked_upload import ChunkedUploadManager, ChunkedUploadError
+
+CSV = b"timestamp,supplier_id,event_type,distance_km\n" + b"".join(
+    f"2025-01-01T{h:02d}:00:00Z,S-1,logistics,{h}\n".encode() for h in range(10)
+)
+
+
+async def _body(data: bytes):
+    yield data
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunked_upload, "async_db_client", AsyncLocalStorageClient(LocalStorageClient(str(tmp_path / "db.sqlite"))))
+    submitted = []
+    monkeypatch.setattr(chunked_upload.ingest_job_queue, "submit", lambda *args, **options: submitted.append((args, options)) or True)
+    manager = ChunkedUploadManager(str(tmp_path / "uploads"))
+    manager.submitted = submitted
+    return manager
+
+
+def test_chunks_are_assembled_in_order_and_committed(manager):
+    parts = [CSV[:30], CSV[30:120], CSV[120:]]
+    
+    async def run():
+        job_id = (await manager.initiate("big.csv"))["job_id"]
+        assert (await manager.put_chunk(job_id, 2, _body(parts[2])))["chunks_received"] == 0
+        with pytest.raises(ChunkedUploadError, match="Missing chunks: 0, 1"):
+            await manager.commit(job_id, 3)
+        await manager.put_chunk(job_id, 0, _body(parts[0]))
+        await manager.put_chunk(job_id, 0, _body(b"ignored"))
+        received = await manager.put_chunk(job_id, 1, _body(parts[1]))
+        result = await manager.commit(job_id, 3)
+        return job_id, received, result
+    
+    job_id, received, result = asyncio.run(run())
+    
+    assert received == {"chunk": 1, "chunks_received": 3, "rows_received": 10}
+    assert result == {"job_id": job_id, "status": "queued", "resume_from": 0}
+    with open(manager.upload_path(job_id, "big.csv"), "rb") as f:
+        assert f.read() == CSV
+    (submitted_job_id, _, _), options = manager.submitted[0]
+    assert submitted_job_id == job_id and options["resumable"]
+
+
+def test_commit_of_unknown_upload_is_404(manager):
+    with pytest.raises(ChunkedUploadError) as e:
+        asyncio.run(manager.commit("missing", 1))
+    assert e.value.status_code == 404
+
+
+def test_failed_chunk_insert_fails_job_and_commit_resumes_from_last_stored_chunk(manager, tmp_path, monkeypatch):
+    store = LocalStorageClient(str(tmp_path / "pipeline.sqlite"))
+    storage = AsyncLocalStorageClient(store)
+    for module in (upload_pipeline, dedup, outlier_baselines, column_mapping, event_batch):
+        monkeypatch.setattr(module, "async_db_client", storage)
+    monkeypatch.setattr(upload_pipeline.settings, "ingest_chunk_rows", 4)
+    
+    async def no_analysis():
+        pass
+    monkeypatch.setattr(upload_pipeline, "trigger_immediate_analysis", no_analysis)
+    
+    # The second chunk (rows 5-8) cannot be stored on the first run
+    insert_normalized_events = store.insert_normalized_events
+    outage = {"calls": 0}
+    
+    def flaky_insert(events):
+        outage["calls"] += 1
+        if outage["calls"] == 2:
+            return [{"chunk": 0, "rows": len(events), "inserted": 0, "attempts": 3, "error": "connection refused"}]
+        return insert_normalized_events(events)
+    store.insert_normalized_events = flaky_insert
+    
+    async def run():
+        job_id = (await storage.insert_ingest_job({"job_id": "j-1", "status": "queued", "filename": "big.csv", "chunks_received": 1}))["job_id"]
+        path = str(tmp_path / "big.csv")
+        with open(path, "wb") as f:
+            f.write(CSV)
+        await upload_pipeline.process_upload(job_id, path, "big.csv", resumable=True)
+        failed = await storage.get_ingest_job(job_id)
+        kept = os.path.exists(path)
+        await upload_pipeline.process_upload(job_id, path, "big.csv", resumable=True)
+        return failed, kept, await storage.get_ingest_job(job_id), os.path.exists(path)
+    
+    failed, kept, complete, still_kept = asyncio.run(run())
+    
+    assert failed["status"] == "failed"
+    assert failed["rows_committed"] == 4 and failed["rows_processed"] == 4
+    assert any("connection refused" in error for error in failed["errors"])
+    assert kept
+    assert complete["status"] == "complete" and complete["rows_committed"] == 10
+    assert complete["rows_processed"] == 10
+    assert sorted(e["distance_km"] for e in store.get_normalized_events()) == list(range(10))
+    assert not still_kept
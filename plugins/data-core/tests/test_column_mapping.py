@@ -0,0 +1,50 @@
+import asyncio
+import pandas as pd
+import pytest
+from src.db.local_storage_client import LocalStorageClient, AsyncLocalStorageClient
+from src.ingestion import column_mapping
+from src.ingestion.column_mapping import ColumnMappingRegistry
+from src.ingestion.schema_validator import SchemaValidator
+from src.processing.pipeline import PipelineContext, full_pipeline
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(column_mapping, "async_db_client", AsyncLocalStorageClient(LocalStorageClient(str(tmp_path / "db.sqlite"))))
+    return ColumnMappingRegistry(max_entries=100)
+
+
+def test_detect_header_mapping_normalizes_headers_and_skips_present_columns():
+    mapping = SchemaValidator.detect_header_mapping(["Time", "Vendor", "event_type", "dist", "Vehicle Type", "load_kg", "weight"])
+    
+    assert mapping == {"Time": "timestamp", "Vendor": "supplier_id", "dist": "distance_km", "Vehicle Type": "vehicle_type"}
+
+
+def test_confirmed_mapping_is_reused_for_the_supplier(registry):
+    df = pd.DataFrame({"when": ["2025-01-01T00:00:00Z"], "vendor": ["S-1"], "event_type": ["logistics"], "dist": [10]})
+    
+    async def run():
+        detected = await registry.resolve(df)
+        await registry.confirm(["S-1"], {**detected, "when": "timestamp"})
+        fresh = ColumnMappingRegistry(max_entries=100)
+        return detected, await fresh.resolve(df), await fresh.resolve(df, supplier_id="S-2")
+    
+    detected, registered, other_supplier = asyncio.run(run())
+    
+    assert detected == {"vendor": "supplier_id", "dist": "distance_km"}
+    assert registered == {"when": "timestamp", "vendor": "supplier_id", "dist": "distance_km"}
+    assert other_supplier == detected
+
+
+def test_pipeline_maps_columns_before_validation():
+    df = pd.DataFrame({
+        "Date": ["2025-01-01T00:00:00Z", "2025-01-02T00:00:00Z"],
+        "Vendor": ["S-1", "S-1"],
+        "event_type": ["logistics", "logistics"],
+        "dist": [10.0, 12.0]
+    })
+    context = PipelineContext(column_mapping=SchemaValidator.detect_column_mapping(df))
+    
+    full_pipeline.run(df, context)
+    
+    assert {"timestamp", "supplier_id", "distance_km"} <= set(df.columns)
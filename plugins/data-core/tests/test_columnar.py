@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.db.storage import async_db_client
+from src.ingestion import file_reader
+from src.ingestion.event_batch import ingest_event_frame, parse_columnar_batch
+
+
+def _table(n):
+    return pa.table({
+        "timestamp": pa.array(pd.date_range("2025-01-01", periods=n, freq="h", tz="UTC")),
+        "supplier_id": [f"S-{i % 3}" for i in range(n)],
+        "event_type": ["logistics"] * n,
+        "distance_km": [float(i) for i in range(n)],
+        "vehicle_type": ["Truck"] * n
+    })
+
+
+def test_parquet_chunks_keep_column_types(tmp_path):
+    path = tmp_path / "events.parquet"
+    pq.write_table(_table(25), path, row_group_size=7)
+    
+    chunks = list(file_reader.iter_chunks(str(path), "events.parquet", 10))
+    
+    assert [len(c) for c in chunks] == [10, 10, 5]
+    assert file_reader.estimate_rows(str(path), "events.parquet") == 25
+    assert pd.api.types.is_datetime64_any_dtype(chunks[0]["timestamp"])
+    assert pd.api.types.is_float_dtype(chunks[0]["distance_km"])
+    assert chunks[2]["distance_km"].tolist() == [20.0, 21.0, 22.0, 23.0, 24.0]
+
+
+def test_arrow_stream_body_is_read_and_rejected_when_corrupt():
+    sink = pa.BufferOutputStream()
+    table = _table(4)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    
+    df = parse_columnar_batch(sink.getvalue().to_pybytes(), "application/vnd.apache.arrow.stream")
+    
+    assert len(df) == 4
+    assert pd.api.types.is_float_dtype(df["distance_km"])
+    with pytest.raises(file_reader.FileFormatError):
+        parse_columnar_batch(b"not parquet", "application/vnd.apache.parquet")
+
+
+def test_ingest_event_frame_reports_invalid_rows(monkeypatch):
+    inserted = {}
+    
+    def fake_insert(table):
+        async def insert(rows):
+            inserted[table] = rows
+            return [{"chunk": 0, "rows": len(rows), "inserted": len(rows), "attempts": 1, "error": None}]
+        return insert
+    
+    monkeypatch.setattr(async_db_client, "insert_raw_events", fake_insert("raw"))
+    monkeypatch.setattr(async_db_client, "insert_normalized_events", fake_insert("normalized"))
+    
+    df = _table(3).to_pandas()
+    df.loc[1, "supplier_id"] = None
+    
+    result = asyncio.run(ingest_event_frame(df))
+    
+    assert result["stored"] == 2
+    assert result["errors"] == [{"index": 1, "errors": ["Missing required field: supplier_id"]}]
+    assert [r["vehicle_type"] for r in inserted["normalized"]] == ["truck", "truck"]
+    assert inserted["normalized"][1]["timestamp"] == "2025-01-01T02:00:00.000000+00:00"
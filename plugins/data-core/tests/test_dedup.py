@@ -0,0 +1,81 @@
+import asyncio
+import pandas as pd
+from src.db.storage import async_db_client
+from src.processing.dedup import BloomFilter, EventDeduplicator, content_hash
+from src.processing.pipeline import PipelineContext, full_pipeline
+from src.processing.serializer import RecordSerializer
+
+
+def _record(**overrides):
+    record = {
+        "timestamp": "2025-11-28T12:00:00",
+        "supplier_id": "S-1",
+        "event_type": "logistics",
+        "distance_km": 120.0,
+        "is_outlier": False,
+        "created_at": "2025-11-28T12:05:00"
+    }
+    record.update(overrides)
+    return record
+
+
+def test_content_hash_ignores_derived_fields():
+    assert content_hash(_record()) == content_hash(_record(is_outlier=True, created_at="later"))
+    assert content_hash(_record()) != content_hash(_record(distance_km=121.0))
+
+
+def test_content_hash_is_taken_before_normalization_and_gap_filling():
+    def upload(distance=None):
+        return pd.DataFrame({
+            "timestamp": ["2025-11-28T12:00:00Z", "2025-11-28T13:00:00Z"],
+            "supplier_id": ["S-1", "S-1"],
+            "event_type": ["logistics", "logistics"],
+            "vehicle_type": ["Truck", "Truck"],
+            "distance_km": [120.0, distance]
+        })
+    
+    filled, unfilled, changed = upload(), upload(), upload(distance=80.0)
+    full_pipeline.run(filled, PipelineContext())
+    full_pipeline.run(unfilled, PipelineContext(disabled_stages={"normalize", "gap_fill"}))
+    full_pipeline.run(changed, PipelineContext())
+    
+    assert filled["content_hash"].tolist() == unfilled["content_hash"].tolist()
+    assert filled["content_hash"][0] == changed["content_hash"][0]
+    assert filled["content_hash"][1] != changed["content_hash"][1]
+    
+    raw, normalized = RecordSerializer.to_records(filled, "file_upload")
+    assert normalized[0]["content_hash"] == filled["content_hash"][0]
+    assert "content_hash" not in raw[0]["payload"]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    added = [content_hash(_record(distance_km=float(i))) for i in range(1000)]
+    others = [content_hash(_record(distance_km=float(i))) for i in range(1000, 3000)]
+    
+    bloom.add_many(added)
+    
+    assert bloom.contains_many(added).all()
+    assert bloom.contains_many(others).mean() < 0.05
+
+
+def test_find_duplicates_confirms_filter_hits_against_stored_hashes(monkeypatch):
+    dedup = EventDeduplicator(capacity=1000, error_rate=0.01)
+    stored = content_hash(_record(distance_km=1.0))
+    new = content_hash(_record(distance_km=2.0))
+    dedup.bloom.add_many([stored])
+    lookups = []
+    
+    async def existing(hashes):
+        lookups.append(list(hashes))
+        return {stored} & set(hashes)
+    
+    monkeypatch.setattr(async_db_client, "get_existing_content_hashes", existing)
+    
+    duplicates = asyncio.run(dedup.find_duplicates([stored, new, new]))
+    
+    assert duplicates.tolist() == [True, False, True]
+    assert lookups == [[stored]]
+    # Hashes seen once are confirmed against the database from then on
+    assert asyncio.run(dedup.find_duplicates([new])).tolist() == [False]
+    assert lookups[-1] == [new]
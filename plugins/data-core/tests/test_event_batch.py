@@ -0,0 +1,92 @@
+import asyncio
+from src.db.storage import async_db_client
+from src.ingestion.event_batch import parse_event_batch, ingest_event_batch
+from src.ingestion.schema_validator import SchemaValidator
+
+
+def _event(**overrides):
+    event = {
+        "timestamp": "2025-11-28T12:00:00Z",
+        "supplier_id": "S-TEST-1",
+        "event_type": "logistics",
+        "distance_km": 120,
+        "vehicle_type": "Truck"
+    }
+    event.update(overrides)
+    return event
+
+
+def test_validate_events_reports_errors_by_index():
+    events = [
+        _event(),
+        _event(timestamp="yesterday"),
+        {"distance_km": "far"},
+        "not an event",
+        _event(load_kg=None)
+    ]
+
+    errors = SchemaValidator.validate_events(events)
+
+    assert sorted(errors) == [1, 2, 3]
+    assert errors[1] == ["Invalid timestamp: not an ISO 8601 timestamp"]
+    assert "Missing required field: supplier_id" in errors[2]
+    assert "Invalid numeric value for distance_km" in errors[2]
+    assert errors[3] == ["Event must be a JSON object"]
+    assert SchemaValidator.validate_event(events[1])[0] is False
+
+
+def test_parse_event_batch_keeps_ndjson_indexes_aligned():
+    body = b'{"supplier_id": "a"}\n\n{broken\n{"supplier_id": "b"}\n'
+
+    events, errors = parse_event_batch(body, "application/x-ndjson")
+
+    assert events == [{"supplier_id": "a"}, None, {"supplier_id": "b"}]
+    assert list(errors) == [1]
+    assert parse_event_batch(b'[{"a": 1}]', "application/json") == ([{"a": 1}], {})
+
+
+def test_ingest_event_batch_stores_valid_events_only(monkeypatch):
+    inserted = {}
+
+    def fake_insert(table):
+        async def insert(rows):
+            inserted[table] = rows
+            return [{"chunk": 0, "rows": len(rows), "inserted": len(rows), "attempts": 1, "error": None}]
+        return insert
+
+    monkeypatch.setattr(async_db_client, "insert_raw_events", fake_insert("raw"))
+    monkeypatch.setattr(async_db_client, "insert_normalized_events", fake_insert("normalized"))
+
+    result = asyncio.run(ingest_event_batch([_event(), {"supplier_id": "x"}, _event(vehicle_type="2W")]))
+
+    assert result["received"] == 3
+    assert result["stored"] == 2
+    assert result["rejected"] == 1
+    assert [e["index"] for e in result["errors"]] == [1]
+    assert [r["vehicle_type"] for r in inserted["normalized"]] == ["truck", "two_wheeler"]
+    assert inserted["normalized"][0]["timestamp"].startswith("2025-11-28T12:00:00")
+    assert inserted["raw"][0]["payload"]["vehicle_type"] == "Truck"
+
+
+def test_quality_rollups_skip_rows_from_failed_insert_chunks(monkeypatch):
+    from src.ingestion import event_batch
+    rolled_up = []
+
+    async def insert(rows):
+        return [
+            {"chunk": i, "rows": 1, "inserted": 0 if i == 1 else 1, "attempts": 1, "error": "timeout" if i == 1 else None}
+            for i in range(len(rows))
+        ]
+
+    async def record_quality_rollups(df):
+        rolled_up.extend(df["distance_km"].tolist())
+
+    monkeypatch.setattr(event_batch.settings, "insert_batch_size", 1)
+    monkeypatch.setattr(async_db_client, "insert_raw_events", insert)
+    monkeypatch.setattr(async_db_client, "insert_normalized_events", insert)
+    monkeypatch.setattr(event_batch, "record_quality_rollups", record_quality_rollups)
+
+    result = asyncio.run(ingest_event_batch([_event(distance_km=d) for d in (101, 102, 103)]))
+
+    assert result["stored"] == 2
+    assert rolled_up == [101, 103]
@@ -0,0 +1,45 @@
+import asyncio
+from src.ingestion import event_buffer
+from src.ingestion.event_buffer import EventWriteBuffer
+
+
+def test_buffer_flushes_micro_batches_and_drains_on_stop(monkeypatch):
+    batches = []
+    
+    async def fake_store(events):
+        batches.append(len(events))
+        return {"stored": len(events), "duplicates": 0, "errors": {}}
+    
+    monkeypatch.setattr(event_buffer, "store_events", fake_store)
+    
+    async def run():
+        buffer = EventWriteBuffer(max_size=2000, flush_rows=500, flush_interval_ms=50, drain_timeout_seconds=5)
+        await buffer.start()
+        for i in range(1200):
+            assert buffer.submit({"supplier_id": f"S-{i}"})
+        await buffer.stop()
+        return buffer
+    
+    buffer = asyncio.run(run())
+    
+    assert sum(batches) == 1200
+    assert max(batches) <= 500
+    assert buffer.flushed == 1200
+    assert buffer.pending() == 0
+
+
+def test_buffer_rejects_events_when_full(monkeypatch):
+    async def fake_store(events):
+        return {"stored": len(events), "duplicates": 0, "errors": {}}
+    
+    monkeypatch.setattr(event_buffer, "store_events", fake_store)
+    
+    async def run():
+        buffer = EventWriteBuffer(max_size=2, flush_rows=500, flush_interval_ms=50, drain_timeout_seconds=5)
+        await buffer.start()
+        # The flusher has not run yet, so the third event does not fit
+        accepted = [buffer.submit({"n": i}) for i in range(3)]
+        await buffer.stop()
+        return accepted
+    
+    assert asyncio.run(run()) == [True, True, False]
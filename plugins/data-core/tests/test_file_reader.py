@@ -0,0 +1,106 @@
+import pandas as pd
+import pyarrow as pa
+from openpyxl import Workbook
+from src.ingestion import file_reader
+
+
+def _write_csv(path, rows):
+    path.write_text("timestamp,supplier_id,event_type,distance_km\n" + "".join(rows))
+
+
+def test_csv_is_read_in_chunks_of_chunksize(tmp_path):
+    path = tmp_path / "events.csv"
+    _write_csv(path, [f"2025-01-01T{i:02d}:00:00Z,S-1,logistics,{i}\n" for i in range(7)])
+    
+    chunks = list(file_reader.iter_chunks(str(path), "events.csv", 3))
+    
+    assert [len(c) for c in chunks] == [3, 3, 1]
+    assert pd.concat(chunks)["distance_km"].tolist() == list(range(7))
+
+
+def test_malformed_csv_lines_are_skipped_and_reported(tmp_path):
+    path = tmp_path / "events.csv"
+    _write_csv(path, [
+        "2025-01-01T00:00:00Z,S-1,logistics,1\n",
+        "2025-01-01T01:00:00Z,S-1,logistics,2,extra,fields\n",
+        "2025-01-01T02:00:00Z,S-1,logistics,3\n"
+    ])
+    warnings = []
+    
+    chunks = list(file_reader.iter_chunks(str(path), "events.csv", 10, on_warning=warnings.append))
+    
+    assert pd.concat(chunks)["distance_km"].tolist() == [1, 3]
+    assert len(warnings) == 1
+    assert warnings[0].startswith("Warning: Skipped malformed CSV lines")
+
+
+def test_csv_estimate_skips_line_breaks_inside_quoted_fields(tmp_path):
+    path = tmp_path / "events.csv"
+    path.write_text(
+        'timestamp,supplier_id,event_type,notes\n'
+        '2025-01-01T00:00:00Z,S-1,logistics,"first line\nsecond line"\n'
+        '2025-01-01T01:00:00Z,S-1,logistics,"a ""quoted""\nnote"\n'
+        '2025-01-01T02:00:00Z,S-1,logistics,plain'
+    )
+    
+    chunks = list(file_reader.iter_chunks(str(path), "events.csv", 10))
+    
+    assert file_reader.estimate_rows(str(path), "events.csv") == 3
+    assert sum(len(c) for c in chunks) == 3
+
+
+def test_csv_estimate_carries_quote_state_across_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_reader, "SCAN_BLOCK_BYTES", 8)
+    path = tmp_path / "events.csv"
+    path.write_text('a,b\n1,"x\ny\nz"\n2,"w"\n')
+    
+    assert file_reader.estimate_rows(str(path), "events.csv") == 2
+
+
+def test_xlsx_is_streamed_in_chunks_skipping_blank_rows(tmp_path):
+    path = tmp_path / "events.xlsx"
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["timestamp", "supplier_id", "event_type", "distance_km"])
+    for i in range(5):
+        sheet.append([f"2025-01-01T{i:02d}:00:00Z", "S-1", "logistics", i])
+        if i == 2:
+            sheet.append([None, None, None, None])
+    workbook.save(path)
+    
+    chunks = list(file_reader.iter_chunks(str(path), "events.xlsx", 2))
+    
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert list(chunks[0].columns) == ["timestamp", "supplier_id", "event_type", "distance_km"]
+    assert pd.concat(chunks)["distance_km"].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_rechunk_regroups_batches_across_boundaries():
+    batches = [pa.record_batch({"n": list(range(start, end))}) for start, end in [(0, 3), (3, 4), (4, 11), (11, 12)]]
+    
+    chunks = list(file_reader._rechunk(iter(batches), 5))
+    
+    assert [len(c) for c in chunks] == [5, 5, 2]
+    assert [c["n"].tolist() for c in chunks] == [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9], [10, 11]]
+
+
+def test_rechunk_of_exact_multiple_has_no_trailing_chunk():
+    batches = [pa.record_batch({"n": list(range(4))}), pa.record_batch({"n": list(range(4, 8))})]
+    
+    chunks = list(file_reader._rechunk(iter(batches), 4))
+    
+    assert [len(c) for c in chunks] == [4, 4]
+
+
+def test_arrow_ipc_file_is_streamed_in_chunks(tmp_path):
+    path = tmp_path / "events.arrow"
+    table = pa.table({"n": list(range(9))})
+    with pa.OSFile(str(path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=2):
+                writer.write_batch(batch)
+    
+    chunks = list(file_reader.iter_chunks(str(path), "events.arrow", 4))
+    
+    assert [len(c) for c in chunks] == [4, 4, 1]
+    assert file_reader.estimate_rows(str(path), "events.arrow") == 9
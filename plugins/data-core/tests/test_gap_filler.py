@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from src.processing.gap_filler import GapFiller
+
+
+def _history(n=200):
+    rng = np.random.default_rng(0)
+    history = pd.DataFrame({
+        "event_type": "logistics",
+        "distance_km": rng.uniform(10, 200, n),
+        "speed": rng.uniform(30, 80, n)
+    })
+    history["load_kg"] = history["distance_km"] * 5 + rng.normal(0, 10, n)
+    return history
+
+
+def test_fill_gaps_uses_group_median_without_models(tmp_path):
+    filler = GapFiller(model_path=str(tmp_path / "missing.pkl"))
+    df = pd.DataFrame({
+        "event_type": ["logistics", "logistics", "logistics", "factory"],
+        "distance_km": [100.0, 200.0, np.nan, np.nan]
+    })
+    
+    filled = filler.fill_gaps(df)
+    
+    assert filled.loc[2, "distance_km"] == 150.0
+    assert filled.loc[2, "distance_km_confidence"] == 0.6
+    # distance_km is not relevant to factory events
+    assert pd.isna(filled.loc[3, "distance_km"])
+    assert filled["distance_km_filled"].tolist() == [False, False, True, False]
+
+
+def test_fitted_models_round_trip_and_predict(tmp_path):
+    path = str(tmp_path / "gap_filler_model.pkl")
+    filler = GapFiller(model_path=path)
+    filler.fit(_history())
+    filler.save_models()
+    
+    restored = GapFiller(model_path=path)
+    df = pd.DataFrame({"event_type": ["logistics"], "distance_km": [100.0], "speed": [50.0], "load_kg": [np.nan]})
+    filled = restored.fill_gaps(df)
+    
+    assert ("logistics", "load_kg") in restored.models
+    assert abs(filled.loc[0, "load_kg"] - 500.0) < 25
+    assert 0.5 < filled.loc[0, "load_kg_confidence"] <= 0.95
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from src.db.local_storage_client import LocalStorageClient, AsyncLocalStorageClient
+from src.ingestion import job_queue
+from src.ingestion.job_queue import IngestJobQueue
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage = AsyncLocalStorageClient(LocalStorageClient(str(tmp_path / "db.sqlite")))
+    monkeypatch.setattr(job_queue, "async_db_client", storage)
+    return storage
+
+
+def _spool(tmp_path, storage, job_id):
+    path = tmp_path / f"{job_id}.csv"
+    path.write_text("timestamp,supplier_id,event_type\n")
+    asyncio.run(storage.insert_ingest_job({"job_id": job_id, "status": "queued", "filename": "f.csv"}))
+    return str(path)
+
+
+def test_submit_returns_false_when_queue_is_full():
+    queue = IngestJobQueue(workers=0, max_pending=2)
+    with pytest.raises(RuntimeError):
+        queue.submit("j0", "/tmp/x.csv", "x.csv")
+    
+    async def run():
+        await queue.start()
+        accepted = [queue.submit(f"j{i}", "/tmp/x.csv", "x.csv") for i in range(3)]
+        pending = queue.pending()
+        await queue.stop()
+        return accepted, pending
+    
+    accepted, pending = asyncio.run(run())
+    
+    assert accepted == [True, True, False]
+    assert pending == 2
+
+
+def test_worker_runs_queued_jobs_with_their_options(monkeypatch):
+    processed = []
+    
+    async def fake_process_upload(job_id, path, filename, **options):
+        processed.append((job_id, filename, options))
+    
+    monkeypatch.setattr(job_queue, "process_upload", fake_process_upload)
+    
+    async def run():
+        queue = IngestJobQueue(workers=2, max_pending=10)
+        await queue.start()
+        assert queue.submit("j1", "/tmp/a.csv", "a.csv", skip_stages={"outliers"})
+        assert queue.submit("j2", "/tmp/b.csv", "b.csv")
+        await queue._queue.join()
+        await queue.stop()
+    
+    asyncio.run(run())
+    
+    assert sorted(processed) == [("j1", "a.csv", {"skip_stages": {"outliers"}}), ("j2", "b.csv", {})]
+
+
+def test_stop_fails_unfinished_jobs_and_removes_their_files(monkeypatch, tmp_path, storage):
+    started = []
+    
+    async def blocked_process_upload(job_id, path, filename, **options):
+        started.append(job_id)
+        await asyncio.Event().wait()
+    
+    monkeypatch.setattr(job_queue, "process_upload", blocked_process_upload)
+    paths = {job_id: _spool(tmp_path, storage, job_id) for job_id in ("running", "queued", "resumable")}
+    
+    async def run():
+        queue = IngestJobQueue(workers=1, max_pending=10)
+        await queue.start()
+        queue.submit("running", paths["running"], "f.csv")
+        queue.submit("queued", paths["queued"], "f.csv")
+        queue.submit("resumable", paths["resumable"], "f.csv", resumable=True)
+        await asyncio.sleep(0.01)
+        await queue.stop()
+        return queue, {job_id: await storage.get_ingest_job(job_id) for job_id in paths}
+    
+    queue, jobs = asyncio.run(run())
+    
+    assert started == ["running"]
+    assert queue.pending() == 0
+    assert {job_id: job["status"] for job_id, job in jobs.items()} == {job_id: "failed" for job_id in paths}
+    assert "upload the file again" in jobs["queued"]["errors"][0]
+    assert "commit the upload again" in jobs["resumable"]["errors"][0]
+    # A resumable upload keeps its file so a new commit can resume it
+    assert [job_id for job_id, path in paths.items() if (tmp_path / path).exists()] == ["resumable"]
@@ -0,0 +1,61 @@
+import asyncio
+from src.db.local_storage_client import LocalStorageClient, AsyncLocalStorageClient
+
+
+def _client(tmp_path):
+    return LocalStorageClient(str(tmp_path / "data_core.db"))
+
+
+def test_bulk_insert_skips_stored_content_hashes(tmp_path):
+    client = _client(tmp_path)
+    rows = [{"supplier_id": "S-1", "timestamp": f"2025-01-01T00:00:0{i}", "distance_km": i, "content_hash": f"h{i}"} for i in range(5)]
+    
+    results = client.insert_normalized_events(rows[:3])
+    client.insert_normalized_events(rows)
+    
+    assert results == [{"chunk": 0, "rows": 3, "inserted": 3, "attempts": 1, "error": None}]
+    assert len(client.get_normalized_events()) == 5
+    assert client.get_existing_content_hashes(["h0", "h4", "missing"]) == {"h0", "h4"}
+
+
+def test_ingest_job_round_trip_decodes_json_columns(tmp_path):
+    client = _client(tmp_path)
+    client.insert_ingest_job({"job_id": "job-1", "status": "processing", "filename": "a.csv", "file_hash": "abc"})
+    
+    client.update_ingest_job("job-1", {"status": "complete", "errors": [{"row": 2, "errors": ["bad"]}]})
+    
+    job = client.get_ingest_job("job-1")
+    assert job["status"] == "complete"
+    assert job["errors"] == [{"row": 2, "errors": ["bad"]}]
+    assert client.get_completed_job_by_file_hash("abc")["job_id"] == "job-1"
+    assert client.get_ingest_job("missing") is None
+
+
+def test_outlier_baselines_upsert_and_async_facade(tmp_path):
+    client = AsyncLocalStorageClient(_client(tmp_path))
+    baseline = {"supplier_id": "S-1", "event_type": "logistics", "field": "distance_km", "sample_count": 10, "summary": {"mean": 1.0}}
+    
+    async def run():
+        await client.upsert_outlier_baselines([baseline])
+        await client.upsert_outlier_baselines([{**baseline, "sample_count": 20}])
+        return await client.get_outlier_baselines(["S-1"])
+    
+    stored = asyncio.run(run())
+    
+    assert len(stored) == 1
+    assert stored[0]["sample_count"] == 20
+    assert stored[0]["summary"] == {"mean": 1.0}
+
+
+def test_quality_rollups_merge_additively(tmp_path):
+    client = _client(tmp_path)
+    first = [{"supplier_id": "S-1", "granularity": "day", "window_start": "2025-01-01T00:00:00+00:00",
+              "total_rows": 4, "predicted_count": 1, "anomalies_count": 0, "completeness_cells": 12, "completeness_total": 16}]
+    client.merge_quality_rollups(first)
+    client.merge_quality_rollups([{**first[0], "total_rows": 6, "predicted_count": 4, "anomalies_count": 2, "completeness_cells": 24, "completeness_total": 24}])
+    
+    rollup = client.get_quality_rollup("S-1", "day")
+    assert (rollup["total_rows"], rollup["predicted_count"], rollup["anomalies_count"]) == (10, 5, 2)
+    assert rollup["completeness_pct"] == 90.0
+    assert rollup["predicted_pct"] == 50.0
+    assert client.get_quality_rollup("S-1", "hour") is None
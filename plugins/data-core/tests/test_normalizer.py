@@ -0,0 +1,16 @@
+import pandas as pd
+from src.processing.normalizer import DataNormalizer
+
+
+def test_normalize_dataframe_maps_unique_values_and_reports_unmapped():
+    df = pd.DataFrame({
+        "vehicle_type": [" Truck", "2W", None, "hovercraft", "two_wheeler", "HoverCraft "],
+        "fuel_type": ["Diesel", "gasoline", "EV", None, "diesel", "cng"]
+    })
+    report = {}
+    
+    normalized = DataNormalizer.normalize_dataframe(df, report=report)
+    
+    assert normalized["vehicle_type"].tolist() == ["truck", "two_wheeler", None, "hovercraft", "two_wheeler", "hovercraft"]
+    assert normalized["fuel_type"].tolist() == ["diesel", "petrol", "electric", None, "diesel", "cng"]
+    assert report == {"vehicle_type": {"hovercraft": 2}}
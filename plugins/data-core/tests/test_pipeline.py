@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+from src.processing.pipeline import (
+    PipelineContext, PipelineValidationError, full_pipeline, parse_stage_names
+)
+
+
+def _events():
+    return pd.DataFrame({
+        "timestamp": ["2024-01-01T00:00:00", "2024-01-01T01:00:00", "2024-01-01T02:00:00"],
+        "supplier_id": ["SUP001", "SUP001", "SUP002"],
+        "event_type": ["logistics", "logistics", "logistics"],
+        "vehicle_type": ["Truck", "2W", "truck"],
+        "distance_km": [10.0, None, 30.0]
+    })
+
+
+def test_full_pipeline_runs_in_place_and_times_each_stage():
+    df = _events()
+    context = PipelineContext()
+    
+    result = full_pipeline.run(df, context)
+    
+    assert result is df
+    assert pd.api.types.is_datetime64_any_dtype(df["timestamp"])
+    assert df["vehicle_type"].tolist() == ["truck", "two_wheeler", "truck"]
+    assert "is_outlier" in df.columns
+    assert "distance_km_filled" in df.columns
+    assert list(context.stage_timings) == ["map_columns", "parse_timestamps", "validate", "content_hash", "normalize", "outliers", "gap_fill"]
+    assert context.stage_metrics["gap_fill"].rows_in == 3
+    assert context.stage_metrics["gap_fill"].rows_out == 3
+
+
+def test_measure_accumulates_calls_and_row_counts():
+    context = PipelineContext()
+    
+    for rows_in, rows_out in ((100, 90), (50, 50)):
+        with context.measure("dedup", rows_in) as call:
+            call.rows_out = rows_out
+    
+    summary = context.metrics_summary()["dedup"]
+    assert summary["calls"] == 2
+    assert summary["rows_in"] == 150
+    assert summary["rows_out"] == 140
+    assert summary["seconds"] >= 0
+    assert "memory_delta_mb" in summary
+
+
+def test_full_pipeline_skips_disabled_stages():
+    df = _events()
+    context = PipelineContext(disabled_stages={"outliers", "gap_fill"})
+    
+    full_pipeline.run(df, context)
+    
+    assert "is_outlier" not in df.columns
+    assert "distance_km_filled" not in df.columns
+    assert list(context.stage_timings) == ["map_columns", "parse_timestamps", "validate", "content_hash", "normalize"]
+
+
+def test_full_pipeline_rejects_unparseable_timestamps():
+    df = _events()
+    df.loc[1, "timestamp"] = "not a date"
+    
+    with pytest.raises(PipelineValidationError) as excinfo:
+        full_pipeline.run(df, PipelineContext())
+    
+    assert "Invalid timestamp format: 1 values could not be parsed" in excinfo.value.errors
+
+
+def test_parse_stage_names_rejects_required_stages():
+    assert parse_stage_names("outliers, gap_fill") == {"outliers", "gap_fill"}
+    assert parse_stage_names(None) == set()
+    with pytest.raises(ValueError):
+        parse_stage_names("validate")
@@ -0,0 +1,21 @@
+import pandas as pd
+from src.processing.quality_metrics import QualityMetrics
+
+
+def test_calculate_rollups_groups_by_supplier_and_window():
+    df = pd.DataFrame({
+        "timestamp": ["2025-01-01T00:10:00Z", "2025-01-01T00:50:00Z", "2025-01-01T05:00:00Z", "2025-01-01T05:00:00Z", None],
+        "supplier_id": ["S-1", "S-1", "S-1", "S-2", "S-1"],
+        "distance_km": [10.0, None, 30.0, 40.0, 1.0],
+        "distance_km_filled": [False, True, False, False, False],
+        "is_outlier": [False, False, True, False, False]
+    })
+    
+    rollups = {(r["supplier_id"], r["granularity"], r["window_start"]): r for r in QualityMetrics.calculate_rollups(df)}
+    
+    assert len(rollups) == 5
+    hour = rollups[("S-1", "hour", "2025-01-01T00:00:00+00:00")]
+    assert (hour["total_rows"], hour["predicted_count"], hour["completeness_cells"], hour["completeness_total"]) == (2, 1, 1, 2)
+    day = rollups[("S-1", "day", "2025-01-01T00:00:00+00:00")]
+    assert (day["total_rows"], day["predicted_count"], day["anomalies_count"]) == (3, 1, 1)
+    assert QualityMetrics.rollup_percentages(day) == {"completeness_pct": 66.67, "predicted_pct": 33.33}
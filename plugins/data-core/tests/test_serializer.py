@@ -0,0 +1,42 @@
+import json
+import numpy as np
+import pandas as pd
+from src.processing.serializer import RecordSerializer
+
+
+def _sample_df():
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(["2025-11-28 12:00:00", None]),
+        "supplier_id": ["S-TEST-1", None],
+        "event_type": ["logistics", "factory"],
+        "distance_km": [120, np.nan],
+        "energy_kwh": [np.nan, 300.5],
+        "vehicle_type": ["truck", None],
+        "is_outlier": [True, False]
+    })
+
+
+def test_to_records_converts_missing_and_timestamps():
+    raw, normalized = RecordSerializer.to_records(_sample_df(), data_source="file_upload")
+    
+    assert len(raw) == len(normalized) == 2
+    assert raw[0]["timestamp"].startswith("2025-11-28T12:00:00")
+    assert raw[1]["timestamp"] is None
+    assert raw[1]["payload"]["supplier_id"] is None
+    assert raw[0]["data_source"] == "file_upload"
+    
+    assert normalized[0]["distance_km"] == 120.0
+    assert isinstance(normalized[0]["distance_km"], float)
+    assert normalized[1]["distance_km"] is None
+    assert normalized[0]["load_kg"] is None
+    assert normalized[0]["is_outlier"] is True
+    
+    # Records must be JSON-serializable for the HTTP insert
+    json.dumps(raw)
+    json.dumps(normalized)
+
+
+def test_normalized_records_share_keys():
+    _, normalized = RecordSerializer.to_records(_sample_df(), data_source="csv_upload")
+    assert normalized[0].keys() == normalized[1].keys()
+
@@ -0,0 +1,136 @@
+import asyncio
+import numpy as np
+import pandas as pd
+from src.processing.streaming_stats import RunningMoments, KLLSketch, OutlierStatistics
+from src.processing.outlier_detector import OutlierDetector
+
+
+def test_running_moments_merge_matches_numpy():
+    values = np.random.default_rng(0).normal(50, 10, 1000)
+    
+    moments = RunningMoments().update(values[:300]).merge(RunningMoments().update(values[300:]))
+    
+    assert np.isclose(moments.mean, values.mean())
+    assert np.isclose(moments.std, values.std(ddof=1))
+
+
+def test_kll_sketch_is_exact_before_compaction():
+    values = np.arange(100, dtype=float)
+    sketch = KLLSketch(k=200).update(values)
+    
+    assert sketch.quantile(0.25) == np.quantile(values, 0.25)
+    assert sketch.quantile(0.75) == np.quantile(values, 0.75)
+
+
+def test_kll_sketch_merged_quantiles_are_close():
+    values = np.random.default_rng(1).normal(100, 15, 50000)
+    sketch = KLLSketch(seed=1).update(values[:25000]).merge(KLLSketch(seed=2).update(values[25000:]))
+    
+    assert abs(sketch.quantile(0.5) - np.quantile(values, 0.5)) < 1.5
+    assert sum(len(c) for c in sketch.compactors) < 1000
+
+
+def test_streaming_flags_match_in_memory_iqr():
+    df = pd.DataFrame({"distance_km": [10, 12, 11, 13, 500, 12, 11, 10]})
+    
+    stats = OutlierDetector.collect_statistics(df.iloc[:4])
+    OutlierDetector.collect_statistics(df.iloc[4:], stats)
+    
+    streamed = OutlierDetector.flag_outliers_with_statistics(df, stats)
+    in_memory = OutlierDetector.detect_outliers_iqr(df, ["distance_km"])
+    assert streamed["is_outlier"].tolist() == in_memory["is_outlier"].tolist()
+
+
+def test_grouped_statistics_round_trip():
+    df = pd.DataFrame({
+        "supplier_id": ["S-1", "S-1", "S-2"],
+        "event_type": ["logistics", "logistics", "factory"],
+        "distance_km": [10.0, 20.0, 30.0]
+    })
+    stats = OutlierStatistics(["distance_km"], ["supplier_id", "event_type"]).update(df)
+    
+    restored = OutlierStatistics.from_dict(stats.to_dict())
+    
+    assert restored.bounds("iqr") == stats.bounds("iqr")
+    assert ("S-2", "factory", "distance_km") in restored.stats
+
+
+def test_small_upload_uses_supplier_history(monkeypatch):
+    from src.processing.outlier_baselines import OutlierBaselineStore, BASELINE_GROUP_COLUMNS
+    from src.db.storage import async_db_client
+    
+    stored = {}
+    
+    async def get_baselines(ids):
+        return list(stored.values())
+    
+    async def upsert_baselines(rows):
+        stored.update({(r["supplier_id"], r["event_type"], r["field"]): r for r in rows})
+    
+    monkeypatch.setattr(async_db_client, "get_outlier_baselines", get_baselines)
+    monkeypatch.setattr(async_db_client, "upsert_outlier_baselines", upsert_baselines)
+    store = OutlierBaselineStore(max_entries=100)
+    
+    # History: 200 normal trips for one supplier
+    history = pd.DataFrame({
+        "supplier_id": "S-1",
+        "event_type": "logistics",
+        "distance_km": np.random.default_rng(2).normal(100, 5, 200)
+    })
+    history_stats = OutlierStatistics(["distance_km"], BASELINE_GROUP_COLUMNS).update(history)
+    asyncio.run(store.commit(history_stats))
+    
+    # A 3-row upload is judged against history, not against itself
+    upload = pd.DataFrame({"supplier_id": ["S-1"] * 3, "event_type": ["logistics"] * 3, "distance_km": [101.0, 99.0, 400.0]})
+    upload_stats = OutlierStatistics(["distance_km"], BASELINE_GROUP_COLUMNS).update(upload)
+    combined = asyncio.run(store.with_history(upload_stats))
+    
+    flagged = OutlierDetector.flag_outliers_with_statistics(upload, combined, min_samples=30)
+    assert flagged["is_outlier"].tolist() == [False, False, True]
+    
+    # Cache serves the key without another DB round-trip
+    stored.clear()
+    assert ("S-1", "logistics", "distance_km") in asyncio.run(store.get([("S-1", "logistics", "distance_km")])).stats
+
+
+def test_concurrent_commits_for_same_supplier_both_count(monkeypatch):
+    from src.processing.outlier_baselines import OutlierBaselineStore, BASELINE_GROUP_COLUMNS
+    from src.db.storage import async_db_client
+    
+    stored = {}
+    
+    async def get_baselines(ids):
+        rows = list(stored.values())
+        await asyncio.sleep(0.01)
+        return rows
+    
+    async def upsert_baselines(rows):
+        await asyncio.sleep(0.01)
+        stored.update({(r["supplier_id"], r["event_type"], r["field"]): r for r in rows})
+    
+    monkeypatch.setattr(async_db_client, "get_outlier_baselines", get_baselines)
+    monkeypatch.setattr(async_db_client, "upsert_outlier_baselines", upsert_baselines)
+    store = OutlierBaselineStore(max_entries=100)
+    
+    def upload(n):
+        frame = pd.DataFrame({"supplier_id": "S-1", "event_type": "logistics", "distance_km": np.arange(n, dtype=float)})
+        return OutlierStatistics(["distance_km"], BASELINE_GROUP_COLUMNS).update(frame)
+    
+    async def commit_both():
+        await asyncio.gather(store.commit(upload(10)), store.commit(upload(15)))
+    
+    asyncio.run(commit_both())
+    
+    assert stored[("S-1", "logistics", "distance_km")]["sample_count"] == 25
+
+
+def test_baseline_cache_evicts_least_recently_used(monkeypatch):
+    from src.processing.outlier_baselines import OutlierBaselineStore
+    from src.processing.streaming_stats import FieldStatistics
+    
+    store = OutlierBaselineStore(max_entries=2)
+    store._put(("S-1", "logistics", "speed"), FieldStatistics())
+    store._put(("S-2", "logistics", "speed"), FieldStatistics())
+    store._put(("S-3", "logistics", "speed"), FieldStatistics())
+    
+    assert list(store._cache) == [("S-2", "logistics", "speed"), ("S-3", "logistics", "speed")]
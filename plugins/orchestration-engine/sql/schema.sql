@@ -87,12 +87,42 @@ CREATE INDEX idx_audit_logs_action ON audit_logs(action);
 CREATE INDEX idx_audit_logs_entity ON audit_logs(entity_type, entity_id);
 CREATE INDEX idx_audit_logs_timestamp ON audit_logs(timestamp DESC);
 
+-- Scan watermarks (highest event id a scan has fully handled)
+CREATE TABLE IF NOT EXISTS scan_watermarks (
+    name TEXT PRIMARY KEY,
+    last_event_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Events the ML Engine rejected, with the number of scans that tried them
+CREATE TABLE IF NOT EXISTS prediction_failures (
+    event_id BIGINT PRIMARY KEY,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Next page of events after a watermark that have no prediction yet (anti-join on predictions),
+-- leaving out events that failed max_attempts times
+CREATE OR REPLACE FUNCTION events_without_predictions(after_id BIGINT, page_size INTEGER, max_attempts INTEGER)
+RETURNS SETOF events_normalized AS $$
+    SELECT e.*
+    FROM events_normalized e
+    WHERE e.id > after_id
+      AND NOT EXISTS (SELECT 1 FROM predictions p WHERE p.event_id = e.id)
+      AND NOT EXISTS (SELECT 1 FROM prediction_failures f WHERE f.event_id = e.id AND f.attempts >= max_attempts)
+    ORDER BY e.id
+    LIMIT page_size;
+$$ LANGUAGE sql STABLE;
+
 -- Comments
 COMMENT ON TABLE hotspots IS 'Detected emission hotspots with severity levels';
 COMMENT ON TABLE alerts IS 'Generated alerts for hotspots and anomalies';
 COMMENT ON TABLE baselines IS 'Baseline emission values for entities';
 COMMENT ON TABLE predictions IS 'Cached ML predictions for events';
 COMMENT ON TABLE audit_logs IS 'Audit trail for all actions';
+COMMENT ON TABLE scan_watermarks IS 'Incremental hotspot scan progress';
+COMMENT ON TABLE prediction_failures IS 'Events the ML Engine rejected, skipped after PREDICTION_MAX_ATTEMPTS scans';
 
 -- Sample data for testing
 -- INSERT INTO baselines (entity, entity_type, baseline_value, sample_size) VALUES
@@ -1,31 +1,45 @@
 """Data quality API routes."""
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Query
+from typing import Dict, Any, Optional
 from ..db.supabase_client import db_client
 from ..utils.logger import logger
 
 router = APIRouter(prefix="/data-quality", tags=["data-quality"])
 
+GRANULARITIES = ("hour", "day")
+
 
 @router.get("")
-async def get_data_quality() -> Dict[str, Any]:
-    """Get overall data quality metrics."""
+async def get_data_quality(
+    granularity: str = Query("day", description="Rollup window: hour or day"),
+    supplier_id: Optional[str] = Query(None, description="Limit to one supplier")
+) -> Dict[str, Any]:
+    """
+    Get overall data quality metrics.
+    
+    Reads the per-supplier rollups data-core maintains on ingest for the latest
+    window and combines them, weighting each supplier by its row counts.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(GRANULARITIES)}")
     try:
-        # Get quality metrics from database
-        response = db_client.client.table("data_quality")\
-            .select("*")\
-            .order("created_at", desc=True)\
-            .limit(1)\
-            .execute()
+        rollups = await db_client.get_latest_quality_rollups(granularity, supplier_id)
         
-        if response.data and len(response.data) > 0:
-            quality = response.data[0]
+        if rollups:
+            total_rows = sum(r.get("total_rows") or 0 for r in rollups)
+            completeness_total = sum(r.get("completeness_total") or 0 for r in rollups)
+            completeness_cells = sum(r.get("completeness_cells") or 0 for r in rollups)
+            predicted_count = sum(r.get("predicted_count") or 0 for r in rollups)
+            # Same rule as data-core's QualityMetrics.rollup_percentages: no expected cells is 0%
             return {
-                "completeness_pct": quality.get("completeness_pct", 0),
-                "predicted_pct": quality.get("predicted_pct", 0),
-                "anomalies_count": quality.get("anomalies_count", 0),
-                "total_rows": quality.get("total_rows", 0),
-                "last_updated": quality.get("created_at")
+                "completeness_pct": round(completeness_cells / completeness_total * 100, 2) if completeness_total else 0,
+                "predicted_pct": round(predicted_count / total_rows * 100, 2) if total_rows else 0,
+                "anomalies_count": sum(r.get("anomalies_count") or 0 for r in rollups),
+                "total_rows": total_rows,
+                "suppliers": len(rollups),
+                "granularity": granularity,
+                "window_start": rollups[0]["window_start"],
+                "last_updated": max(r.get("updated_at") or r.get("created_at") for r in rollups)
             }
         
         # Return defaults if no data
@@ -34,9 +48,12 @@ async def get_data_quality() -> Dict[str, Any]:
             "predicted_pct": 0,
             "anomalies_count": 0,
             "total_rows": 0,
+            "suppliers": 0,
+            "granularity": granularity,
+            "window_start": None,
             "last_updated": None
         }
-        
+    
     except Exception as e:
         logger.error(f"Error getting data quality: {e}")
         raise HTTPException(status_code=500, detail=str(e))
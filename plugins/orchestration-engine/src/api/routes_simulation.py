@@ -2,7 +2,7 @@
 from fastapi import APIRouter, HTTPException
 from typing import Dict, Any
 from pydantic import BaseModel
-from ..services.ml_client import ml_client
+from ..services.ml_client import ml_client, PREDICTION_TYPES
 from ..utils.logger import logger
 
 router = APIRouter(prefix="/simulate", tags=["simulation"])
@@ -46,7 +46,7 @@ async def run_simulation(request: SimulationRequest) -> Dict[str, Any]:
             "scenario_type": request.scenario_type,
             "changes_applied": request.changes
         }
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -56,16 +56,9 @@ async def run_simulation(request: SimulationRequest) -> Dict[str, Any]:
 
 async def _get_prediction(scenario_type: str, features: Dict[str, Any]) -> float:
     """Get prediction based on scenario type."""
-    if scenario_type == "logistics":
-        return await ml_client.predict_logistics(features)
-    elif scenario_type == "factory":
-        return await ml_client.predict_factory(features)
-    elif scenario_type == "warehouse":
-        return await ml_client.predict_warehouse(features)
-    elif scenario_type == "delivery":
-        return await ml_client.predict_delivery(features)
-    else:
+    if scenario_type not in PREDICTION_TYPES:
         raise HTTPException(status_code=400, detail=f"Unknown scenario type: {scenario_type}")
+    return await ml_client.predict(scenario_type, features)
 
 
 @router.post("/batch")
@@ -86,7 +79,7 @@ async def run_batch_simulation(scenarios: list[SimulationRequest]) -> list[Dict[
                 })
         
         return results
-        
+    
     except Exception as e:
         logger.error(f"Error running batch simulation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,4 +1,6 @@
 """Supabase database client."""
+import asyncio
+from datetime import datetime
 from typing import Optional, List, Dict, Any
 from supabase import create_client, Client
 from ..utils.config import settings
@@ -16,37 +18,78 @@ class SupabaseClient:
         )
         logger.info("Supabase client initialized")
     
+    async def _execute(self, query):
+        """Run a built query in a worker thread so concurrent scans don't block the event loop."""
+        return await asyncio.to_thread(query.execute)
+    
     async def get_recent_events(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Get recent normalized events."""
         try:
-            response = self.client.table("events_normalized")\
+            response = await self._execute(self.client.table("events_normalized")\
                 .select("*")\
                 .order("timestamp", desc=True)\
-                .limit(limit)\
-                .execute()
+                .limit(limit))
             return response.data
         except Exception as e:
             logger.error(f"Error fetching events: {e}")
             return []
     
-    async def get_events_without_predictions(self, limit: int = 50) -> List[Dict[str, Any]]:
-        """Get events that don't have predictions yet."""
+    async def get_events_without_predictions(self, after_id: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get the next events after an event id that don't have predictions yet and are not given up on, oldest first."""
         try:
-            # Get events that aren't in predictions table
-            response = self.client.table("events_normalized")\
-                .select("*")\
-                .order("timestamp", desc=True)\
-                .limit(limit)\
-                .execute()
+            response = await self._execute(self.client.rpc(
+                "events_without_predictions",
+                {"after_id": after_id, "page_size": limit, "max_attempts": settings.prediction_max_attempts}
+            ))
             return response.data
         except Exception as e:
             logger.error(f"Error fetching unpredicted events: {e}")
             return []
     
+    async def get_scan_watermark(self, name: str) -> int:
+        """Get the last event id a scan has handled (0 if it never ran)."""
+        try:
+            response = await self._execute(self.client.table("scan_watermarks")\
+                .select("last_event_id")\
+                .eq("name", name))
+            return response.data[0]["last_event_id"] if response.data else 0
+        except Exception as e:
+            logger.error(f"Error fetching scan watermark: {e}")
+            return 0
+    
+    async def set_scan_watermark(self, name: str, last_event_id: int) -> None:
+        """Record the last event id a scan has handled."""
+        try:
+            await self._execute(self.client.table("scan_watermarks").upsert({
+                "name": name,
+                "last_event_id": last_event_id,
+                "updated_at": datetime.utcnow().isoformat()
+            }))
+        except Exception as e:
+            logger.error(f"Error saving scan watermark: {e}")
+    
+    async def record_prediction_failures(self, failures: Dict[int, str]) -> Dict[int, int]:
+        """Count one more failed prediction attempt per event id; returns the attempts so far by event id."""
+        try:
+            event_ids = list(failures)
+            response = await self._execute(self.client.table("prediction_failures")\
+                .select("event_id, attempts")\
+                .in_("event_id", event_ids))
+            attempts = {row["event_id"]: row["attempts"] + 1 for row in response.data}
+            now = datetime.utcnow().isoformat()
+            await self._execute(self.client.table("prediction_failures").upsert([
+                {"event_id": event_id, "attempts": attempts.get(event_id, 1), "last_error": error, "updated_at": now}
+                for event_id, error in failures.items()
+            ]))
+            return {event_id: attempts.get(event_id, 1) for event_id in event_ids}
+        except Exception as e:
+            logger.error(f"Error recording prediction failures: {e}")
+            return {}
+    
     async def insert_prediction(self, prediction: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Insert ML prediction."""
         try:
-            response = self.client.table("predictions").insert(prediction).execute()
+            response = await self._execute(self.client.table("predictions").insert(prediction))
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Error inserting prediction: {e}")
@@ -55,7 +98,7 @@ class SupabaseClient:
     async def insert_hotspot(self, hotspot: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Insert detected hotspot."""
         try:
-            response = self.client.table("hotspots").insert(hotspot).execute()
+            response = await self._execute(self.client.table("hotspots").insert(hotspot))
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Error inserting hotspot: {e}")
@@ -64,7 +107,7 @@ class SupabaseClient:
     async def insert_alert(self, alert: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Insert alert."""
         try:
-            response = self.client.table("alerts").insert(alert).execute()
+            response = await self._execute(self.client.table("alerts").insert(alert))
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Error inserting alert: {e}")
@@ -73,11 +116,10 @@ class SupabaseClient:
     async def get_baseline(self, entity: str, entity_type: str) -> Optional[float]:
         """Get baseline emission for entity."""
         try:
-            response = self.client.table("baselines")\
+            response = await self._execute(self.client.table("baselines")\
                 .select("baseline_value")\
                 .eq("entity", entity)\
-                .eq("entity_type", entity_type)\
-                .execute()
+                .eq("entity_type", entity_type))
             
             if response.data:
                 return response.data[0]["baseline_value"]
@@ -89,7 +131,7 @@ class SupabaseClient:
     async def upsert_baseline(self, baseline: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Insert or update baseline."""
         try:
-            response = self.client.table("baselines").upsert(baseline).execute()
+            response = await self._execute(self.client.table("baselines").upsert(baseline))
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Error upserting baseline: {e}")
@@ -98,11 +140,10 @@ class SupabaseClient:
     async def get_recent_predictions(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Get recent predictions."""
         try:
-            response = self.client.table("predictions")\
+            response = await self._execute(self.client.table("predictions")\
                 .select("*")\
                 .order("created_at", desc=True)\
-                .limit(limit)\
-                .execute()
+                .limit(limit))
             return response.data
         except Exception as e:
             logger.error(f"Error fetching recent predictions: {e}")
@@ -112,12 +153,11 @@ class SupabaseClient:
         """Get predictions for a specific entity (supplier/route)."""
         try:
             # Get predictions joined with events to filter by entity
-            response = self.client.table("predictions")\
+            response = await self._execute(self.client.table("predictions")\
                 .select("*, events_normalized!inner(supplier_id)")\
                 .eq("events_normalized.supplier_id", entity)\
                 .order("created_at", desc=True)\
-                .limit(limit)\
-                .execute()
+                .limit(limit))
             return response.data
         except Exception as e:
             logger.error(f"Error fetching predictions for entity {entity}: {e}")
@@ -126,11 +166,10 @@ class SupabaseClient:
     async def get_active_hotspots(self) -> List[Dict[str, Any]]:
         """Get currently active hotspots."""
         try:
-            response = self.client.table("hotspots")\
+            response = await self._execute(self.client.table("hotspots")\
                 .select("*")\
                 .eq("status", "active")\
-                .order("created_at", desc=True)\
-                .execute()
+                .order("created_at", desc=True))
             return response.data
         except Exception as e:
             logger.error(f"Error fetching hotspots: {e}")
@@ -142,7 +181,7 @@ class SupabaseClient:
             query = self.client.table("recommendations").select("*")
             if status:
                 query = query.eq("status", status)
-            response = query.order("created_at", desc=True).execute()
+            response = await self._execute(query.order("created_at", desc=True))
             return response.data
         except Exception as e:
             logger.error(f"Error fetching recommendations: {e}")
@@ -154,7 +193,7 @@ class SupabaseClient:
             query = self.client.table("recommendations").select("*").eq("supplier_id", entity)
             if status:
                 query = query.eq("status", status)
-            response = query.order("created_at", desc=True).limit(5).execute()
+            response = await self._execute(query.order("created_at", desc=True).limit(5))
             return response.data
         except Exception as e:
             logger.error(f"Error fetching recommendations by entity: {e}")
@@ -163,19 +202,44 @@ class SupabaseClient:
     async def update_recommendation_status(self, rec_id: int, status: str) -> bool:
         """Update recommendation status."""
         try:
-            self.client.table("recommendations")\
+            await self._execute(self.client.table("recommendations")\
                 .update({"status": status})\
-                .eq("id", rec_id)\
-                .execute()
+                .eq("id", rec_id))
             return True
         except Exception as e:
             logger.error(f"Error updating recommendation: {e}")
             return False
     
+    async def get_latest_quality_rollups(
+        self,
+        granularity: str = "day",
+        supplier_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get per-supplier data quality rollups for the most recent window."""
+        try:
+            query = self.client.table("data_quality").select("window_start").eq("granularity", granularity)
+            if supplier_id:
+                query = query.eq("supplier_id", supplier_id)
+            latest = await self._execute(query.order("window_start", desc=True).limit(1))
+            if not latest.data:
+                return []
+            
+            query = self.client.table("data_quality")\
+                .select("*")\
+                .eq("granularity", granularity)\
+                .eq("window_start", latest.data[0]["window_start"])
+            if supplier_id:
+                query = query.eq("supplier_id", supplier_id)
+            response = await self._execute(query)
+            return response.data
+        except Exception as e:
+            logger.error(f"Error fetching data quality rollups: {e}")
+            return []
+    
     async def insert_audit_log(self, log: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Insert audit log entry."""
         try:
-            response = self.client.table("audit_logs").insert(log).execute()
+            response = await self._execute(self.client.table("audit_logs").insert(log))
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Error inserting audit log: {e}")
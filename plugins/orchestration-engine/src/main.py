@@ -9,6 +9,8 @@ from .api import routes_dashboard, routes_hotspots, routes_recommendations, rout
 from .services.scheduler import scheduler
 from .services.websocket_manager import sio
 from .services.hotspot_engine import hotspot_engine
+from .services.ml_client import ml_client
+from .services.rag_client import rag_client
 
 
 @asynccontextmanager
@@ -20,6 +22,10 @@ async def lifespan(app: FastAPI):
     logger.info(f"Data Core URL: {settings.data_core_url}")
     logger.info(f"RAG Service URL: {settings.rag_service_url}")
     
+    # Open pooled HTTP clients to downstream services
+    await ml_client.http.start()
+    await rag_client.http.start()
+    
     # Start scheduler
     scheduler.start()
     logger.info("Scheduler started")
@@ -31,6 +37,8 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down Orchestration Engine...")
     scheduler.shutdown()
     logger.info("Scheduler stopped")
+    await ml_client.http.close()
+    await rag_client.http.close()
 
 
 # Create FastAPI app
@@ -62,10 +70,16 @@ app.include_router(routes_data_quality.router)
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
+    circuit_breakers = {
+        "ml_engine": ml_client.http.breaker.snapshot(),
+        "rag_service": rag_client.http.breaker.snapshot()
+    }
+    degraded = any(breaker["state"] != "closed" for breaker in circuit_breakers.values())
     return {
-        "status": "healthy",
+        "status": "degraded" if degraded else "healthy",
         "service": "orchestration-engine",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "circuit_breakers": circuit_breakers
     }
 
 
@@ -94,7 +108,7 @@ async def trigger_immediate_analysis():
     """
     Trigger immediate hotspot detection and prediction.
     Called automatically after CSV upload.
-    Processes up to 200 recent events.
+    Processes events added since the last scan, 200 per page.
     """
     try:
         logger.info("🚀 Immediate analysis triggered by CSV upload")
@@ -1,12 +1,15 @@
 """Hotspot detection engine."""
-from typing import Dict, Any, Optional, List
-from datetime import datetime
+import asyncio
+from typing import Dict, Any, Optional, List, Set, Tuple
+from datetime import datetime, timedelta, timezone
 from ..utils.config import settings
 from ..utils.logger import logger
 from ..db.supabase_client import db_client
-from .ml_client import ml_client
+from .ml_client import ml_client, BatchPrediction
 from .rag_client import rag_client
 
+SCAN_WATERMARK = "hotspot_scan"
+
 
 class HotspotEngine:
     """Engine for detecting emission hotspots."""
@@ -18,6 +21,7 @@ class HotspotEngine:
             "warn": settings.threshold_warn,
             "critical": settings.threshold_critical
         }
+        self._scan_lock = asyncio.Lock()
     
     def calculate_severity(self, predicted: float, baseline: float) -> str:
         """Calculate hotspot severity level."""
@@ -41,15 +45,29 @@ class HotspotEngine:
             return 100.0
         return ((predicted - baseline) / baseline) * 100
     
-    async def detect_hotspots_for_event(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Detect hotspot for a single event."""
+    @staticmethod
+    def get_entity(event: Dict[str, Any]) -> Tuple[str, str]:
+        """Entity an event is measured against, as (entity, entity_type)."""
+        entity = event.get("supplier_id") or event.get("route_id") or "Unknown"  # Fixed: was supplier_name
+        entity_type = "supplier" if event.get("supplier_id") else "route"
+        return entity, entity_type
+    
+    async def detect_hotspots_for_event(
+        self,
+        event: Dict[str, Any],
+        prediction: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Detect hotspot for a single event (prediction: its batch prediction record, not yet saved)."""
         try:
             # Determine entity and type
-            entity = event.get("supplier_id") or event.get("route_id") or "Unknown"  # Fixed: was supplier_name
-            entity_type = "supplier" if event.get("supplier_id") else "route"
+            entity, entity_type = self.get_entity(event)
             
             # Get prediction based on event type
-            predicted_co2 = await self._get_prediction(event)
+            if prediction is None:
+                predicted_co2 = await self._get_prediction(event)
+            else:
+                predicted_co2 = prediction["predicted_co2"]
+                await db_client.insert_prediction(prediction)
             if predicted_co2 is None:
                 logger.warning(f"Could not get prediction for event {event.get('id')}")
                 return None
@@ -122,16 +140,14 @@ class HotspotEngine:
                 logger.error(f"Error emitting hotspot via WebSocket: {e}")
             
             return inserted_hotspot
-            
+        
         except Exception as e:
             logger.error(f"Error detecting hotspot: {e}")
             return None
     
-    async def _get_prediction(self, event: Dict[str, Any]) -> Optional[float]:
-        """Get ML prediction for event."""
-        # Determine event type and prepare features
+    def _build_features(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Build ML features for an event (None if its type or data cannot be predicted)."""
         prediction_type = event.get("event_type", "").lower()
-        predicted_co2 = None
         features = {}
         
         # Use event_type field to determine which prediction to make
@@ -148,13 +164,12 @@ class HotspotEngine:
             features = {
                 "distance_km": distance,
                 "load_kg": load,
-                "vehicle_type": event.get("vehicle_type", "truck"),
-                "fuel_type": event.get("fuel_type", "diesel"),
+                "vehicle_type": event.get("vehicle_type") or "truck",
+                "fuel_type": event.get("fuel_type") or "diesel",
                 "avg_speed": float(event.get("speed", 50) or 50),
                 "stop_events": int(event.get("stop_events", 0) or 0)
             }
-            predicted_co2 = await ml_client.predict_logistics(features)
-            
+        
         elif prediction_type == "factory":
             # Factory event - ensure all required fields are present and valid
             energy = float(event.get("energy_kwh", 0) or 0)
@@ -172,8 +187,7 @@ class HotspotEngine:
                 "furnace_usage": float(event.get("furnace_usage", 0) or 0),
                 "cooling_load": float(event.get("cooling_load", 0) or 0)
             }
-            predicted_co2 = await ml_client.predict_factory(features)
-            
+        
         elif prediction_type == "warehouse":
             # Warehouse event - temperature is required
             temperature = float(event.get("temperature", 20) or 20)
@@ -184,8 +198,7 @@ class HotspotEngine:
                 "refrigeration_load": float(event.get("refrigeration_load", 0) or 0),
                 "inventory_volume": float(event.get("inventory_volume", 0) or 0)
             }
-            predicted_co2 = await ml_client.predict_warehouse(features)
-            
+        
         elif prediction_type == "delivery":
             # Delivery event - ensure route_length is valid
             route_length = float(event.get("distance_km", 0) or 0)
@@ -197,29 +210,85 @@ class HotspotEngine:
             
             features = {
                 "route_length": route_length,
-                "vehicle_type": event.get("vehicle_type", "truck"),
+                "vehicle_type": event.get("vehicle_type") or "truck",
                 "traffic_score": int(event.get("traffic_score", 3) or 3),
                 "delivery_count": int(event.get("delivery_count", 1) or 1)
             }
-            predicted_co2 = await ml_client.predict_delivery(features)
         
         else:
             logger.warning(f"Unknown event type: {prediction_type}")
             return None
         
+        return features
+    
+    async def _get_prediction(self, event: Dict[str, Any]) -> Optional[float]:
+        """Get ML prediction for event."""
+        features = self._build_features(event)
+        if features is None:
+            return None
+        
+        prediction_type = event.get("event_type", "").lower()
+        predicted_co2 = await ml_client.predict(prediction_type, features)
+        
         # Save prediction to database
         if predicted_co2 is not None:
-            await db_client.insert_prediction({
-                "event_id": event.get("id"),
-                "prediction_type": prediction_type,
-                "predicted_co2": predicted_co2,
-                "confidence_score": 0.85,  # Default confidence
-                "model_version": "v1.0",
-                "features": features
-            })
+            await db_client.insert_prediction(self._prediction_record(event, prediction_type, predicted_co2, features))
         
         return predicted_co2
     
+    async def _get_predictions(
+        self,
+        events: List[Dict[str, Any]],
+        event_features: List[Optional[Dict[str, Any]]],
+        semaphore: Optional[asyncio.Semaphore] = None
+    ) -> Tuple[List[Optional[Dict[str, Any]]], Dict[int, BatchPrediction]]:
+        """
+        Get ML predictions for many events with one batch call per event type.
+        
+        Returns the prediction record of each event (None if it was not predicted) and the
+        failed batch items by event index; events without features are in neither. ML calls
+        hold a slot of semaphore if given. Records are saved as their events are processed,
+        so baselines see them in scan order.
+        """
+        features_by_type: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+        for idx, (event, features) in enumerate(zip(events, event_features)):
+            if features is not None:
+                features_by_type.setdefault(event.get("event_type", "").lower(), []).append((idx, features))
+        
+        prediction_types = list(features_by_type)
+        batches = await asyncio.gather(*(
+            ml_client.predict_batch(prediction_type, [features for _, features in features_by_type[prediction_type]], semaphore)
+            for prediction_type in prediction_types
+        ))
+        
+        # Batch results come back in request order
+        predictions: List[Optional[Dict[str, Any]]] = [None] * len(events)
+        failures: Dict[int, BatchPrediction] = {}
+        for prediction_type, batch in zip(prediction_types, batches):
+            for (idx, features), prediction in zip(features_by_type[prediction_type], batch):
+                if prediction.co2_kg is None:
+                    failures[idx] = prediction
+                else:
+                    predictions[idx] = self._prediction_record(events[idx], prediction_type, prediction.co2_kg, features)
+        
+        predicted = sum(1 for prediction in predictions if prediction)
+        logger.info(
+            f"Batch predictions: {predicted} predicted, {len(failures)} failed, "
+            f"{len(events) - predicted - len(failures)} not predictable, in {len(prediction_types)} ML calls"
+        )
+        return predictions, failures
+    
+    @staticmethod
+    def _prediction_record(event: Dict[str, Any], prediction_type: str, predicted_co2: float, features: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "event_id": event.get("id"),
+            "prediction_type": prediction_type,
+            "predicted_co2": predicted_co2,
+            "confidence_score": 0.85,  # Default confidence
+            "model_version": "v1.0",
+            "features": features
+        }
+    
     async def _calculate_baseline(self, entity: str, entity_type: str) -> Optional[float]:
         """Calculate baseline from historical predictions."""
         try:
@@ -243,7 +312,7 @@ class HotspotEngine:
             
             logger.info(f"Calculated baseline for {entity}: {baseline:.2f} kg CO₂ (from {len(co2_values)} predictions)")
             return baseline
-            
+        
         except Exception as e:
             logger.error(f"Error calculating baseline: {e}")
             return None
@@ -268,7 +337,7 @@ class HotspotEngine:
                     await ws_manager.emit_alert(inserted_alert)
                 except Exception as e:
                     logger.error(f"Error emitting alert via WebSocket: {e}")
-            
+        
         except Exception as e:
             logger.error(f"Error generating alert: {e}")
     
@@ -300,49 +369,165 @@ class HotspotEngine:
             
             if result:
                 logger.info(f"Recommendations generated for hotspot {hotspot['id']}")
-            
+        
         except Exception as e:
             logger.error(f"Error generating recommendations: {e}")
     
     async def scan_for_hotspots(self, limit: int = 200) -> List[Dict[str, Any]]:
-        """Scan recent events for hotspots."""
-        try:
-            logger.info(f"Starting hotspot scan (processing up to {limit} events)...")
-            
-            # Get recent events (increased limit for faster processing after upload)
-            events = await db_client.get_events_without_predictions(limit=limit)
-            
-            if not events:
-                logger.info("No events to process")
-                return []
-            
-            logger.info(f"Processing {len(events)} events for predictions...")
-            
-            hotspots = []
-            predictions_generated = 0
-            
-            for idx, event in enumerate(events, 1):
-                try:
-                    hotspot = await self.detect_hotspots_for_event(event)
-                    if hotspot:
-                        hotspots.append(hotspot)
-                    predictions_generated += 1
+        """Scan events added since the last scan for hotspots, in pages of `limit` events."""
+        if self._scan_lock.locked():
+            logger.info("Hotspot scan already running, waiting for it to finish...")
+        
+        # One scan at a time, so concurrent triggers don't predict the same events twice
+        async with self._scan_lock:
+            try:
+                watermark = await db_client.get_scan_watermark(SCAN_WATERMARK)
+                logger.info(f"Starting hotspot scan after event {watermark} (pages of {limit} events)...")
+                
+                # Inserts commit concurrently, so an event can show up after events with higher
+                # ids were scanned; the watermark only passes events older than the lag
+                settled_before = datetime.now(timezone.utc) - timedelta(seconds=settings.scan_watermark_lag)
+                hotspots = []
+                processed = 0
+                cursor = watermark
+                held = False
+                blocked: Set[Tuple[str, str]] = set()
+                while True:
+                    # Next events without predictions, oldest first
+                    events = await db_client.get_events_without_predictions(after_id=cursor, limit=limit)
+                    if not events:
+                        break
                     
-                    # Log progress every 10 events
-                    if idx % 10 == 0:
-                        logger.info(f"Progress: {idx}/{len(events)} events processed, {len(hotspots)} hotspots found")
-                        
-                except Exception as e:
-                    logger.error(f"Error processing event {event.get('id')}: {e}")
-                    continue
-            
-            logger.info(f"✅ Hotspot scan complete. Processed {predictions_generated} events, found {len(hotspots)} hotspots.")
-            return hotspots
+                    page_hotspots, handled, unreachable = await self._scan_page(events, blocked)
+                    hotspots.extend(page_hotspots)
+                    processed += handled
+                    # The watermark stops before the first pending or recent event; the next scan
+                    # resumes there, and the anti-join skips events handled in the meantime
+                    settled = 0 if held else self._count_settled(events[:handled], settled_before)
+                    if settled:
+                        watermark = events[settled - 1]["id"]
+                        await db_client.set_scan_watermark(SCAN_WATERMARK, watermark)
+                    held = held or settled < len(events)
+                    cursor = events[-1]["id"]
+                    
+                    # While the ML Engine is unreachable, leave the remaining events for the next scan
+                    if unreachable or len(events) < limit:
+                        break
+                
+                if not processed:
+                    logger.info("No events to process")
+                logger.info(f"✅ Hotspot scan complete. Processed {processed} events up to event {watermark}, found {len(hotspots)} hotspots.")
+                return hotspots
             
-        except Exception as e:
-            logger.error(f"Error scanning for hotspots: {e}")
-            return []
-
+            except Exception as e:
+                logger.error(f"Error scanning for hotspots: {e}")
+                return []
+    
+    @staticmethod
+    def _count_settled(events: List[Dict[str, Any]], settled_before: datetime) -> int:
+        """Count the leading events created before settled_before."""
+        for count, event in enumerate(events):
+            created_at = event.get("created_at")
+            if not created_at:
+                continue
+            created_at = datetime.fromisoformat(created_at)
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)
+            if created_at > settled_before:
+                return count
+        return len(events)
+    
+    async def _scan_page(
+        self,
+        events: List[Dict[str, Any]],
+        blocked: Set[Tuple[str, str]]
+    ) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """
+        Predict and detect hotspots for one page of events (ordered by id).
+        
+        Returns the hotspots found, how many leading events of the page are done with and
+        whether the ML Engine was unreachable. Events whose prediction failed stay pending
+        until the ML Engine has rejected them prediction_max_attempts times; the first
+        pending event and all after it are not done with, so the watermark never skips
+        an event that may still be predicted. Entities with a pending event are added to
+        blocked; their later events wait for the next scan.
+        """
+        # While the ML Engine is failing, leave events queued for the next scan
+        if ml_client.http.breaker.is_open():
+            logger.warning(f"ML Engine circuit open, leaving {len(events)} events for the next scan")
+            return [], 0, True
+        
+        logger.info(f"Processing {len(events)} events for predictions...")
+        
+        # Batch ML calls and event processing share the scan's concurrency limit
+        semaphore = asyncio.Semaphore(max(1, settings.scan_concurrency))
+        event_features = [self._build_features(event) for event in events]
+        predictions, failures = await self._get_predictions(events, event_features, semaphore)
+        if ml_client.http.breaker.is_open():
+            # Nothing was saved yet, so all events stay queued
+            logger.warning(f"ML Engine circuit opened during batch predictions, leaving {len(events)} events for the next scan")
+            return [], 0, True
+        
+        # Rejected events are retried by the next scans until they run out of attempts;
+        # events that failed because the ML Engine is unreachable are always retried
+        rejected = {events[idx]["id"]: failure.error for idx, failure in failures.items() if not failure.retryable}
+        attempts = await db_client.record_prediction_failures(rejected) if rejected else {}
+        given_up = {
+            idx for idx, failure in failures.items()
+            if not failure.retryable and attempts.get(events[idx]["id"], 0) >= settings.prediction_max_attempts
+        }
+        pending = sorted(set(failures) - given_up)
+        # Events that can never be predicted (unknown type) and given up ones count as done
+        handled = pending[0] if pending else len(events)
+        
+        # Events of one entity run in order (the first establishes the baseline
+        # the next are compared with); different entities run concurrently. Predicted
+        # events after a pending one are processed too, unless their entity has a pending
+        # event before them in this scan; once saved they are not fetched again.
+        events_by_entity: Dict[Tuple[str, str], List[Tuple[int, Dict[str, Any]]]] = {}
+        for idx, event in enumerate(events):
+            entity = self.get_entity(event)
+            if idx in failures and idx not in given_up:
+                blocked.add(entity)
+            elif predictions[idx] is not None and entity not in blocked:
+                events_by_entity.setdefault(entity, []).append((idx, event))
+        
+        to_process = sum(len(entity_events) for entity_events in events_by_entity.values())
+        results: List[Optional[Dict[str, Any]]] = [None] * len(events)
+        progress = {"processed": 0, "hotspots": 0}
+        
+        async def process_entity(entity_events: List[Tuple[int, Dict[str, Any]]]) -> None:
+            for idx, event in entity_events:
+                async with semaphore:
+                    try:
+                        results[idx] = await self.detect_hotspots_for_event(event, predictions[idx])
+                        if results[idx]:
+                            progress["hotspots"] += 1
+                    except Exception as e:
+                        logger.error(f"Error processing event {event.get('id')}: {e}")
+                
+                # Log progress every 10 events
+                progress["processed"] += 1
+                if progress["processed"] % 10 == 0:
+                    logger.info(f"Progress: {progress['processed']}/{to_process} predicted events processed, {progress['hotspots']} hotspots found")
+        
+        async with asyncio.TaskGroup() as group:
+            for entity_events in events_by_entity.values():
+                group.create_task(process_entity(entity_events))
+        
+        unpredictable = sum(1 for features in event_features if features is None)
+        waiting = sum(1 for prediction in predictions if prediction) - to_process
+        logger.info(
+            f"Page of {len(events)} events: {to_process} predicted, {unpredictable + len(given_up)} skipped "
+            f"({unpredictable} not predictable, {len(given_up)} failed {settings.prediction_max_attempts} times), "
+            f"{len(pending)} pending, {waiting} waiting on a pending event of their entity"
+        )
+        if given_up:
+            logger.warning(f"Giving up on events {sorted(events[idx]['id'] for idx in given_up)} after {settings.prediction_max_attempts} failed predictions")
+        if pending:
+            logger.warning(f"Could not get predictions for {len(pending)} events, retrying from event {events[handled]['id']} next scan")
+        unreachable = any(failure.retryable for failure in failures.values())
+        return [hotspot for hotspot in results if hotspot], handled, unreachable
 
 # Singleton instance
 hotspot_engine = HotspotEngine()
@@ -0,0 +1,209 @@
+"""Shared pooled HTTP client for downstream services."""
+import asyncio
+import random
+import time
+import httpx
+from typing import Dict, Any, Optional
+from ..utils.config import settings
+from ..utils.logger import logger
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUS_CODES = {502, 503, 504}
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def http2_available() -> bool:
+    """Check if the h2 package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one service.
+    
+    Opens after failure_threshold failed calls in a row and fails fast while open. After
+    reset_timeout seconds one half-open probe call is let through: success closes the
+    breaker, failure opens it again.
+    """
+    
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        """Initialize circuit breaker."""
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+    
+    def _retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic()) if self.opened_at else 0.0
+    
+    def is_open(self) -> bool:
+        """Check if calls would currently fail fast."""
+        if self.state == OPEN:
+            return self._retry_in() > 0
+        return self.state == HALF_OPEN and self._probe_in_flight
+    
+    def allow_request(self) -> bool:
+        """Check if a call may go out; claims the probe slot when half-open."""
+        if self.state == CLOSED:
+            return True
+        if self.is_open():
+            return False
+        if self.state == OPEN:
+            self.state = HALF_OPEN
+            logger.info(f"{self.name} circuit half-open, probing")
+        self._probe_in_flight = True
+        return True
+    
+    def record_success(self) -> None:
+        """Record a successful call."""
+        if self.state != CLOSED:
+            logger.info(f"{self.name} circuit closed")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+    
+    def record_failure(self) -> None:
+        """Record a failed call."""
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning(f"{self.name} circuit open after {self.consecutive_failures} consecutive failures")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+    
+    def release_probe(self) -> None:
+        """Free the half-open probe slot of a call that ended without an outcome."""
+        self._probe_in_flight = False
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state for health reporting."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": round(self._retry_in(), 1) if self.state == OPEN else None
+        }
+
+
+class ServiceHTTPClient:
+    """Long-lived HTTP client for one downstream service, with retry and a circuit breaker."""
+    
+    def __init__(self, name: str, base_url: str):
+        """Initialize service HTTP client."""
+        self.name = name
+        self.base_url = base_url
+        self._client: Optional[httpx.AsyncClient] = None
+        self.breaker = CircuitBreaker(name, settings.circuit_failure_threshold, settings.circuit_reset_timeout)
+    
+    async def start(self) -> None:
+        """Open the connection pool."""
+        if self._client is not None:
+            return
+        http2 = settings.http2_enabled and http2_available()
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+                keepalive_expiry=settings.http_keepalive_expiry
+            ),
+            timeout=httpx.Timeout(settings.http_default_timeout, connect=settings.http_connect_timeout)
+        )
+        logger.info(f"{self.name} HTTP client started (http2={http2})")
+    
+    async def close(self) -> None:
+        """Close the connection pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info(f"{self.name} HTTP client closed")
+    
+    async def request(
+        self,
+        method: str,
+        path: str,
+        timeout: Optional[float] = None,
+        retry: Optional[bool] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Send a request through the shared pool.
+        
+        Idempotent methods (or retry=True) are retried on connection errors, timeouts and
+        502/503/504 with exponential backoff and full jitter; other calls are sent once. A call that still
+        fails with a transport error or a 5xx counts towards opening the circuit breaker;
+        while it is open CircuitOpenError is raised without calling the service. 4xx
+        responses mean the service is up and rejected this request, so they don't count.
+        """
+        if self._client is None:
+            # Used outside the app lifespan (scripts, tests)
+            await self.start()
+        
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            response = await self._send(method, path, timeout, retry, **kwargs)
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release_probe()
+            raise
+        
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+    
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        timeout: Optional[float],
+        retry: Optional[bool],
+        **kwargs
+    ) -> httpx.Response:
+        if retry is None:
+            retry = method.upper() in IDEMPOTENT_METHODS
+        attempts = 1 + (settings.http_retry_attempts if retry else 0)
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=settings.http_connect_timeout)
+        
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            try:
+                response = await self._client.request(method, path, **kwargs)
+                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    return response
+                reason = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                if last_attempt:
+                    raise
+                reason = repr(e)
+            
+            # Another call opened the breaker meanwhile; don't keep retrying a service that is down
+            if self.breaker.state == OPEN:
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            
+            # Full jitter, so callers failing together don't retry in lockstep
+            delay = random.uniform(0, settings.http_retry_backoff * (2 ** attempt))
+            logger.warning(f"{self.name} {method} {path} failed ({reason}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
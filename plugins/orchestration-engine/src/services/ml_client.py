@@ -1,8 +1,21 @@
 """ML Engine client for predictions."""
+import asyncio
+import contextlib
 import httpx
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, NamedTuple
 from ..utils.config import settings
 from ..utils.logger import logger
+from .http_client import ServiceHTTPClient, CircuitOpenError, RETRY_STATUS_CODES
+
+
+PREDICTION_TYPES = ("logistics", "factory", "warehouse", "delivery")
+
+
+class BatchPrediction(NamedTuple):
+    """Outcome of one item of a batch prediction."""
+    co2_kg: Optional[float]
+    error: Optional[str] = None
+    retryable: bool = False
 
 
 class MLClient:
@@ -11,78 +24,117 @@ class MLClient:
     def __init__(self):
         """Initialize ML client."""
         self.base_url = settings.ml_engine_url
-        self.timeout = 30.0
+        self.http = ServiceHTTPClient("ML Engine", self.base_url)
     
-    async def predict_logistics(self, features: Dict[str, Any]) -> Optional[float]:
-        """Get logistics CO2 prediction."""
+    async def predict(self, prediction_type: str, features: Dict[str, Any]) -> Optional[float]:
+        """Get the CO2 prediction for one feature set of a prediction type."""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/api/v1/predict/logistics",
-                    json=features
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("co2_kg")
+            # Predictions have no side effects, so they are safe to retry
+            response = await self.http.request(
+                "POST", f"/api/v1/predict/{prediction_type}",
+                json=features, timeout=settings.ml_predict_timeout, retry=True
+            )
+            response.raise_for_status()
+            data = response.json()
+            return data.get("co2_kg")
         except Exception as e:
-            logger.error(f"ML Engine logistics prediction error: {e}")
+            logger.error(f"ML Engine {prediction_type} prediction error: {e}")
             return None
     
-    async def predict_factory(self, features: Dict[str, Any]) -> Optional[float]:
-        """Get factory CO2 prediction."""
+    async def predict_batch(
+        self,
+        prediction_type: str,
+        features: List[Dict[str, Any]],
+        semaphore: Optional[asyncio.Semaphore] = None
+    ) -> List[BatchPrediction]:
+        """
+        Get CO2 predictions for many feature sets in one call, in request order.
+        
+        The ML Engine answers 500 for the whole batch when a single item fails, so such a
+        batch is split in halves to isolate the failing item, at most ml_batch_max_splits
+        times. If both halves still fail, the whole batch fails instead of splitting on.
+        Each call holds a slot of semaphore (the caller's concurrency limit) if given.
+        Failures while the ML Engine is unreachable (open breaker, transport errors,
+        502/503/504) are retryable; items the ML Engine rejected are not.
+        """
+        if not features:
+            return []
+        slot = semaphore or contextlib.nullcontext()
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/api/v1/predict/factory",
-                    json=features
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("co2_kg")
+            async with slot:
+                response = await self._post_batch(prediction_type, features)
         except Exception as e:
-            logger.error(f"ML Engine factory prediction error: {e}")
-            return None
+            return self._batch_outcome(prediction_type, features, e)
+        if response.status_code == 500 and len(features) > 1 and settings.ml_batch_max_splits > 0:
+            return await self._split_batch(prediction_type, features, slot, settings.ml_batch_max_splits)
+        return self._batch_outcome(prediction_type, features, response)
     
-    async def predict_warehouse(self, features: Dict[str, Any]) -> Optional[float]:
-        """Get warehouse CO2 prediction."""
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/api/v1/predict/warehouse",
-                    json=features
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("co2_kg")
-        except Exception as e:
-            logger.error(f"ML Engine warehouse prediction error: {e}")
-            return None
+    async def _post_batch(self, prediction_type: str, features: List[Dict[str, Any]]) -> httpx.Response:
+        # Predictions have no side effects, so they are safe to retry
+        return await self.http.request(
+            "POST", f"/api/v1/batch/{prediction_type}",
+            json={"predictions": features}, timeout=settings.ml_batch_timeout, retry=True
+        )
     
-    async def predict_delivery(self, features: Dict[str, Any]) -> Optional[float]:
-        """Get delivery CO2 prediction."""
+    async def _split_batch(
+        self,
+        prediction_type: str,
+        features: List[Dict[str, Any]],
+        slot,
+        splits_left: int
+    ) -> List[BatchPrediction]:
+        """Predict both halves of a batch the ML Engine answered with 500."""
+        middle = len(features) // 2
+        halves = [features[:middle], features[middle:]]
+        
+        async def post(half: List[Dict[str, Any]]):
+            async with slot:
+                return await self._post_batch(prediction_type, half)
+        
+        responses = await asyncio.gather(*(post(half) for half in halves), return_exceptions=True)
+        if all(isinstance(response, httpx.Response) and response.status_code == 500 for response in responses):
+            # More than one failing item, or a failing ML Engine; splitting on would only add calls
+            logger.warning(f"ML Engine {prediction_type} batch failed in both halves, failing all {len(features)} items")
+            return self._batch_outcome(prediction_type, features, responses[0])
+        
+        outcomes: List[BatchPrediction] = []
+        for half, response in zip(halves, responses):
+            if isinstance(response, httpx.Response) and response.status_code == 500 and len(half) > 1 and splits_left > 1:
+                outcomes += await self._split_batch(prediction_type, half, slot, splits_left - 1)
+            else:
+                outcomes += self._batch_outcome(prediction_type, half, response)
+        return outcomes
+    
+    def _batch_outcome(self, prediction_type: str, features: List[Dict[str, Any]], response) -> List[BatchPrediction]:
+        """Turn a batch response, or the exception its call raised, into one outcome per item."""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/api/v1/predict/delivery",
-                    json=features
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("co2_kg")
+            if isinstance(response, BaseException):
+                raise response
+            response.raise_for_status()
+            results = response.json().get("results", [])
+            if len(results) != len(features):
+                raise ValueError(f"expected {len(features)} results, got {len(results)}")
+            predictions = [(result.get("prediction") or {}).get("co2_kg") for result in results]
+            return [
+                BatchPrediction(co2_kg) if co2_kg is not None else BatchPrediction(None, "no prediction in result")
+                for co2_kg in predictions
+            ]
         except Exception as e:
-            logger.error(f"ML Engine delivery prediction error: {e}")
-            return None
+            retryable = isinstance(e, (CircuitOpenError, httpx.TransportError)) or (
+                isinstance(e, httpx.HTTPStatusError) and e.response.status_code in RETRY_STATUS_CODES
+            )
+            logger.error(f"ML Engine {prediction_type} batch prediction error ({len(features)} items): {e}")
+            return [BatchPrediction(None, str(e) or repr(e), retryable)] * len(features)
     
     async def forecast_7d(self, history: list) -> Optional[Dict[str, Any]]:
         """Get 7-day forecast."""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/api/v1/forecast/7d",
-                    json={"history": history}
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self.http.request(
+                "POST", "/api/v1/forecast/7d",
+                json={"history": history}, timeout=settings.ml_forecast_timeout, retry=True
+            )
+            response.raise_for_status()
+            return response.json()
         except Exception as e:
             logger.error(f"ML Engine forecast error: {e}")
             return None
@@ -90,9 +142,10 @@ class MLClient:
     async def health_check(self) -> bool:
         """Check if ML Engine is healthy."""
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/api/v1/health")
-                return response.status_code == 200
+            response = await self.http.request(
+                "GET", "/api/v1/health", timeout=settings.health_check_timeout, retry=False
+            )
+            return response.status_code == 200
         except Exception:
             return False
 
@@ -1,8 +1,8 @@
 """RAG Chatbot client for recommendations."""
-import httpx
 from typing import Dict, Any, Optional, List
 from ..utils.config import settings
 from ..utils.logger import logger
+from .http_client import ServiceHTTPClient
 
 
 class RAGClient:
@@ -11,7 +11,7 @@ class RAGClient:
     def __init__(self):
         """Initialize RAG client."""
         self.base_url = settings.rag_service_url
-        self.timeout = 60.0  # RAG can take longer due to AI processing
+        self.http = ServiceHTTPClient("RAG Service", self.base_url)
     
     async def generate_recommendations(
         self,
@@ -34,13 +34,14 @@ class RAGClient:
             if hotspot_id:
                 payload["hotspot_id"] = hotspot_id
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/api/rag/recommend",
-                    json=payload
-                )
-                response.raise_for_status()
-                return response.json()
+            # Not retried: each call generates and stores new recommendations
+            # RAG can take longer due to AI processing
+            response = await self.http.request(
+                "POST", "/api/rag/recommend",
+                json=payload, timeout=settings.rag_recommend_timeout
+            )
+            response.raise_for_status()
+            return response.json()
         except Exception as e:
             logger.error(f"RAG recommendation generation error: {e}")
             return None
@@ -48,14 +49,12 @@ class RAGClient:
     async def get_recommendations(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get recommendations from RAG service."""
         try:
-            url = f"{self.base_url}/api/recommendations"
-            if status:
-                url += f"?status={status}"
-            
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                return response.json()
+            params = {"status": status} if status else None
+            response = await self.http.request(
+                "GET", "/api/recommendations", params=params, timeout=settings.rag_timeout
+            )
+            response.raise_for_status()
+            return response.json()
         except Exception as e:
             logger.error(f"Error fetching recommendations: {e}")
             return []
@@ -63,13 +62,13 @@ class RAGClient:
     async def update_recommendation_status(self, rec_id: int, status: str) -> bool:
         """Update recommendation status."""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.patch(
-                    f"{self.base_url}/api/recommendations/{rec_id}",
-                    json={"status": status}
-                )
-                response.raise_for_status()
-                return True
+            # Setting a status is idempotent, so it is safe to retry
+            response = await self.http.request(
+                "PATCH", f"/api/recommendations/{rec_id}",
+                json={"status": status}, timeout=settings.rag_timeout, retry=True
+            )
+            response.raise_for_status()
+            return True
         except Exception as e:
             logger.error(f"Error updating recommendation status: {e}")
             return False
@@ -77,9 +76,10 @@ class RAGClient:
     async def health_check(self) -> bool:
         """Check if RAG service is healthy."""
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/health")
-                return response.status_code == 200
+            response = await self.http.request(
+                "GET", "/health", timeout=settings.health_check_timeout, retry=False
+            )
+            return response.status_code == 200
         except Exception:
             return False
 
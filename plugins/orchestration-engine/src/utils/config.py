@@ -32,6 +32,34 @@ class Settings(BaseSettings):
     hotspot_check_interval: int = int(os.getenv("HOTSPOT_CHECK_INTERVAL", "300"))
     baseline_recalc_interval: int = int(os.getenv("BASELINE_RECALC_INTERVAL", "3600"))
     
+    # HTTP Clients (one pooled client per downstream service)
+    http_max_connections: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    http_max_keepalive_connections: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    http_keepalive_expiry: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    http2_enabled: bool = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+    http_connect_timeout: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    http_default_timeout: float = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "30"))
+    http_retry_attempts: int = int(os.getenv("HTTP_RETRY_ATTEMPTS", "3"))
+    http_retry_backoff: float = float(os.getenv("HTTP_RETRY_BACKOFF", "0.2"))
+    
+    # Circuit Breakers (ML Engine, RAG service)
+    circuit_failure_threshold: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    circuit_reset_timeout: float = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+    
+    # Endpoint Timeouts (seconds)
+    ml_predict_timeout: float = float(os.getenv("ML_PREDICT_TIMEOUT", "30"))
+    ml_batch_timeout: float = float(os.getenv("ML_BATCH_TIMEOUT", "60"))
+    ml_forecast_timeout: float = float(os.getenv("ML_FORECAST_TIMEOUT", "30"))
+    rag_recommend_timeout: float = float(os.getenv("RAG_RECOMMEND_TIMEOUT", "60"))
+    rag_timeout: float = float(os.getenv("RAG_TIMEOUT", "30"))
+    health_check_timeout: float = float(os.getenv("HEALTH_CHECK_TIMEOUT", "5"))
+    
+    # Scanning
+    scan_concurrency: int = int(os.getenv("SCAN_CONCURRENCY", "10"))
+    prediction_max_attempts: int = int(os.getenv("PREDICTION_MAX_ATTEMPTS", "3"))
+    ml_batch_max_splits: int = int(os.getenv("ML_BATCH_MAX_SPLITS", "8"))
+    scan_watermark_lag: float = float(os.getenv("SCAN_WATERMARK_LAG", "300"))
+    
     # Logging
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
     
@@ -0,0 +1,218 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from src.services import hotspot_engine as engine_module
+from src.services.hotspot_engine import HotspotEngine
+from src.services.ml_client import BatchPrediction
+
+
+def _events(count, suppliers=4):
+    return [
+        {"id": i, "supplier_id": f"S-{i % suppliers}", "event_type": "factory", "energy_kwh": 100 + i, "shift_hours": 8}
+        for i in range(1, count + 1)
+    ]
+
+
+def _fake_db(monkeypatch, events, watermark=0):
+    """Serve events after the watermark that have no prediction, and keep the watermark and failures in memory"""
+    db = {"watermark": watermark, "predicted": set(), "attempts": {}, "pages": 0}
+    
+    async def get_events_without_predictions(after_id=0, limit=50):
+        db["pages"] += 1
+        given_up = {event_id for event_id, attempts in db["attempts"].items() if attempts >= engine_module.settings.prediction_max_attempts}
+        return [e for e in events if e["id"] > after_id and e["id"] not in db["predicted"] | given_up][:limit]
+    
+    async def get_scan_watermark(name):
+        return db["watermark"]
+    
+    async def set_scan_watermark(name, last_event_id):
+        db["watermark"] = last_event_id
+    
+    async def record_prediction_failures(failures):
+        for event_id in failures:
+            db["attempts"][event_id] = db["attempts"].get(event_id, 0) + 1
+        return {event_id: db["attempts"][event_id] for event_id in failures}
+    
+    monkeypatch.setattr(engine_module.db_client, "get_events_without_predictions", get_events_without_predictions)
+    monkeypatch.setattr(engine_module.db_client, "get_scan_watermark", get_scan_watermark)
+    monkeypatch.setattr(engine_module.db_client, "set_scan_watermark", set_scan_watermark)
+    monkeypatch.setattr(engine_module.db_client, "record_prediction_failures", record_prediction_failures)
+    return db
+
+
+def _predict_all(monkeypatch, co2=10.0, failure=None):
+    """Predict co2 for every feature set, except those failure(features) returns a BatchPrediction for"""
+    calls = []
+    
+    async def predict_batch(prediction_type, features, semaphore=None):
+        calls.append([f["energy_kwh"] - 100 for f in features])
+        return [(failure and failure(f)) or BatchPrediction(co2) for f in features]
+    
+    monkeypatch.setattr(engine_module.ml_client, "predict_batch", predict_batch)
+    return calls
+
+
+def _record_processed(monkeypatch, engine, db):
+    seen = {}
+    
+    async def detect(event, prediction=None):
+        seen.setdefault(event["supplier_id"], []).append(event["id"])
+        db["predicted"].add(event["id"])
+        return None
+    
+    monkeypatch.setattr(engine, "detect_hotspots_for_event", detect)
+    return seen
+
+
+def test_scan_keeps_entity_order_and_bounds_concurrency(monkeypatch):
+    events = _events(40)
+    db = _fake_db(monkeypatch, events)
+    _predict_all(monkeypatch)
+    monkeypatch.setattr(engine_module.settings, "scan_concurrency", 3)
+    engine = HotspotEngine()
+    
+    seen = {}
+    running = {"now": 0, "peak": 0}
+    
+    async def detect(event, prediction=None):
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        await asyncio.sleep(random.uniform(0, 0.005))
+        seen.setdefault(event["supplier_id"], []).append(event["id"])
+        db["predicted"].add(event["id"])
+        running["now"] -= 1
+        return {"event_id": event["id"]} if event["id"] % 5 == 0 else None
+    
+    monkeypatch.setattr(engine, "detect_hotspots_for_event", detect)
+    
+    hotspots = asyncio.run(engine.scan_for_hotspots(limit=100))
+    
+    assert 1 < running["peak"] <= 3
+    for supplier, ids in seen.items():
+        assert ids == sorted(ids), supplier
+    assert sum(len(ids) for ids in seen.values()) == 40
+    # Hotspots come back in event order, not completion order
+    assert [h["event_id"] for h in hotspots] == [5, 10, 15, 20, 25, 30, 35, 40]
+
+
+def test_batch_predictions_are_matched_back_to_events_across_types(monkeypatch):
+    events = [
+        {"id": 1, "event_type": "logistics", "distance_km": 10, "load_kg": 5, "vehicle_type": None, "fuel_type": None},
+        {"id": 2, "event_type": "factory", "energy_kwh": 200, "shift_hours": 8},
+        {"id": 3, "event_type": "spaceship"},
+        {"id": 4, "event_type": "logistics", "distance_km": 20, "load_kg": 5},
+        {"id": 5, "event_type": "factory", "energy_kwh": 300, "shift_hours": None},
+        {"id": 6, "event_type": "logistics", "distance_km": 30, "load_kg": 5},
+    ]
+    requested = {}
+    
+    values = {"logistics": lambda f: f["distance_km"], "factory": lambda f: f["energy_kwh"]}
+    
+    async def predict_batch(prediction_type, features, semaphore=None):
+        requested[prediction_type] = features
+        # Second logistics item gets no prediction
+        return [
+            BatchPrediction(None, "rejected") if prediction_type == "logistics" and i == 1 else BatchPrediction(values[prediction_type](f))
+            for i, f in enumerate(features)
+        ]
+    
+    monkeypatch.setattr(engine_module.ml_client, "predict_batch", predict_batch)
+    engine = HotspotEngine()
+    
+    features = [engine._build_features(event) for event in events]
+    predictions, failures = asyncio.run(engine._get_predictions(events, features))
+    
+    # Null categorical fields get their defaults instead of failing in the ML Engine
+    assert requested["logistics"][0]["vehicle_type"] == "truck"
+    assert requested["logistics"][0]["fuel_type"] == "diesel"
+    assert set(requested) == {"logistics", "factory"}
+    assert [p and (p["event_id"], p["predicted_co2"]) for p in predictions] == [
+        (1, 10.0), (2, 200.0), None, None, (5, 300.0), (6, 30.0)
+    ]
+    # The unknown event type is not a failure, it can never be predicted
+    assert list(failures) == [3]
+
+
+def test_rejected_event_holds_watermark_until_out_of_attempts(monkeypatch):
+    events = _events(6, suppliers=2)
+    db = _fake_db(monkeypatch, events)
+    calls = _predict_all(monkeypatch, failure=lambda f: f["energy_kwh"] == 103 and BatchPrediction(None, "HTTP 422"))
+    monkeypatch.setattr(engine_module.settings, "prediction_max_attempts", 3)
+    engine = HotspotEngine()
+    seen = _record_processed(monkeypatch, engine, db)
+    
+    asyncio.run(engine.scan_for_hotspots(limit=4))
+    
+    # Later pages are still scanned, but the watermark waits before the rejected event
+    # and the next event of its supplier waits behind it
+    assert db["watermark"] == 2
+    assert seen == {"S-1": [1], "S-0": [2, 4, 6]}
+    assert db["attempts"] == {3: 1}
+    
+    asyncio.run(engine.scan_for_hotspots(limit=4))
+    assert db["watermark"] == 2
+    assert db["attempts"] == {3: 2}
+    
+    asyncio.run(engine.scan_for_hotspots(limit=4))
+    # Third rejection: the event is skipped and the watermark moves past it (event 6 is
+    # already predicted, so it is not fetched again)
+    assert db["watermark"] == 5
+    assert seen == {"S-1": [1, 5], "S-0": [2, 4, 6]}
+    assert calls[-1] == [3, 5]
+    
+    calls.clear()
+    asyncio.run(engine.scan_for_hotspots(limit=4))
+    assert calls == []
+    assert db["attempts"] == {3: 3}
+
+
+def test_unreachable_ml_engine_stops_scan_without_counting_attempts(monkeypatch):
+    events = _events(6, suppliers=2)
+    db = _fake_db(monkeypatch, events)
+    down = {"from": 3}
+    _predict_all(monkeypatch, failure=lambda f: f["energy_kwh"] - 100 >= down["from"] and BatchPrediction(None, "ConnectError", True))
+    engine = HotspotEngine()
+    seen = _record_processed(monkeypatch, engine, db)
+    
+    asyncio.run(engine.scan_for_hotspots(limit=2))
+    
+    assert db["watermark"] == 2
+    assert seen == {"S-1": [1], "S-0": [2]}
+    # The page after the failing one is left for the next scan
+    assert db["pages"] == 2
+    assert db["attempts"] == {}
+    
+    down["from"] = 99
+    asyncio.run(engine.scan_for_hotspots(limit=2))
+    
+    assert db["watermark"] == 6
+    assert seen == {"S-1": [1, 3, 5], "S-0": [2, 4, 6]}
+
+
+def test_event_committing_after_higher_ids_were_scanned_is_still_found(monkeypatch):
+    now = datetime.now(timezone.utc)
+    events = _events(6, suppliers=2)
+    for event in events:
+        event["created_at"] = (now - timedelta(minutes=30)).isoformat()
+    # Event 6 was just inserted, event 5 is still in an uncommitted concurrent insert
+    events[5]["created_at"] = now.isoformat()
+    late = events.pop(4)
+    db = _fake_db(monkeypatch, events)
+    _predict_all(monkeypatch)
+    monkeypatch.setattr(engine_module.settings, "scan_watermark_lag", 300)
+    engine = HotspotEngine()
+    seen = _record_processed(monkeypatch, engine, db)
+    
+    asyncio.run(engine.scan_for_hotspots(limit=10))
+    
+    # Event 6 is processed, but the watermark stays below it
+    assert seen == {"S-1": [1, 3], "S-0": [2, 4, 6]}
+    assert db["watermark"] == 4
+    
+    late["created_at"] = (now - timedelta(minutes=1)).isoformat()
+    events.append(late)
+    asyncio.run(engine.scan_for_hotspots(limit=10))
+    
+    assert seen["S-1"] == [1, 3, 5]
+    # Event 5 is recent too, so the watermark waits until it has settled
+    assert db["watermark"] == 4
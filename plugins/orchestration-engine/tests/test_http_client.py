@@ -0,0 +1,234 @@
+import asyncio
+import httpx
+import pytest
+from src.services import http_client
+from src.services.http_client import CircuitBreaker, CircuitOpenError, ServiceHTTPClient
+from src.services.rag_client import RAGClient
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(http_client.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def _service(handler, client=None):
+    client = client or ServiceHTTPClient("Test", "http://service")
+    client._client = httpx.AsyncClient(base_url="http://service", transport=httpx.MockTransport(handler))
+    return client
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff waits instead of sleeping; random.uniform returns its upper bound"""
+    waits = {"bounds": [], "slept": []}
+    
+    def uniform(low, high):
+        waits["bounds"].append((low, high))
+        return high
+    
+    async def sleep(delay):
+        waits["slept"].append(delay)
+    
+    monkeypatch.setattr(http_client.random, "uniform", uniform)
+    monkeypatch.setattr(http_client.asyncio, "sleep", sleep)
+    monkeypatch.setattr(http_client.settings, "http_retry_attempts", 3)
+    monkeypatch.setattr(http_client.settings, "http_retry_backoff", 0.5)
+    return waits
+
+
+def _failing(statuses):
+    """Answer with the given statuses in turn, then 200"""
+    calls = []
+    
+    def handler(request):
+        calls.append(request.method)
+        status = statuses[len(calls) - 1] if len(calls) <= len(statuses) else 200
+        if status is None:
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(status)
+    return handler, calls
+
+
+@pytest.mark.parametrize("status", [502, 503, 504, None])
+def test_idempotent_calls_are_retried_on_gateway_errors_and_transport_errors(sleeps, status):
+    handler, calls = _failing([status, status])
+    
+    response = asyncio.run(_service(handler).request("GET", "/x"))
+    
+    assert response.status_code == 200
+    assert len(calls) == 3
+
+
+def test_non_idempotent_calls_are_sent_once_unless_retry_is_requested(sleeps):
+    handler, calls = _failing([503])
+    response = asyncio.run(_service(handler).request("POST", "/x"))
+    assert response.status_code == 503
+    assert len(calls) == 1
+    
+    handler, calls = _failing([503])
+    response = asyncio.run(_service(handler).request("POST", "/x", retry=True))
+    assert response.status_code == 200
+    assert len(calls) == 2
+
+
+def test_other_errors_are_not_retried(sleeps):
+    for status in (400, 404, 500):
+        handler, calls = _failing([status])
+        response = asyncio.run(_service(handler).request("GET", "/x"))
+        assert response.status_code == status
+        assert len(calls) == 1
+
+
+def test_retries_stop_after_configured_attempts_with_jittered_exponential_backoff(sleeps):
+    handler, calls = _failing([503] * 10)
+    
+    response = asyncio.run(_service(handler).request("GET", "/x"))
+    
+    assert response.status_code == 503
+    assert len(calls) == 4
+    # Each wait is drawn from [0, backoff * 2^attempt]
+    assert sleeps["bounds"] == [(0, 0.5), (0, 1.0), (0, 2.0)]
+    assert sleeps["slept"] == [0.5, 1.0, 2.0]
+
+
+def test_full_jitter_waits_stay_within_bounds(monkeypatch):
+    slept = []
+    
+    async def sleep(delay):
+        slept.append(delay)
+    
+    monkeypatch.setattr(http_client.asyncio, "sleep", sleep)
+    monkeypatch.setattr(http_client.settings, "http_retry_attempts", 3)
+    monkeypatch.setattr(http_client.settings, "http_retry_backoff", 0.5)
+    for _ in range(20):
+        handler, _calls = _failing([503] * 3)
+        asyncio.run(_service(handler).request("GET", "/x"))
+    
+    for attempt in range(3):
+        waits = slept[attempt::3]
+        assert all(0 <= wait <= 0.5 * 2 ** attempt for wait in waits)
+    # Randomized, not the same wait every time
+    assert len(set(slept)) > 3
+
+
+def test_recommendation_generation_is_not_retried(sleeps):
+    handler, calls = _failing([503, 503])
+    rag = RAGClient()
+    _service(handler, rag.http)
+    
+    result = asyncio.run(rag.generate_recommendations(supplier="S-1", predicted=120.0, baseline=100.0))
+    
+    assert result is None
+    assert calls == ["POST"]
+
+
+def test_breaker_opens_fails_fast_and_closes_after_successful_probe(clock):
+    breaker = CircuitBreaker("ML Engine", failure_threshold=3, reset_timeout=30)
+    
+    for _ in range(2):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.is_open()
+    assert not breaker.allow_request()
+    assert breaker.snapshot() == {"state": "open", "consecutive_failures": 3, "retry_in_seconds": 30.0}
+    
+    # One half-open probe after the reset timeout; other calls keep failing fast
+    clock.now += 30
+    assert breaker.allow_request()
+    assert breaker.state == "half_open"
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.consecutive_failures == 0
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens_breaker(clock):
+    breaker = CircuitBreaker("RAG Service", failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    
+    assert breaker.allow_request()
+    breaker.record_failure()
+    
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+    assert breaker.snapshot()["retry_in_seconds"] == 10.0
+
+
+def test_client_counts_unavailability_and_raises_while_open(clock, monkeypatch):
+    monkeypatch.setattr(http_client.settings, "http_retry_attempts", 0)
+    calls = []
+    
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path == "/down":
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(422 if request.url.path == "/rejected" else 200)
+    
+    client = ServiceHTTPClient("ML Engine", "http://ml-engine")
+    client.breaker = CircuitBreaker("ML Engine", failure_threshold=2, reset_timeout=30)
+    client._client = httpx.AsyncClient(base_url="http://ml-engine", transport=httpx.MockTransport(handler))
+    
+    async def run():
+        assert (await client.request("POST", "/rejected")).status_code == 422
+        for _ in range(2):
+            with pytest.raises(httpx.ConnectError):
+                await client.request("GET", "/down")
+        with pytest.raises(CircuitOpenError):
+            await client.request("GET", "/ok")
+        clock.now += 30
+        return await client.request("GET", "/ok")
+    
+    response = asyncio.run(run())
+    
+    assert response.status_code == 200
+    assert calls == ["/rejected", "/down", "/down", "/ok"]
+    assert client.breaker.state == "closed"
+
+
+def test_service_failing_every_call_with_500_opens_the_breaker(clock):
+    calls = []
+    
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(500, json={"detail": "internal error"})
+    
+    client = _service(handler)
+    client.breaker = CircuitBreaker("ML Engine", failure_threshold=3, reset_timeout=30)
+    
+    async def run():
+        for _ in range(3):
+            assert (await client.request("POST", "/api/v1/batch/factory")).status_code == 500
+        with pytest.raises(CircuitOpenError):
+            await client.request("POST", "/api/v1/batch/factory")
+    
+    asyncio.run(run())
+    
+    assert client.breaker.state == "open"
+    assert len(calls) == 3
+
+
+def test_health_reports_degraded_while_a_breaker_is_open(clock, monkeypatch):
+    from src import main
+    breaker = CircuitBreaker("ML Engine", failure_threshold=1, reset_timeout=30)
+    monkeypatch.setattr(main.ml_client.http, "breaker", breaker)
+    
+    assert asyncio.run(main.health_check())["status"] == "healthy"
+    breaker.record_failure()
+    health = asyncio.run(main.health_check())
+    
+    assert health["status"] == "degraded"
+    assert health["circuit_breakers"]["ml_engine"]["state"] == "open"
+    assert health["circuit_breakers"]["rag_service"]["state"] == "closed"
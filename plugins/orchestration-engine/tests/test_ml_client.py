@@ -0,0 +1,155 @@
+import asyncio
+import json
+import httpx
+from src.services.ml_client import MLClient
+
+
+def _client(handler):
+    client = MLClient()
+    client.http._client = httpx.AsyncClient(base_url="http://ml-engine", transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_batch_results_are_matched_by_index():
+    def handler(request):
+        items = json.loads(request.content)["predictions"]
+        return httpx.Response(200, json={
+            "results": [
+                {"input": item, "prediction": {"co2_kg": item["energy_kwh"] / 10} if item["energy_kwh"] != 30 else None}
+                for item in items
+            ],
+            "count": len(items)
+        })
+    
+    client = _client(handler)
+    predictions = asyncio.run(client.predict_batch("factory", [{"energy_kwh": e} for e in (10, 20, 30, 40)]))
+    
+    assert [p.co2_kg for p in predictions] == [1.0, 2.0, None, 4.0]
+    assert predictions[2].error and not predictions[2].retryable
+
+
+def test_failing_item_only_fails_itself_not_the_batch():
+    calls = []
+    
+    def handler(request):
+        items = json.loads(request.content)["predictions"]
+        calls.append(len(items))
+        # Like the ML Engine: one item failing preprocessing fails the whole batch
+        if any(item["vehicle_type"] is None for item in items):
+            return httpx.Response(500, json={"detail": "Required field 'vehicle_type' is missing and no default provided"})
+        return httpx.Response(200, json={"results": [{"prediction": {"co2_kg": item["distance_km"]}} for item in items]})
+    
+    client = _client(handler)
+    features = [{"distance_km": float(i), "vehicle_type": None if i == 5 else "truck"} for i in range(8)]
+    
+    predictions = asyncio.run(client.predict_batch("logistics", features))
+    
+    assert [p.co2_kg for p in predictions] == [0.0, 1.0, 2.0, 3.0, 4.0, None, 6.0, 7.0]
+    assert calls[0] == 8 and len(calls) <= 1 + 2 * 3
+    # The good halves in between keep an isolated bad item from opening the breaker
+    assert client.http.breaker.state == "closed"
+
+
+def test_unavailable_ml_engine_fails_whole_batch_without_splitting(monkeypatch):
+    calls = []
+    
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(503)
+    
+    monkeypatch.setattr("src.services.http_client.settings.http_retry_attempts", 0)
+    client = _client(handler)
+    
+    predictions = asyncio.run(client.predict_batch("delivery", [{"route_length": 1.0}] * 4))
+    
+    assert [p.co2_kg for p in predictions] == [None] * 4
+    assert all(p.retryable for p in predictions)
+    assert len(calls) == 1
+    assert client.http.breaker.consecutive_failures == 1
+
+
+def test_batch_failures_are_retryable_only_while_ml_engine_is_unreachable(monkeypatch):
+    status = {"code": 422}
+    
+    def handler(request):
+        if status["code"] is None:
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(status["code"], json={"detail": "invalid"})
+    
+    monkeypatch.setattr("src.services.http_client.settings.http_retry_attempts", 0)
+    client = _client(handler)
+    
+    rejected = asyncio.run(client.predict_batch("factory", [{"energy_kwh": 1}] * 2))
+    status["code"] = 503
+    unavailable = asyncio.run(client.predict_batch("factory", [{"energy_kwh": 1}]))
+    status["code"] = None
+    unreachable = asyncio.run(client.predict_batch("factory", [{"energy_kwh": 1}]))
+    
+    assert [(p.co2_kg, p.retryable) for p in rejected] == [(None, False)] * 2
+    assert "422" in rejected[0].error
+    assert unavailable[0].retryable
+    assert unreachable[0].retryable
+
+
+def test_batch_failing_in_both_halves_stops_splitting(monkeypatch):
+    calls = []
+    
+    def handler(request):
+        calls.append(len(json.loads(request.content)["predictions"]))
+        return httpx.Response(500, json={"detail": "model not loaded"})
+    
+    client = _client(handler)
+    
+    predictions = asyncio.run(client.predict_batch("factory", [{"energy_kwh": e} for e in range(64)]))
+    
+    assert calls == [64, 32, 32]
+    assert [p.co2_kg for p in predictions] == [None] * 64
+
+
+def test_batch_splits_are_capped_and_share_the_callers_semaphore(monkeypatch):
+    calls = []
+    running = {"now": 0, "peak": 0}
+    
+    async def handler(request):
+        items = json.loads(request.content)["predictions"]
+        calls.append(len(items))
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        await asyncio.sleep(0.001)
+        running["now"] -= 1
+        if any(item["energy_kwh"] == 0 for item in items):
+            return httpx.Response(500, json={"detail": "invalid energy_kwh"})
+        return httpx.Response(200, json={"results": [{"prediction": {"co2_kg": item["energy_kwh"]}} for item in items]})
+    
+    monkeypatch.setattr("src.services.ml_client.settings.ml_batch_max_splits", 2)
+    client = _client(handler)
+    
+    async def run():
+        return await client.predict_batch("factory", [{"energy_kwh": e} for e in range(16)], asyncio.Semaphore(1))
+    
+    predictions = asyncio.run(run())
+    
+    # 16 -> 8 + 8 -> 4 + 4, then the failing quarter fails as a whole
+    assert calls == [16, 8, 8, 4, 4]
+    assert [p.co2_kg for p in predictions] == [None] * 4 + [float(e) for e in range(4, 16)]
+    assert running["peak"] == 1
+
+
+def test_ml_engine_failing_every_batch_opens_the_breaker(monkeypatch):
+    calls = []
+    
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(500, json={"detail": "internal error"})
+    
+    monkeypatch.setattr("src.services.ml_client.settings.circuit_failure_threshold", 3)
+    client = _client(handler)
+    
+    first = asyncio.run(client.predict_batch("factory", [{"energy_kwh": 1}] * 8))
+    second = asyncio.run(client.predict_batch("factory", [{"energy_kwh": 1}] * 8))
+    
+    assert client.http.breaker.state == "open"
+    # The second batch fails fast, as retryable, without calling the ML Engine
+    assert len(calls) == 3
+    assert not first[0].retryable
+    assert all(p.retryable for p in second)